@@ -1,57 +1,62 @@
-import os, pathlib, subprocess, urllib.request, zipfile, tarfile, gzip, shutil
+import os, argparse, pathlib, subprocess, urllib.request, zipfile, tarfile, gzip, shutil
 from dotenv import load_dotenv
 
-# Also read YAML config to include eval slugs like GMR-PL
+ap = argparse.ArgumentParser()
+ap.add_argument('--unpack', action='store_true', help='Extract archives inside each dataset folder of data/raw (converters read them in place, see src/archive_io.py)')
+args = ap.parse_args()
+
+# Training slugs and the GMR-PL eval slug come from .env + config/config.yaml.
+# Every dataset gets its own folder so converters never read another one's files:
+#   data/raw/kaggle/<dataset>/  training data (03_convert_kaggle_generic)
+#   data/raw/gmr_pl/            GMR-PL eval set only (03b_convert_gmr_pl)
+#   data/raw/mcauley/           McAuley Pennsylvania (02_convert_mcauley)
 def read_yaml_slugs():
     try:
         import yaml
         y = yaml.safe_load(open("config/config.yaml", "r", encoding="utf-8"))
         base = (y.get("kaggle", {}) or {}).get("dataset_slugs", "") or ""
         eval_slug = (y.get("datasets", {}) or {}).get("eval_gmrpl_slug", "") or ""
-        parts = []
-        if base.strip():
-            parts.append(base.strip())
-        if eval_slug.strip():
-            parts.append(eval_slug.strip())
-        return ",".join(parts)
+        return base.strip(), eval_slug.strip()
     except Exception:
-        return ""
+        return "", ""
 
 load_dotenv()
 DATA_DIR = pathlib.Path("data/raw")
-DATA_DIR.mkdir(parents=True, exist_ok=True)
+KAGGLE_DIR = DATA_DIR / "kaggle"
+GMRPL_DIR = DATA_DIR / "gmr_pl"
+MCAULEY_DIR = DATA_DIR / "mcauley"
+for d in (KAGGLE_DIR, GMRPL_DIR, MCAULEY_DIR):
+    d.mkdir(parents=True, exist_ok=True)
 
-# Merge .env slugs + YAML slugs
+# Merge .env slugs + YAML slugs; the eval slug never lands among the training data
+yaml_slugs, eval_slug = read_yaml_slugs()
 env_slugs = os.getenv("KAGGLE_DATASET_SLUGS", "").strip()
-yaml_slugs = read_yaml_slugs()
-if env_slugs and yaml_slugs:
-    slugs = env_slugs + "," + yaml_slugs
-elif env_slugs:
-    slugs = env_slugs
-else:
-    slugs = yaml_slugs
+train_slugs = [s.strip() for s in f"{env_slugs},{yaml_slugs}".split(",") if s.strip() and s.strip() != eval_slug]
+downloads = [(slug, KAGGLE_DIR / slug.split("/")[-1]) for slug in dict.fromkeys(train_slugs)]
+if eval_slug:
+    downloads.append((eval_slug, GMRPL_DIR))
 
-slugs = slugs.strip()
-if slugs:
+if downloads:
     try:
         subprocess.run(["kaggle", "--version"], check=True, capture_output=True)
     except Exception:
         print("Kaggle CLI not found. Install with `pip install kaggle` and ensure credentials (kaggle.json) exist. Skipping Kaggle downloads.")
-        slugs = ""
+        downloads = []
 
-if slugs:
-    for slug in [s.strip() for s in slugs.split(",") if s.strip()]:
-        print(f"Downloading {slug} ...")
-        code = subprocess.run(["kaggle", "datasets", "download", "-d", slug, "-p", str(DATA_DIR), "-q"]).returncode
+if downloads:
+    for slug, dest in downloads:
+        print(f"Downloading {slug} into {dest} ...")
+        dest.mkdir(parents=True, exist_ok=True)
+        code = subprocess.run(["kaggle", "datasets", "download", "-d", slug, "-p", str(dest), "-q"]).returncode
         if code != 0:
             print(f"Falling back to competitions download for {slug} (if applicable)...")
-            subprocess.run(["kaggle", "competitions", "download", "-c", slug, "-p", str(DATA_DIR), "-q"])
+            subprocess.run(["kaggle", "competitions", "download", "-c", slug, "-p", str(dest), "-q"])
 else:
     print("No Kaggle dataset slugs found. Set KAGGLE_DATASET_SLUGS in .env or fill config/config.yaml if you need Kaggle data.")
 
 # Download McAuley Pennsylvania dataset
 MCAULEY_URL = "https://mcauleylab.ucsd.edu/public_datasets/gdrive/googlelocal/review-Pennsylvania.json.gz"
-mcauley_path = DATA_DIR / "review-Pennsylvania.json.gz"
+mcauley_path = MCAULEY_DIR / "review-Pennsylvania.json.gz"
 if not mcauley_path.exists():
     try:
         print("Downloading McAuley Pennsylvania dataset ...")
@@ -90,6 +95,10 @@ def unpack_archives(directory: pathlib.Path):
             p.unlink()
 
 
-print("Unpacking any archives in data/raw ...")
-unpack_archives(DATA_DIR)
-print("Downloads and unpacking complete.")
+if args.unpack:
+    print("Unpacking any archives in data/raw ...")
+    for d in [*(p for p in KAGGLE_DIR.iterdir() if p.is_dir()), GMRPL_DIR, MCAULEY_DIR]:
+        unpack_archives(d)
+    print("Downloads and unpacking complete.")
+else:
+    print("Downloads complete. Archives are left packed; the converters read them in place.")
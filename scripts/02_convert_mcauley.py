@@ -1,6 +1,22 @@
 
-import os, json, argparse, pathlib, csv, re
-from typing import Any, Dict, List
+import os, json, argparse, pathlib, csv, re, shutil, sys, tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from src.archive_io import MemberRef, list_members, open_member
+from src.storage import FrameWriter, is_parquet
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+FIELDS = ['review_id','place_id','place_name','place_category','city','text','rating','created_at','user_id','user_name','pics']
 
 def coerce_pics(pics_field) -> List[str]:
     urls: List[str] = []
@@ -12,60 +28,118 @@ def coerce_pics(pics_field) -> List[str]:
                 elif isinstance(u, str): urls.append(u)
     return urls
 
-def parse_jsonl(path: pathlib.Path):
-    with open(path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line: continue
-            try:
-                yield json.loads(line)
-            except json.JSONDecodeError:
-                fixed = re.sub(r"'", '"', line)
-                try:
-                    yield json.loads(fixed)
-                except Exception:
-                    continue
+def _loads(line: str):
+    # orjson rejects a few things json accepts (NaN, >64-bit ints), so fall back to json before the quote fix
+    if orjson is not None:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            pass
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return json.loads(re.sub(r"'", '"', line))
+
+def _lines(ref: MemberRef, start: int = 0, end: int = None) -> Iterator[str]:
+    # lines that *start* inside [start, end); a line crossing `end` belongs to this shard
+    with open_member(ref) as f:
+        if start > 0:
+            f.seek(start - 1)
+            f.readline()  # finish the line that started before `start`
+        pos = f.tell()
+        while end is None or pos < end:
+            raw = f.readline()
+            if not raw: break
+            pos += len(raw)
+            yield raw.decode('utf-8')
+
+def parse_jsonl(ref: MemberRef, start: int = 0, end: int = None):
+    for line in _lines(ref, start, end):
+        line = line.strip()
+        if not line: continue
+        try:
+            yield _loads(line)
+        except Exception:
+            continue
+
+def to_row(obj: Dict[str, Any]) -> Dict[str, Any]:
+    place_id = obj.get('gmap_id') or ''
+    user_id = obj.get('user_id') or ''
+    created_at = obj.get('time') or ''
+    return {
+        'review_id': f"{place_id}_{user_id}_{created_at}",
+        'place_id': place_id,
+        'place_name': '',
+        'place_category': '',
+        'city': '',
+        'text': obj.get('text') or '',
+        'rating': obj.get('rating') or '',
+        'created_at': created_at,
+        'user_id': user_id,
+        'user_name': obj.get('name') or '',
+        'pics': json.dumps(coerce_pics(obj.get('pics', [])), ensure_ascii=False)
+    }
+
+def plan_shards(refs: List[MemberRef], shard_bytes: int) -> List[Tuple[MemberRef, int, int]]:
+    # plain files are cut into byte ranges; compressed members are read as one stream
+    shards = []
+    for ref in refs:
+        if not ref.seekable:
+            shards.append((ref, 0, None))
+            continue
+        for start in range(0, max(ref.size, 1), shard_bytes):
+            shards.append((ref, start, min(start + shard_bytes, ref.size)))
+    return shards
+
+def convert_shard(args: Tuple[MemberRef, int, int, str]) -> str:
+    ref, start, end, out_path = args
+    with open(out_path, 'w', encoding='utf-8', newline='') as w:
+        writer = csv.DictWriter(w, fieldnames=FIELDS)
+        for obj in parse_jsonl(ref, start, end):
+            if not isinstance(obj, dict): continue
+            writer.writerow(to_row(obj))
+    return out_path
+
+def _append(part: str, w) -> None:
+    if isinstance(w, FrameWriter):
+        if os.path.getsize(part):
+            # everything but rating as str, so epoch times stay digit strings in every shard
+            w.write(pd.read_csv(part, header=None, names=FIELDS, dtype={c: str for c in FIELDS if c != 'rating'}))
+    else:
+        with open(part, 'r', encoding='utf-8', newline='') as f:
+            shutil.copyfileobj(f, w)
+    os.remove(part)
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument('--input', required=True, help='Folder with McAuley JSON lines files')
-    ap.add_argument('--out', required=True, help='Output CSV path')
+    ap.add_argument('--input', required=True, help='Folder with McAuley JSON lines files (plain, .gz, or inside .zip/.tar archives)')
+    ap.add_argument('--recursive', action='store_true', help='Also read files in subfolders of --input (e.g. archives unpacked by 01_download_kaggle --unpack)')
+    ap.add_argument('--out', required=True, help='Output path (.parquet, or .csv for CSV export)')
+    ap.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Parallel shard converters')
+    ap.add_argument('--shard_mb', type=float, default=64, help='Split input files into byte ranges of this size')
     args = ap.parse_args()
 
     outp = pathlib.Path(args.out)
     outp.parent.mkdir(parents=True, exist_ok=True)
 
-    fields = ['review_id','place_id','place_name','place_category','city','text','rating','created_at','user_id','user_name','pics']
-    w = open(outp, 'w', encoding='utf-8', newline='')
-    writer = csv.DictWriter(w, fieldnames=fields)
-    writer.writeheader()
-
     in_dir = pathlib.Path(args.input)
-    for p in in_dir.glob('*.json*'):
-        for obj in parse_jsonl(p):
-            place_id = obj.get('gmap_id') or ''
-            user_id = obj.get('user_id') or ''
-            user_name = obj.get('name') or ''
-            text = obj.get('text') or ''
-            rating = obj.get('rating') or ''
-            created_at = obj.get('time') or ''
-            pics = coerce_pics(obj.get('pics', []))
-
-            writer.writerow({
-                'review_id': f"{place_id}_{user_id}_{created_at}",
-                'place_id': place_id,
-                'place_name': '',
-                'place_category': '',
-                'city': '',
-                'text': text,
-                'rating': rating,
-                'created_at': created_at,
-                'user_id': user_id,
-                'user_name': user_name,
-                'pics': json.dumps(pics, ensure_ascii=False)
-            })
-
-    w.close()
+    shards = plan_shards(list_members(in_dir, ('*.json*',), recursive=args.recursive), max(1, int(args.shard_mb * 2**20)))
+    tmp = tempfile.mkdtemp(prefix='mcauley_', dir=outp.parent)
+    jobs = [(p, s, e, os.path.join(tmp, f"{i:06d}.csv")) for i, (p, s, e) in enumerate(shards)]
+    try:
+        with (FrameWriter(outp) if is_parquet(outp) else open(outp, 'w', encoding='utf-8', newline='')) as w:
+            if not isinstance(w, FrameWriter):
+                csv.DictWriter(w, fieldnames=FIELDS).writeheader()
+            # shards come back in plan order, so rows keep the sequential file/line order
+            if args.workers > 1 and len(jobs) > 1:
+                with ProcessPoolExecutor(max_workers=args.workers) as ex:
+                    for part in ex.map(convert_shard, jobs):
+                        _append(part, w)
+            else:
+                for job in jobs:
+                    _append(convert_shard(job), w)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
     print(f"Wrote {args.out}")
 
 if __name__ == '__main__':
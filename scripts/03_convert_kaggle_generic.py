@@ -1,49 +1,88 @@
 
-import os, argparse, pathlib, json
+import os, argparse, pathlib, json, sys
+from pathlib import Path
+import numpy as np
 import pandas as pd
 
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from src.archive_io import list_members, open_member
+from src.storage import FrameWriter
+
+# unified column -> source column of the generic Kaggle schema
+COLUMN_MAP = {
+    'place_id': 'business_id',
+    'place_name': 'business_name',
+    'place_category': 'rating_category',
+    'city': 'city',
+    'text': 'text',
+    'rating': 'rating',
+    'created_at': 'created_at',
+    'user_id': 'author_id',
+    'user_name': 'author_name',
+}
+# only these are read, all as text: no per-chunk type guessing, ids and times kept verbatim
+SOURCE_COLUMNS = [*COLUMN_MAP.values(), 'photo']
+# the GMR-PL eval download (folder data/raw/gmr_pl, archive gmr-pl-fake-reviews-dataset.zip) is never training data
+EVAL_MARKERS = ('gmr_pl', 'gmr-pl')
+# printable ASCII without '"' and '\\' is emitted by json.dumps unchanged
+PLAIN_JSON_RE = r'[ !#-\[\]-~]*'
+
+def encode_pics(photo: pd.Series) -> pd.Series:
+    """json.dumps([v]) for non-blank strings, "[]" otherwise, without a per-row loop for plain values."""
+    vals = photo.dropna().astype(str)
+    vals = vals[vals.str.strip().ne('')]
+    out = pd.Series("[]", index=photo.index, dtype=object)
+    plain = vals.str.fullmatch(PLAIN_JSON_RE).astype(bool)
+    out[vals.index[plain]] = '["' + vals[plain] + '"]'
+    out[vals.index[~plain]] = [json.dumps([v]) for v in vals[~plain]]
+    return out
+
+def convert_chunk(df: pd.DataFrame, offset: int) -> pd.DataFrame:
+    n = len(df)
+    df_out = pd.DataFrame(index=pd.RangeIndex(n))
+    df_out['review_id'] = 'kaggle_' + pd.Series(np.arange(offset, offset + n)).astype(str)
+    for dst, src in COLUMN_MAP.items():
+        # a column missing from every file is blank; missing from some files is null there (as after a concat)
+        df_out[dst] = df[src].to_numpy() if src in df.columns else ''
+    df_out['pics'] = encode_pics(df['photo']).to_numpy() if 'photo' in df.columns else "[]"
+    return df_out
+
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument('--input', required=True, help='Folder with Kaggle CSVs')
-    ap.add_argument('--out', required=True, help='Output CSV path')
+    ap.add_argument('--input', required=True, help='Folder with Kaggle CSVs (plain, .gz, or inside .zip/.tar archives)')
+    ap.add_argument('--recursive', action='store_true', help='Also read files in subfolders of --input (e.g. archives unpacked by 01_download_kaggle --unpack)')
+    ap.add_argument('--out', required=True, help='Output path (.parquet, or .csv for CSV export)')
+    ap.add_argument('--chunksize', type=int, default=200_000, help='Rows per chunk; memory does not grow with the input size')
     args = ap.parse_args()
 
     in_dir = pathlib.Path(args.input)
     outp = pathlib.Path(args.out); outp.parent.mkdir(parents=True, exist_ok=True)
 
-    csvs = list(in_dir.glob('*.csv'))
+    csvs = list_members(in_dir, ('*.csv',), recursive=args.recursive)
+    skipped = [ref for ref in csvs if any(m in str(ref).lower() for m in EVAL_MARKERS)]
+    if skipped:
+        print(f"Skipping {len(skipped)} GMR-PL eval CSV(s), e.g. {skipped[0]}")
+        csvs = [ref for ref in csvs if ref not in skipped]
     if not csvs:
         print("No CSV files found in input folder.")
         return
-    dfs = [pd.read_csv(p) for p in csvs]
-    df = pd.concat(dfs, ignore_index=True)
-
-    # Map columns from generic schema to unified schema
-    df_out = pd.DataFrame()
-    df_out['review_id'] = df.index.map(lambda i: f"kaggle_{i}")
-    df_out['place_id'] = df.get('business_id', pd.Series(['']*len(df)))
-    df_out['place_name'] = df.get('business_name', '')
-    df_out['place_category'] = df.get('rating_category', '')
-    df_out['city'] = df.get('city','')
-    df_out['text'] = df.get('text','')
-    df_out['rating'] = df.get('rating', '')
-    df_out['created_at'] = df.get('created_at', '')
-    df_out['user_id'] = df.get('author_id', '')
-    df_out['user_name'] = df.get('author_name', '')
-    # photo path or URL can be in 'photo' column
-    pics = []
-    if 'photo' in df.columns:
-        for v in df['photo']:
-            if isinstance(v, str) and v.strip():
-                pics.append(json.dumps([v]))
-            else:
-                pics.append("[]")
-    else:
-        pics = ["[]"]*len(df)
-    df_out['pics'] = pics
-
-    df_out.to_csv(outp, index=False)
-    print(f"Wrote {args.out} with {len(df_out)} rows.")
+    headers = []
+    for ref in csvs:
+        with open_member(ref) as f:
+            headers.append(list(pd.read_csv(f, nrows=0).columns))
+    present = [c for c in SOURCE_COLUMNS if any(c in h for h in headers)]
+
+    offset = 0
+    with FrameWriter(outp) as w:
+        for ref, header in zip(csvs, headers):
+            usecols = [c for c in present if c in header]
+            with open_member(ref) as f:
+                for chunk in pd.read_csv(f, usecols=usecols or None, dtype=str, chunksize=args.chunksize):
+                    w.write(convert_chunk(chunk.reindex(columns=present), offset))
+                    offset += len(chunk)
+    print(f"Wrote {args.out} with {offset} rows.")
 
 if __name__ == '__main__':
     main()
@@ -1,35 +1,45 @@
 """
 Convert the GMR-PL fake/real Kaggle dataset into the unified CSV schema.
 
-Input (unzipped under data/raw/):
+Input (data/raw/gmr_pl/ from 01_download_kaggle, plain or inside the downloaded .zip; only
+the GMR-PL download may be in that folder, since the largest CSV is taken):
 - Tries to find a CSV with text + label columns. It supports several common names:
   text column candidates: ["text", "review", "content", "opinion"]
   label column candidates (1=fake, 0=real): ["label", "is_fake", "fake", "target", "y"]
 
 Output:
-- data/processed/gmrpl_converted.csv with columns:
+- data/processed/gmrpl_converted.parquet (or .csv) with columns:
   review_id, place_id, place_name, place_category, city, text, rating, created_at,
   user_id, user_name, pics, is_fake
 """
-import argparse, pathlib, pandas as pd, json
+import argparse, pathlib, pandas as pd, json, sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+from src.archive_io import list_members, open_member
+from src.storage import write_frame
 
 TEXT_CANDS = ["text", "review", "content", "opinion"]
 LABEL_CANDS = ["label", "is_fake", "fake", "target", "y"]
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--input", required=True, help="Folder with unzipped GMR-PL CSVs")
-    ap.add_argument("--out", required=True, help="Output CSV path")
+    ap.add_argument("--input", required=True, help="Folder holding only the GMR-PL download (data/raw/gmr_pl), or the archive itself")
+    ap.add_argument("--recursive", action="store_true", help="Also read files in subfolders of --input (e.g. archives unpacked by 01_download_kaggle --unpack)")
+    ap.add_argument("--out", required=True, help="Output path (.parquet, or .csv for CSV export)")
     args = ap.parse_args()
 
     in_dir = pathlib.Path(args.input)
-    csvs = list(in_dir.glob("*.csv"))
+    csvs = list_members(in_dir, ("*.csv",), recursive=args.recursive)
     if not csvs:
         print("No CSVs found in", in_dir)
         return
     # Heuristic: pick the largest CSV
-    csvs.sort(key=lambda p: p.stat().st_size, reverse=True)
-    df = pd.read_csv(csvs[0])
+    csvs.sort(key=lambda r: r.size, reverse=True)
+    with open_member(csvs[0]) as f:
+        df = pd.read_csv(f)
 
     text_col = next((c for c in TEXT_CANDS if c in df.columns), None)
     label_col = next((c for c in LABEL_CANDS if c in df.columns), None)
@@ -61,7 +71,7 @@ def main():
     })
     out_path = pathlib.Path(args.out)
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out.to_csv(out_path, index=False, encoding="utf-8")
+    write_frame(out, out_path)
     print(f"Wrote {out_path} with {len(out)} rows.")
 
 if __name__ == "__main__":
@@ -6,37 +6,96 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 import pandas as pd
-from src.data_prep import clean_reviews, business_disjoint_split
+from src.data_prep import business_disjoint_split, split_place_ids
+from src.feature_cache import FeatureCache, clean_row_feats
 from src.features import add_metadata_feats
+from src.near_dup import NearDupIndex
+from src.streaming import collect_state, featurize_chunks
+from src.storage import FrameWriter, iter_frames, read_columns, read_frame, write_frame
+
+# ids are labels: reading them as str keeps "00123" intact and every chunk on one dtype
+ID_DTYPES = {"review_id": str, "user_id": str, "place_id": str}
+SPLIT_CFG = type("tmp",(object,),{"test_size":0.1,"val_size":0.1,"random_state":42})()
+
+def input_files(in_dir):
+    files = []
+    for p in [*in_dir.glob("*.csv"), *in_dir.glob("*.parquet")]:
+        if 'train' in p.name or 'val' in p.name or 'test' in p.name: continue
+        try:
+            cols = read_columns(p)
+        except Exception:
+            continue
+        files.append((p, cols + ["source"]))
+    return files
+
+def chunk_reader(files, chunksize):
+    # same column union and order as pd.concat of the whole files
+    union = list(dict.fromkeys(c for _, cols in files for c in cols))
+    def read_chunks(columns=None):
+        wanted = union if columns is None else [c for c in union if c in columns]
+        for p, _ in files:
+            for d in iter_frames(p, wanted, chunksize=chunksize, dtype=ID_DTYPES):
+                d["source"] = p.stem
+                yield d.reindex(columns=wanted).reset_index(drop=True)
+    return read_chunks
+
+def run_chunked(files, out_dir, fmt, chunksize, nd_index, epoch_unit, n_jobs, feature_cache):
+    read_chunks = chunk_reader(files, chunksize)
+    state = collect_state(read_chunks, near_dup_index=nd_index, epoch_unit=epoch_unit)
+    splits = dict(zip(["train", "val", "test"], split_place_ids(state.place_ids(), SPLIT_CFG)))
+    writers = {name: FrameWriter(out_dir / f"{name}.{fmt}") for name in splits}
+    try:
+        for df in featurize_chunks(read_chunks, state, n_jobs=n_jobs, feature_cache=feature_cache):
+            for name, ids in splits.items():
+                writers[name].write(df[df["place_id"].isin(ids)])
+    finally:
+        for w in writers.values():
+            w.close()
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument('--input', required=True, help='Folder with processed CSVs (converted)')
-    ap.add_argument('--out', required=True, help='Output folder to write train/val/test CSVs')
+    ap.add_argument('--input', required=True, help='Folder with converted .parquet/.csv files')
+    ap.add_argument('--out', required=True, help='Output folder to write train/val/test splits')
+    ap.add_argument('--format', default='parquet', choices=['parquet', 'csv'], help='Format of the written splits')
+    ap.add_argument('--epoch_unit', default='ms', choices=['s', 'ms', 'us', 'ns', 'auto'], help='Unit of numeric created_at values; auto guesses it per input file')
+    ap.add_argument('--near_dup_index', default=None, help='Optional MinHash-LSH index directory; created if missing, updated in place (known review_ids keep their rows)')
+    ap.add_argument('--chunksize', type=int, default=None, help='Process the input in chunks of this many rows (two passes, bounded memory)')
+    ap.add_argument('--n_jobs', type=int, default=1, help='Worker processes for language detection')
+    ap.add_argument('--feature_cache', default=None, help='Optional sqlite path; rows seen in earlier runs skip cleaning and per-row features')
     args = ap.parse_args()
     in_dir = pathlib.Path(args.input)
     out_dir = pathlib.Path(args.out); out_dir.mkdir(parents=True, exist_ok=True)
 
-    dfs = []
-    for p in in_dir.glob("*.csv"):
-        if 'train' in p.name or 'val' in p.name or 'test' in p.name: continue
-        try:
-            dfs.append(pd.read_csv(p))
-        except Exception:
-            pass
-    if not dfs:
-        print("No converted CSVs found. Place a CSV in data/processed or run convert scripts first.")
+    files = input_files(in_dir)
+    if not files:
+        print("No converted files found. Place a CSV/Parquet file in data/processed or run convert scripts first.")
         return
-    df = pd.concat(dfs, ignore_index=True)
+    nd_index = None
+    if args.near_dup_index:
+        nd_index = NearDupIndex(path=args.near_dup_index)
+
+    feature_cache = FeatureCache(args.feature_cache) if args.feature_cache else None
+
+    if args.chunksize:
+        run_chunked(files, out_dir, args.format, args.chunksize, nd_index, args.epoch_unit, args.n_jobs, feature_cache)
+    else:
+        dfs = []
+        for p, _ in files:
+            d = read_frame(p, dtype=ID_DTYPES)
+            d["source"] = p.stem
+            dfs.append(d)
+        df = pd.concat(dfs, ignore_index=True)
 
-    df = clean_reviews(df)
-    df = add_metadata_feats(df)
-    tr, val, te = business_disjoint_split(df, cfg=type("tmp",(object,),{"test_size":0.1,"val_size":0.1,"random_state":42})())
+        df = clean_row_feats(df, feature_cache, n_jobs=args.n_jobs)
+        df = add_metadata_feats(df, near_dup_index=nd_index, epoch_unit=args.epoch_unit, row_feats=False)
+        tr, val, te = business_disjoint_split(df, cfg=SPLIT_CFG)
 
-    tr.to_csv(out_dir / "train.csv", index=False)
-    val.to_csv(out_dir / "val.csv", index=False)
-    te.to_csv(out_dir / "test.csv", index=False)
-    print("Wrote train/val/test CSVs to", out_dir)
+        write_frame(tr, out_dir / f"train.{args.format}")
+        write_frame(val, out_dir / f"val.{args.format}")
+        write_frame(te, out_dir / f"test.{args.format}")
+    if nd_index is not None:
+        nd_index.save(args.near_dup_index)
+    print(f"Wrote train/val/test {args.format} files to", out_dir)
 
 if __name__ == '__main__':
     main()
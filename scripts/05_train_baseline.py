@@ -8,39 +8,112 @@ if str(ROOT) not in sys.path:
 import pandas as pd
 from src.config import Config, LABELS
 from src.features import add_metadata_feats
-from src.rules import weak_labels
-from src.models.multilabel import MultiLabelSklearn
+from src.rules import RULE_FEATURES, rule_features, weak_label_matrix, label_lists
+from src.storage import iter_frames, read_frame
+from src.models.multilabel import MultiLabelSklearn, MultiLabelStreaming
+from src.models.registry import ModelRegistry
+from src.sweep import fit_config, run_sweep
 
 def prepare_training_data(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
-    df["weak_labels"] = df["text"].apply(weak_labels)
+    df["weak_labels"] = label_lists(weak_label_matrix(rule_features(df)))
     return df
 
 def to_multi_list(df: pd.DataFrame):
     return [labs if isinstance(labs, list) else [] for labs in df["weak_labels"].tolist()]
 
+def labelled(df: pd.DataFrame):
+    if not set(RULE_FEATURES).issubset(df.columns):
+        df = add_metadata_feats(df)
+    df = prepare_training_data(df)
+    return df["text"].tolist(), to_multi_list(df)
+
+def parse_list(value: str, cast):
+    return [cast(v) for v in value.split(',') if v.strip()]
+
+def parse_ngram(value: str):
+    lo, hi = value.split('-')
+    return int(lo), int(hi)
+
+def sweep(args, cfg, train_df: pd.DataFrame):
+    """Grid over vectorizer x C on cached matrices; returns the best config's model and its validation metrics."""
+    val_inputs = [args.val_input, str(Path(args.val_input).with_suffix('.csv'))]
+    val_path = next((p for p in val_inputs if os.path.exists(p)), None)
+    if val_path is not None:
+        val_df = read_frame(val_path, columns=["text", *RULE_FEATURES])
+    else:
+        print("No validation split found; holding out 20% of the training rows.")
+        val_df = train_df.sample(frac=0.2, random_state=42)
+        train_df = train_df.drop(val_df.index)
+    tr_texts, tr_labels = labelled(train_df)
+    val_texts, val_labels = labelled(val_df)
+
+    vectorizers = [(mf, ng) for mf in parse_list(args.max_features, int) for ng in parse_list(args.ngrams, parse_ngram)]
+    per_label, summary = run_sweep(tr_texts, tr_labels, val_texts, val_labels, vectorizers,
+                                   parse_list(args.C, float), labels=LABELS, n_jobs=args.n_jobs)
+    os.makedirs(cfg.outputs_dir, exist_ok=True)
+    summary.drop(columns="matrix_dir").to_csv(os.path.join(cfg.outputs_dir, f"sweep_{args.run_name}.csv"), index=False)
+    per_label.drop(columns="matrix_dir").to_csv(os.path.join(cfg.outputs_dir, f"sweep_{args.run_name}_per_label.csv"), index=False)
+    with pd.option_context('display.width', 200, 'display.max_columns', 20):
+        print(summary.drop(columns="matrix_dir").to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    best = summary.iloc[0]
+    print(f"Best: max_features={best['max_features']} ngram_range={best['ngram_range']} C={best['C']}")
+    metrics = {k: float(best[k]) for k in ("macro_f1", "mean_avg_precision")}
+    metrics.update(max_features=int(best["max_features"]), ngram_range=best["ngram_range"], C=float(best["C"]))
+    return fit_config(best, tr_labels, labels=LABELS), metrics
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument('--run_name', default='baseline')
-    ap.add_argument('--input', default='data/processed/train.csv')
+    ap.add_argument('--input', default='data/processed/train.parquet')
+    ap.add_argument('--backend', choices=['tfidf', 'hashing'], default='tfidf',
+                    help='hashing: out-of-core HashingVectorizer + SGD, trained chunk by chunk')
+    ap.add_argument('--chunksize', type=int, default=200_000, help='Rows per chunk for --backend hashing')
+    ap.add_argument('--epochs', type=int, default=1, help='Passes over the data for --backend hashing')
+    ap.add_argument('--sweep', action='store_true',
+                    help='Grid-search the tfidf backend on cached matrices and keep the best config')
+    ap.add_argument('--val_input', default='data/processed/val.parquet', help='Validation split for --sweep')
+    ap.add_argument('--max_features', default='5000,20000,50000', help='--sweep: comma-separated vocabulary sizes')
+    ap.add_argument('--ngrams', default='1-1,1-2', help='--sweep: comma-separated n-gram ranges')
+    ap.add_argument('--C', default='0.25,1,4', help='--sweep: comma-separated inverse regularization strengths')
+    ap.add_argument('--n_jobs', type=int, default=-1, help='--sweep: parallel fits (-1 = all cores)')
+    ap.add_argument('--promote', action='store_true', help='Make the new registry version the served one')
     args = ap.parse_args()
 
     cfg = Config()
-    if os.path.exists(args.input):
-        df = pd.read_csv(args.input)
-    else:
-        print("No processed train.csv found; falling back to sample data.")
-        df = pd.read_csv("data/sample_reviews.csv")
+    inputs = [args.input, str(Path(args.input).with_suffix('.csv'))]
+    path = next((p for p in inputs if os.path.exists(p)), None)
+    if path is None:
+        print("No processed train split found; falling back to sample data.")
+    # training needs the text and the rule feature columns 04_clean_and_split already computed
+    columns = ["text", *RULE_FEATURES]
 
-    df = add_metadata_feats(df)
-    df = prepare_training_data(df)
+    if args.sweep and args.backend != 'tfidf':
+        ap.error('--sweep only supports --backend tfidf')
 
-    clf = MultiLabelSklearn(labels=LABELS)
-    clf.fit(df["text"].tolist(), to_multi_list(df))
+    metrics = {}
+    if args.sweep:
+        df = read_frame(path, columns=columns) if path is not None else pd.read_csv("data/sample_reviews.csv")
+        clf, metrics = sweep(args, cfg, df)
+    elif args.backend == 'hashing':
+        def read_chunks():
+            if path is None:
+                yield labelled(pd.read_csv("data/sample_reviews.csv"))
+                return
+            for chunk in iter_frames(path, columns=columns, chunksize=args.chunksize):
+                yield labelled(chunk)
+        clf = MultiLabelStreaming(labels=LABELS, epochs=args.epochs).fit_chunks(read_chunks)
+    else:
+        df = read_frame(path, columns=columns) if path is not None else pd.read_csv("data/sample_reviews.csv")
+        clf = MultiLabelSklearn(labels=LABELS)
+        clf.fit(*labelled(df))
     os.makedirs(cfg.models_dir, exist_ok=True)
     path = os.path.join(cfg.models_dir, f"multilabel_{args.run_name}.joblib")
     clf.save(path)
     print("Saved model to", path)
+    registry = ModelRegistry(os.path.join(cfg.models_dir, "registry"))
+    version = registry.register(clf, metrics=metrics, source=os.path.basename(path), promote=args.promote)
+    print(f"Registered {version}" + (" (now current)" if args.promote else f"; serve it with: python -m src.models.registry promote {version}"))
 
 if __name__ == '__main__':
     main()
@@ -6,7 +6,7 @@ We map our multi-label outputs to "fake" in two ways:
   B) any_violation:      predict fake if max(P(Ad), P(Irrelevant), P(Rant), P(Spam)) >= 0.5
 
 Usage:
-  python scripts/06_eval_on_gmrpl.py --input data/processed/gmrpl_converted.csv --model models
+  python scripts/06_eval_on_gmrpl.py --input data/processed/gmrpl_converted.parquet --model models
 """
 import argparse, os, pandas as pd, numpy as np, sys
 from pathlib import Path
@@ -15,36 +15,32 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 from sklearn.metrics import accuracy_score, precision_recall_fscore_support
-from glob import glob
 
 from src.config import LABELS
-from src.models.multilabel import MultiLabelSklearn
+from src.models.registry import load_serving_model
 from src.data_prep import clean_reviews
 from src.features import add_metadata_feats
-
-def load_latest_model(models_dir: str) -> str:
-    cands = sorted(glob(os.path.join(models_dir, "*.joblib")))
-    if not cands:
-        raise FileNotFoundError(f"No model .joblib found under {models_dir}")
-    return cands[-1]
+from src.storage import read_frame
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--input", required=True, help="Path to gmrpl_converted.csv")
-    ap.add_argument("--model", default="models", help="Directory containing trained .joblib model(s)")
+    ap.add_argument("--input", required=True, help="Path to gmrpl_converted.parquet (or .csv)")
+    ap.add_argument("--model", default="models", help="Models directory (registry under <dir>/registry)")
+    ap.add_argument("--version", default=None, help="Registry version to evaluate (default: the current one)")
     args = ap.parse_args()
 
-    df = pd.read_csv(args.input)
+    df = read_frame(args.input, columns=["text", "is_fake"])
     if "is_fake" not in df.columns:
-        raise ValueError("Expected 'is_fake' column in the converted GMR-PL CSV.")
+        raise ValueError("Expected 'is_fake' column in the converted GMR-PL file.")
 
     # Prepare text like the app does (clean, features)
     df = clean_reviews(df)
     df = add_metadata_feats(df)
 
     # Load model
-    model_path = load_latest_model(args.model)
-    model = MultiLabelSklearn.load(model_path)
+    model = load_serving_model(args.model, args.version)
+    if model is None:
+        raise FileNotFoundError(f"No registered or multilabel_*.joblib model found under {args.model}")
 
     # Predict probabilities
     probs = model.predict_proba(df["text"].fillna("").tolist())
@@ -71,7 +67,7 @@ def main():
     res_b = summarize("any_violation", y_pred_b)
 
     print("=== Evaluation on GMR-PL ===")
-    print("Model:", os.path.basename(model_path))
+    print("Model:", getattr(model, "version", "newest .joblib (registry has no current version)"))
     for res in [res_a, res_b]:
         print(f"{res['name']}: acc={res['accuracy']:.3f}  p={res['precision']:.3f}  r={res['recall']:.3f}  f1={res['f1']:.3f}")
 
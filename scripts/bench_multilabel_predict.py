@@ -0,0 +1,70 @@
+"""
+Microbenchmark: MultiLabelSklearn.predict_proba, per-label OneVsRest path vs. the
+fused float32 path from .compile().
+
+Times the classifier stage alone (features computed once) and end to end, and
+checks that both paths agree.
+
+Usage:
+  python scripts/bench_multilabel_predict.py                      # baseline fit on the sample data
+  python scripts/bench_multilabel_predict.py --model models/multilabel_baseline_sklearn.joblib --rows 500000
+"""
+import argparse, sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+import numpy as np
+import pandas as pd
+from src.config import LABELS
+from src.features import add_metadata_feats
+from src.rules import rule_features, weak_label_matrix, label_lists
+from src.models.multilabel import MultiLabelSklearn
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--model', default=None, help='Saved .joblib model; default fits one on data/sample_reviews.csv')
+    ap.add_argument('--rows', type=int, default=200_000, help='Rows to score (sample texts repeated)')
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--atol', type=float, default=1e-5)
+    args = ap.parse_args()
+
+    df = pd.read_csv("data/sample_reviews.csv")
+    if args.model:
+        slow = MultiLabelSklearn.load(args.model)
+        fast = MultiLabelSklearn.load(args.model).compile()
+    else:
+        df = add_metadata_feats(df)
+        labels = label_lists(weak_label_matrix(rule_features(df)))
+        slow = MultiLabelSklearn(labels=LABELS).fit(df["text"].tolist(), labels)
+        fast = MultiLabelSklearn(labels=LABELS).fit(df["text"].tolist(), labels).compile()
+
+    texts = df["text"].fillna("").tolist()
+    texts = (texts * (args.rows // len(texts) + 1))[:args.rows]
+    X = slow._features(texts)
+    X32 = fast._features(texts)  # compiled models cast their features to float32
+
+    t_slow, p_slow = best_of(lambda: slow._proba(X), args.repeat)
+    t_fast, p_fast = best_of(lambda: fast._proba(X32), args.repeat)
+    t_slow_e2e, _ = best_of(lambda: slow.predict_proba(texts), 1)
+    t_fast_e2e, _ = best_of(lambda: np.vstack(list(fast.iter_predict_proba(texts))), 1)
+
+    err = float(np.abs(p_slow - p_fast).max()) if len(texts) else 0.0
+    print(f"rows={len(texts)}  nnz={X.nnz}  features={X.shape[1]}  labels={len(slow.labels)}")
+    print(f"classifier  ovr float64: {t_slow*1e3:9.1f} ms   fused float32: {t_fast*1e3:9.1f} ms   x{t_slow/max(t_fast, 1e-12):.1f}")
+    print(f"end to end  ovr float64: {t_slow_e2e*1e3:9.1f} ms   fused, chunked: {t_fast_e2e*1e3:9.1f} ms")
+    print(f"max |p_ovr - p_fused| = {err:.2e}  ({'ok' if err <= args.atol else 'ABOVE atol'})")
+    if err > args.atol:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
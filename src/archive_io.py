@@ -0,0 +1,101 @@
+import fnmatch, gzip, io, pathlib, struct, tarfile, zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import IO, Iterable, Iterator, List, Optional
+
+# Read raw data files where they lie: plain files, .gz files, and members of
+# .zip / .tar(.gz|.bz2|.xz) archives are all listed as MemberRefs and opened as
+# decompressing streams, so converters never need an unpacked copy on disk.
+
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+@dataclass(frozen=True)
+class MemberRef:
+    path: str                # file on disk
+    member: Optional[str]    # member inside a zip/tar; None for plain and .gz files
+    size: int                # uncompressed size (best effort for .gz)
+
+    @property
+    def name(self) -> str:
+        """Logical file name: the member's base name, or the file name without .gz."""
+        if self.member is not None:
+            return pathlib.PurePosixPath(self.member).name
+        p = pathlib.Path(self.path)
+        return p.name[:-3] if p.name.endswith(".gz") else p.name
+
+    @property
+    def stem(self) -> str:
+        return pathlib.Path(self.name).stem
+
+    @property
+    def seekable(self) -> bool:
+        """Plain files support byte-range reads (see 02_convert_mcauley.py)."""
+        return self.member is None and not self.path.endswith(".gz")
+
+    def __str__(self) -> str:
+        return self.path if self.member is None else f"{self.path}::{self.member}"
+
+def _gzip_size(path: pathlib.Path) -> int:
+    # ISIZE trailer: uncompressed size mod 2**32, good enough to rank files by size
+    with open(path, "rb") as f:
+        f.seek(-4, 2)
+        return struct.unpack("<I", f.read(4))[0]
+
+def _matches(name: str, patterns: Iterable[str]) -> bool:
+    return any(fnmatch.fnmatch(name, pat) for pat in patterns)
+
+def list_members(directory, patterns: Iterable[str] = ("*",), recursive: bool = False) -> List[MemberRef]:
+    """Plain files and archive members in `directory` (or in one archive) whose logical name matches `patterns`.
+
+    Only files directly in `directory` are listed unless `recursive` is set, so
+    datasets unpacked into subfolders do not leak into each other's inputs.
+    """
+    patterns = tuple(patterns)
+    root = pathlib.Path(directory)
+    refs: List[MemberRef] = []
+    for p in ([root] if root.is_file() else (root.rglob("*") if recursive else root.glob("*"))):
+        if not p.is_file():
+            continue
+        if p.name.endswith(TAR_SUFFIXES) and tarfile.is_tarfile(p):
+            with tarfile.open(p, "r:*") as t:
+                refs += [MemberRef(str(p), m.name, m.size) for m in t.getmembers()
+                         if m.isfile() and _matches(pathlib.PurePosixPath(m.name).name, patterns)]
+        elif zipfile.is_zipfile(p):
+            with zipfile.ZipFile(p) as z:
+                refs += [MemberRef(str(p), i.filename, i.file_size) for i in z.infolist()
+                         if not i.is_dir() and _matches(pathlib.PurePosixPath(i.filename).name, patterns)]
+        else:
+            ref = MemberRef(str(p), None, _gzip_size(p) if p.name.endswith(".gz") else p.stat().st_size)
+            if _matches(ref.name, patterns):
+                refs.append(ref)
+    return refs
+
+@contextmanager
+def open_member(ref: MemberRef, encoding: Optional[str] = None) -> Iterator[IO]:
+    """Binary stream over the (decompressed) member; text stream if `encoding` is given."""
+    with _open_binary(ref) as f:
+        if encoding is None:
+            yield f
+        else:
+            # newline="" keeps line endings as stored, like csv and the json readers expect
+            text = io.TextIOWrapper(f, encoding=encoding, newline="")
+            try:
+                yield text
+            finally:
+                if not text.closed:
+                    text.detach()  # the underlying stream is closed by _open_binary
+
+@contextmanager
+def _open_binary(ref: MemberRef) -> Iterator[IO[bytes]]:
+    if ref.member is None:
+        opener = gzip.open if ref.path.endswith(".gz") else open
+        with opener(ref.path, "rb") as f:
+            yield f
+    elif ref.path.endswith(TAR_SUFFIXES):
+        with tarfile.open(ref.path, "r:*") as t:
+            with t.extractfile(ref.member) as f:
+                yield f
+    else:
+        with zipfile.ZipFile(ref.path) as z:
+            with z.open(ref.member) as f:
+                yield f
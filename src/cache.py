@@ -0,0 +1,61 @@
+import hashlib, os, sqlite3, threading
+from typing import Dict, Iterable, List, Optional
+
+def text_key(*parts: str) -> str:
+    """Stable content key (hex blake2b) for one or more strings."""
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        h.update(p.encode("utf-8", "surrogatepass"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+class SqliteCache:
+    """Small persistent key -> value store (one sqlite table, values are str, bytes or numbers).
+
+    `namespace` partitions a table, e.g. by model name, so entries from different
+    models or feature versions never mix. Safe to share between threads.
+    """
+
+    def __init__(self, path: str, table: str = "cache") -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (ns TEXT, key TEXT, value BLOB, PRIMARY KEY (ns, key))")
+        self._conn.commit()
+
+    def get_many(self, keys: Iterable[str], namespace: str = "") -> Dict[str, object]:
+        keys = list(dict.fromkeys(keys))
+        out: Dict[str, object] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):  # stay below sqlite's variable limit
+                part = keys[i:i + 500]
+                q = f"SELECT key, value FROM {self.table} WHERE ns = ? AND key IN ({','.join('?' * len(part))})"
+                out.update(self._conn.execute(q, [namespace, *part]).fetchall())
+        return out
+
+    def put_many(self, items: Dict[str, object], namespace: str = "") -> None:
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(f"INSERT OR REPLACE INTO {self.table} (ns, key, value) VALUES (?, ?, ?)",
+                                   [(namespace, k, v) for k, v in items.items()])
+            self._conn.commit()
+
+    def drop_other_namespaces(self, keep: str) -> int:
+        """Delete entries of every namespace but `keep` (e.g. after a version bump); returns rows removed."""
+        with self._lock:
+            n = self._conn.execute(f"DELETE FROM {self.table} WHERE ns != ?", (keep,)).rowcount
+            self._conn.commit()
+        return n
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,13 +1,12 @@
 
 import pandas as pd
 import numpy as np
-from langdetect import detect, DetectorFactory
 from dataclasses import dataclass
-from typing import Tuple, List
+from typing import Tuple, List, Optional
 from .utils import normalize_text
 from .config import Config
-
-DetectorFactory.seed = 0
+from .langid import detect_langs
+from .translate import get_translator
 
 @dataclass
 class SplitConfig:
@@ -20,48 +19,48 @@ def load_samples() -> Tuple[pd.DataFrame, pd.DataFrame]:
     places = pd.read_csv("data/sample_places.csv")
     return reviews, places
 
-def _maybe_translate(texts: List[str]) -> List[str]:
+def needs_translation(texts: List[str], langs: List[str]) -> List[bool]:
+    """Rows _maybe_translate sends to the translator (when translation is enabled)."""
+    return [isinstance(t, str) and bool(t.strip()) and lang not in ("en", "unknown") for t, lang in zip(texts, langs)]
+
+def _maybe_translate(texts: List[str], langs: Optional[List[str]] = None, strict: bool = False) -> List[str]:
+    """Translated texts; on a translation error the originals, or the error itself if `strict`."""
     cfg = Config()
     if not cfg.translate_non_en:
         return texts
     try:
-        from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-        model_name = "Helsinki-NLP/opus-mt-mul-en"
-        tok = AutoTokenizer.from_pretrained(model_name)
-        model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
-        outs = []
-        for t in texts:
-            if not isinstance(t, str) or not t.strip():
-                outs.append(t); continue
-            try:
-                lang = detect(t)
-            except Exception:
-                lang = "unknown"
-            if lang == "en" or lang == "unknown":
-                outs.append(t)
-            else:
-                inpt = tok(t, return_tensors="pt", truncation=True, max_length=512)
-                gen = model.generate(**inpt, max_length=512)
-                outs.append(tok.decode(gen[0], skip_special_tokens=True))
+        if langs is None:
+            langs = detect_langs(texts)
+        todo = [i for i, need in enumerate(needs_translation(texts, langs)) if need]
+        if not todo:
+            return texts
+        outs = list(texts)
+        for i, out in zip(todo, get_translator().translate([texts[i] for i in todo])):
+            outs[i] = out
         return outs
     except Exception:
+        if strict:
+            raise
         return texts
 
-def clean_reviews(df: pd.DataFrame) -> pd.DataFrame:
+def clean_text(texts: pd.Series) -> pd.Series:
+    return texts.apply(normalize_text)
+
+def clean_reviews(df: pd.DataFrame, n_jobs: int = 1, strict_translate: bool = False) -> pd.DataFrame:
+    """Normalize text, detect language once (see langid.py) and translate non-English text.
+
+    n_jobs > 1 runs language detection on a process pool. A failed translation
+    leaves text_model untranslated, unless `strict_translate` (then it raises).
+    """
     df = df.copy()
-    df["text"] = df["text"].apply(normalize_text)
-    langs = []
-    for t in df["text"].tolist():
-        try:
-            langs.append(detect(t) if isinstance(t, str) and t.strip() else "unknown")
-        except Exception:
-            langs.append("unknown")
-    df["lang"] = langs
-    df["text_model"] = _maybe_translate(df["text"].tolist())
+    df["text"] = clean_text(df["text"])
+    df["lang"] = detect_langs(df["text"].tolist(), n_jobs=n_jobs)
+    df["text_model"] = _maybe_translate(df["text"].tolist(), df["lang"].tolist(), strict=strict_translate)
     return df
 
-def business_disjoint_split(df: pd.DataFrame, cfg: SplitConfig):
-    place_ids = df["place_id"].dropna().unique()
+def split_place_ids(place_ids: np.ndarray, cfg: SplitConfig):
+    """Shuffle place ids (in order of first appearance) into train/val/test id sets."""
+    place_ids = np.array(place_ids)
     rng = np.random.default_rng(cfg.random_state)
     rng.shuffle(place_ids)
     n = len(place_ids)
@@ -70,6 +69,10 @@ def business_disjoint_split(df: pd.DataFrame, cfg: SplitConfig):
     test_ids = set(place_ids[:n_test])
     val_ids = set(place_ids[n_test:n_test+n_val])
     train_ids = set(place_ids[n_test+n_val:])
+    return train_ids, val_ids, test_ids
+
+def business_disjoint_split(df: pd.DataFrame, cfg: SplitConfig):
+    train_ids, val_ids, test_ids = split_place_ids(df["place_id"].dropna().unique(), cfg)
     train = df[df["place_id"].isin(train_ids)].reset_index(drop=True)
     val = df[df["place_id"].isin(val_ids)].reset_index(drop=True)
     test = df[df["place_id"].isin(test_ids)].reset_index(drop=True)
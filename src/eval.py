@@ -2,14 +2,22 @@
 import argparse, pandas as pd
 from .config import LABELS
 from .models.multilabel import MultiLabelSklearn
+from .models.registry import load_serving_model
 from .models.relevancy_ce import RelevancyModel
+from .models.relevancy_index import place_description, place_descriptions
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--model_path", required=True)
+    ap.add_argument("--model_path", default=None, help="A saved .joblib model; default is the registry's current version")
+    ap.add_argument("--version", default=None)
     args = ap.parse_args()
 
-    model = MultiLabelSklearn.load(args.model_path)
+    if args.model_path:
+        model = MultiLabelSklearn.load(args.model_path).compile()
+    else:
+        model = load_serving_model(version=args.version)
+        if model is None:
+            raise SystemExit("No registered model; pass --model_path")
     df = pd.read_csv("data/sample_reviews.csv")
     probs = model.predict_proba(df["text"].tolist())
 
@@ -17,15 +25,16 @@ def main():
     for i, lab in enumerate(LABELS):
         print(lab, f"{probs[:,i].mean():.3f}")
 
-    places = pd.read_csv("data/sample_places.csv").set_index("place_id")
+    places = pd.read_csv("data/sample_places.csv")
     rel = RelevancyModel(); rel.load()
-    pairs = []
+    rel.index_places(places["place_id"].tolist(), place_descriptions(places))
+    places = places.set_index("place_id")
+    pairs, pair_places = [], []
     for _, r in df.iterrows():
         if r["place_id"] in places.index:
-            p = places.loc[r["place_id"]]
-            desc = f"{p['place_name']} — {p['place_category']}, {p['city']}. {p['description']}"
-            pairs.append((r["text"], desc))
-    rs = rel.score_pairs(pairs)
+            pairs.append((r["text"], place_description(places.loc[r["place_id"]])))
+            pair_places.append(r["place_id"])
+    rs = rel.score_pairs(pairs, place_ids=pair_places)
     print("Avg relevancy (demo):", float(rs.mean()) if len(rs) else "n/a")
 
 if __name__ == "__main__":
@@ -0,0 +1,89 @@
+import os, pickle
+from typing import Dict, List, Optional
+import numpy as np, pandas as pd
+from .cache import SqliteCache, text_key
+from .config import Config
+from .data_prep import clean_reviews, needs_translation
+from .features import FEATURE_VERSION, add_row_feats
+from .translate import DEFAULT_MODEL
+from .utils import RESOURCES_DIR
+
+# Content-addressed cache for the row-local, expensive part of the pipeline:
+# clean_reviews (normalization, language ID, translation) + add_row_feats.
+# A row's key hashes everything those stages read from it (raw text, user_name,
+# pics) plus a fingerprint of the code/config that shapes their output
+# (FEATURE_VERSION, lexicon word lists, translation settings). Only unseen rows
+# are computed; cached rows are merged back by position. Cross-row and cheap
+# vectorized columns (dt, bursts, dups, distances) are always recomputed.
+
+DEFAULT_PATH = os.path.join(Config.data_dir, "cache", "features.sqlite")
+KEY_COLUMNS = ["text", "user_name", "pics"]
+
+_ROW_COLUMNS: Optional[List[str]] = None
+
+def row_columns() -> List[str]:
+    """Columns clean_reviews + add_row_feats write (found once with an empty probe row)."""
+    global _ROW_COLUMNS
+    if _ROW_COLUMNS is None:
+        _ROW_COLUMNS = list(add_row_feats(clean_reviews(pd.DataFrame({"text": [""]}))).columns)
+    return _ROW_COLUMNS
+
+def feature_fingerprint() -> str:
+    parts = [f"v{FEATURE_VERSION}", f"translate={Config.translate_non_en}:{DEFAULT_MODEL}"]
+    for path in sorted(RESOURCES_DIR.glob("*.txt")):
+        parts.append(path.name + ":" + path.read_text(encoding="utf-8", errors="replace"))
+    return text_key(*parts)
+
+class FeatureCache:
+    """sqlite store of per-row clean/feature columns; entries of older fingerprints are dropped on open."""
+
+    def __init__(self, path: str = DEFAULT_PATH) -> None:
+        self.store = SqliteCache(path, table="row_features")
+        self.fingerprint = feature_fingerprint()
+        self.store.drop_other_namespaces(self.fingerprint)
+
+    def row_keys(self, df: pd.DataFrame) -> List[str]:
+        cols = [df[c].tolist() if c in df.columns else [None] * len(df) for c in KEY_COLUMNS]
+        return [text_key(*map(str, vals)) for vals in zip(*cols)]
+
+    def get(self, keys: List[str]) -> Dict[str, dict]:
+        return {k: pickle.loads(v) for k, v in self.store.get_many(keys, namespace=self.fingerprint).items()}
+
+    def put(self, keys: List[str], rows: pd.DataFrame) -> None:
+        recs = rows.to_dict("records")
+        self.store.put_many({k: pickle.dumps(r, protocol=pickle.HIGHEST_PROTOCOL) for k, r in zip(keys, recs)},
+                            namespace=self.fingerprint)
+
+def clean_row_feats(df: pd.DataFrame, cache: Optional[FeatureCache] = None, n_jobs: int = 1) -> pd.DataFrame:
+    """add_row_feats(clean_reviews(df)), computing only the rows `cache` has not seen.
+
+    Feed the result to add_metadata_feats(..., row_feats=False). If translation
+    fails, the affected rows keep their untranslated text_model as usual but are
+    not cached, so the next run retries them.
+    """
+    if cache is None or not len(df):
+        return add_row_feats(clean_reviews(df, n_jobs=n_jobs))
+    keys = cache.row_keys(df)
+    hits = cache.get(keys)
+    miss = np.array([k not in hits for k in keys], dtype=bool)
+    parts = []
+    if miss.any():
+        todo = df.iloc[np.flatnonzero(miss)]
+        try:
+            done = add_row_feats(clean_reviews(todo, n_jobs=n_jobs, strict_translate=True))
+            cacheable = np.ones(len(done), dtype=bool)
+        except Exception:
+            done = add_row_feats(clean_reviews(todo, n_jobs=n_jobs))
+            cacheable = ~np.array(needs_translation(done["text"].tolist(), done["lang"].tolist()), dtype=bool)
+        cols = row_columns()
+        miss_keys = [k for k, m in zip(keys, miss) if m]
+        cache.put([k for k, c in zip(miss_keys, cacheable) if c], done[cols][cacheable])
+        parts.append(done[cols].set_axis(np.flatnonzero(miss)))
+    if (~miss).any():
+        pos = np.flatnonzero(~miss)
+        parts.append(pd.DataFrame.from_records([hits[keys[i]] for i in pos], index=pos))
+    rows = pd.concat(parts).sort_index() if len(parts) > 1 else parts[0]
+    out = df.copy()
+    for c in rows.columns:
+        out[c] = rows[c].to_numpy()
+    return out
@@ -1,11 +1,12 @@
 import re, json
 import numpy as np, pandas as pd
-from typing import List
-from .utils import extract_urls, caps_ratio, emoji_count, repeat_char_ratio, is_gibberish_name, char_entropy, profanity_count, experiential_score, normalize_text
-from .geo import haversine_km
+from typing import Dict, List, Optional
+from .config import Config
+from .utils import URL_RE, PROMO_RE, NEVER_BEEN_RE, is_gibberish_name
+from .text_kernel import text_feature_block
+from .geo import haversine_km_np
 
-PROMO_RE = re.compile(r"(?:discount|promo|coupon|deal|sale|%\s*off|dm\s*me|buy now)", re.I)
-NEVER_BEEN_RE = re.compile(r"\b(?:never been|haven't been|didn't visit|did not go|have not gone)\b", re.I)
+BURST_WINDOWS = {"1h": pd.Timedelta(hours=1), "24h": pd.Timedelta(hours=24), "7d": pd.Timedelta(days=7)}
 
 def parse_pics(val) -> List[str]:
     if isinstance(val, str):
@@ -22,42 +23,157 @@ def parse_pics(val) -> List[str]:
         return [x for x in val if isinstance(x, str)]
     return []
 
-def _parse_dt(s):
-    # Handles ISO strings or epoch milliseconds
-    try:
-        # numeric epoch ms
-        if isinstance(s, (int, float)):
-            ts = pd.to_datetime(int(s), unit='ms', utc=True)
-            return ts.tz_convert(None)
-        s = str(s)
-        if s.isdigit():
-            # assume ms
-            ts = pd.to_datetime(int(s), unit='ms', utc=True)
-            return ts.tz_convert(None)
-        ts = pd.to_datetime(s, utc=True, errors='coerce')
-        if pd.isna(ts):
-            return pd.NaT
-        return ts.tz_convert(None)
-    except Exception:
-        return pd.NaT
-
-def add_metadata_feats(df: pd.DataFrame) -> pd.DataFrame:
+EPOCH_NS = {"s": 10**9, "ms": 10**6, "us": 10**3, "ns": 1}
+_I64_MAX = np.iinfo(np.int64).max
+
+def detect_epoch_unit(values) -> str:
+    """Guess the unit of epoch timestamps from their typical magnitude (ms if unknown)."""
+    v = np.abs(np.asarray(values, dtype=float))
+    v = v[np.isfinite(v) & (v > 0)]
+    if not len(v):
+        return "ms"
+    med = np.median(v)
+    return "s" if med < 1e11 else "ms" if med < 1e14 else "us" if med < 1e17 else "ns"
+
+def guess_epoch_unit(values) -> Optional[str]:
+    """detect_epoch_unit over the epoch-like values (numbers, digit strings) of `values`; None if there are none."""
+    s = pd.Series(values) if not isinstance(values, pd.Series) else values
+    if s.dtype.kind in "iuf":
+        v = s.to_numpy(dtype=float)
+        v = v[np.isfinite(v)]
+    else:
+        v = [float(x) if not isinstance(x, str) else float(int(x)) for x in s.to_numpy(dtype=object)
+             if (isinstance(x, (int, float)) and np.isfinite(x)) or (isinstance(x, str) and x.isdigit())]
+    return detect_epoch_unit(v) if len(v) else None
+
+def _epoch_to_ns(ints: List[int], unit: str) -> np.ndarray:
+    factor = EPOCH_NS[unit]
+    out = np.full(len(ints), np.datetime64("NaT"), dtype="datetime64[ns]")
+    ok = np.array([abs(v) <= _I64_MAX // factor for v in ints], dtype=bool)
+    if ok.any():
+        vals = np.array([v for v, k in zip(ints, ok) if k], dtype=np.int64)
+        out[ok] = (vals * factor).view("datetime64[ns]")
+    return out
+
+def parse_datetimes(values, epoch_unit: str = "ms") -> pd.Series:
+    """Vectorized created_at parsing: epoch numbers, digit strings and date strings.
+
+    Values are partitioned by format and each partition is converted in one call.
+    Epoch values use `epoch_unit` ("auto" guesses it from their magnitude); date
+    strings are read as UTC and returned naive. Unparsable values become NaT.
+    """
+    s = pd.Series(values) if not isinstance(values, pd.Series) else values
+    if s.dtype.kind in "iuf":
+        # all-numeric column (e.g. McAuley epoch ms): no per-value dispatch needed
+        v = s.to_numpy(dtype=float)
+        ok = np.isfinite(v)
+        unit = detect_epoch_unit(v[ok]) if epoch_unit == "auto" else epoch_unit
+        out = np.full(len(v), np.datetime64("NaT"), dtype="datetime64[ns]")
+        ok &= np.abs(v) <= _I64_MAX // EPOCH_NS[unit]
+        ints = s.to_numpy()[ok].astype(np.int64) if s.dtype.kind in "iu" else np.trunc(v[ok]).astype(np.int64)
+        out[ok] = (ints * EPOCH_NS[unit]).view("datetime64[ns]")
+        return pd.Series(out, index=s.index)
+    obj = s.to_numpy(dtype=object)
+    out = np.full(len(obj), np.datetime64("NaT"), dtype="datetime64[ns]")
+    epoch_pos, epoch_vals, str_pos, strs = [], [], [], []
+    for i, v in enumerate(obj):
+        if isinstance(v, (int, float)):
+            if isinstance(v, float) and not np.isfinite(v):
+                continue
+            epoch_pos.append(i); epoch_vals.append(int(v))
+            continue
+        v = str(v)
+        if v.isdigit():
+            try:
+                epoch_vals.append(int(v)); epoch_pos.append(i)
+            except ValueError:
+                pass
+        else:
+            str_pos.append(i); strs.append(v)
+    if epoch_pos:
+        unit = detect_epoch_unit(epoch_vals) if epoch_unit == "auto" else epoch_unit
+        out[epoch_pos] = _epoch_to_ns(epoch_vals, unit)
+    if str_pos:
+        strs = pd.Series(strs, dtype=object)
+        ts = pd.to_datetime(strs, utc=True, errors="coerce", format="ISO8601")
+        rest = ts.isna().to_numpy()
+        if rest.any():
+            ts[rest] = pd.to_datetime(strs[rest], utc=True, errors="coerce", format="mixed")
+        ts = ts.dt.tz_convert(None)
+        ts = ts.where((ts >= pd.Timestamp.min) & (ts <= pd.Timestamp.max))
+        out[str_pos] = ts.dt.as_unit("ns").to_numpy()
+    return pd.Series(out, index=s.index)
+
+class BurstIndex:
+    """Sorted (user, timestamp) keys; counts a user's reviews in [t - window, t] via searchsorted.
+
+    Matches the old per-user scan: reviews without a timestamp count as 1 when the
+    user has any dated review and 0 otherwise. Build once, query for any window.
+    """
+
+    def __init__(self, users, times):
+        codes, uniques = pd.factorize(_user_keys(users), use_na_sentinel=False)
+        ns, nat = _to_ns(times)
+        valid = ~nat
+        self.users = pd.Index(uniques)
+        self.has_times = np.bincount(codes[valid], minlength=len(uniques)) > 0
+        self.stamps = np.unique(ns[valid])
+        self.span = len(self.stamps) + 1
+        self.keys = np.sort(codes[valid] * self.span + np.searchsorted(self.stamps, ns[valid]))
+
+    def counts(self, users, times, window) -> np.ndarray:
+        codes = self.users.get_indexer(_user_keys(users))
+        ns, nat = _to_ns(times)
+        out = np.zeros(len(codes), dtype=np.int64)
+        known = codes >= 0
+        undated = known & nat
+        out[undated] = self.has_times[codes[undated]]
+        q = known & ~nat
+        base = codes[q] * self.span
+        width = pd.Timedelta(window).value
+        hi = base + np.searchsorted(self.stamps, ns[q], side="right")
+        lo = base + np.searchsorted(self.stamps, ns[q] - width, side="left")
+        out[q] = np.searchsorted(self.keys, hi) - np.searchsorted(self.keys, lo)
+        return out
+
+def _user_keys(users) -> np.ndarray:
+    # groupby(dropna=False) puts None and NaN in one group; make them one key
+    keys = np.asarray(users)
+    if keys.dtype.kind in "iu":
+        return keys  # already hashed keys (see streaming.CrossRowState)
+    keys = np.array(users, dtype=object)
+    keys[pd.isna(keys)] = np.nan
+    return keys
+
+def _to_ns(times):
+    idx = pd.DatetimeIndex(times)
+    return idx.as_unit("ns").asi8, np.asarray(idx.isna())
+
+# Bump when add_row_feats (or clean_reviews) output changes; invalidates feature_cache entries.
+FEATURE_VERSION = 1
+
+def add_row_feats(df: pd.DataFrame) -> pd.DataFrame:
+    """The row-local, text-heavy part of add_metadata_feats (text, username and pics columns)."""
     df = df.copy()
     texts = df["text"].fillna("")
-    df["text_norm"] = texts.apply(lambda s: normalize_text(str(s)).lower())
-    df["char_len"] = texts.apply(len)
-    df["word_len"] = texts.apply(lambda s: len(s.split()))
-    df["url_count"] = texts.apply(lambda s: len(extract_urls(s)))
+    block = text_feature_block(texts)
+    df["text_norm"] = block["text_norm"].values
+    df["char_len"] = block["char_len"].values
+    df["word_len"] = block["word_len"].values
+    df["url_count"] = texts.str.count(URL_RE)
     df["has_url"] = df["url_count"] > 0
-    df["caps_ratio"] = texts.apply(caps_ratio)
-    df["emoji_count"] = texts.apply(emoji_count)
-    df["repeat_ratio"] = texts.apply(repeat_char_ratio)
-    df["promo_terms"] = texts.str.contains(PROMO_RE)
-    df["never_been_cues"] = texts.str.contains(NEVER_BEEN_RE)
-    df["nonword_ratio"] = texts.apply(lambda s: sum(1 for c in s if not (c.isalnum() or c.isspace())) / max(1, len(s)))
-    df["char_entropy"] = texts.apply(char_entropy)
-    df["profanity_count"] = texts.apply(profanity_count)
-    df["experiential_score"] = texts.apply(experiential_score)
+    df["caps_ratio"] = block["caps_ratio"].values
+    df["emoji_count"] = block["emoji_count"].values
+    df["repeat_ratio"] = block["repeat_ratio"].values
+    df["promo_terms"] = block["promo_terms"].values
+    df["never_been_cues"] = block["never_been_cues"].values
+    df["nonword_ratio"] = block["nonword_ratio"].values
+    df["char_entropy"] = block["char_entropy"].values
+    df["profanity_count"] = block["profanity_count"].values
+    df["experiential_score"] = block["experiential_score"].values
+    for c in block.columns:
+        if c not in df.columns:
+            df[c] = block[c].values
 
     # Username
     if "user_name" in df.columns:
@@ -68,44 +184,74 @@ def add_metadata_feats(df: pd.DataFrame) -> pd.DataFrame:
         df["user_name_suspicious"] = False
 
     # Pics parsing
-    df["pics_list"] = df.get("pics", pd.Series([""]*len(df))).apply(parse_pics)
+    df["pics_list"] = df.get("pics", pd.Series([""]*len(df), index=df.index)).apply(parse_pics)
     df["image_count"] = df["pics_list"].apply(len)
+    return df
+
+def add_metadata_feats(df: pd.DataFrame, burst_windows: Optional[Dict[str, pd.Timedelta]] = None, near_dup_index=None, place_index=None, epoch_unit: str = "ms", cross_row=None, row_feats: bool = True) -> pd.DataFrame:
+    """Per-review features. Burst, dup and near-dup columns look across rows: by default
+    they are computed over `df` itself; pass a finalized `streaming.CrossRowState` to take
+    them from state collected over the whole input when `df` is one chunk of it.
+    row_feats=False means `df` already went through add_row_feats (e.g. from feature_cache)."""
+    df = add_row_feats(df) if row_feats else df.copy()
 
     # Time parsing for burst detection
-    df["dt"] = df.get("created_at", pd.Series([None]*len(df))).apply(_parse_dt)
+    created = df["created_at"] if "created_at" in df.columns else pd.Series([None]*len(df), index=df.index)
+    if cross_row is not None:
+        # the units decided in pass 1, so every chunk of a source is read alike
+        df["dt"] = cross_row.parse_times(created, df.get("source"))
+    elif epoch_unit == "auto" and "source" in df.columns:
+        # sources mix seconds and milliseconds, so guess the unit per source
+        df["dt"] = pd.concat([parse_datetimes(g, "auto") for _, g in created.groupby(df["source"], dropna=False, sort=False)]).reindex(df.index)
+    else:
+        df["dt"] = parse_datetimes(created, epoch_unit)
 
-    # Burstiness within 24h for same user
-    df["user_burst_24h"] = 0
+    # Burstiness within each window for same user
+    windows = BURST_WINDOWS if burst_windows is None else burst_windows
+    for name in windows:
+        df[f"user_burst_{name}"] = 0
     if "user_id" in df.columns:
-        for uid, g in df.groupby("user_id", dropna=False):
-            if g["dt"].notna().sum() == 0:
-                df.loc[g.index, "user_burst_24h"] = 0
-                continue
-            g = g.sort_values("dt")
-            times = g["dt"].values
-            counts = []
-            for i, t in enumerate(times):
-                if pd.isna(t):
-                    counts.append(1); continue
-                lo = t - pd.Timedelta(hours=24)
-                hi = t
-                cnt = ((g["dt"] >= lo) & (g["dt"] <= hi)).sum()
-                counts.append(int(cnt))
-            df.loc[g.index, "user_burst_24h"] = counts
+        if cross_row is None:
+            idx, users = BurstIndex(df["user_id"], df["dt"]), df["user_id"]
+        else:
+            idx, users = cross_row.burst_index, cross_row.user_keys(df["user_id"])
+        for name, width in windows.items():
+            df[f"user_burst_{name}"] = idx.counts(users, df["dt"], width)
 
     # Duplicate across places: same user + same normalized text but different place_id
     df["dup_across_places"] = False
     if "user_id" in df.columns and "place_id" in df.columns:
-        grp = df.groupby(["user_id","text_norm"])["place_id"].nunique().reset_index(name="n_places")
-        join = df.merge(grp, on=["user_id","text_norm"], how="left")
-        df["dup_across_places"] = join["n_places"].fillna(0) > 1
+        if cross_row is None:
+            grp = df.groupby(["user_id","text_norm"])["place_id"].nunique().reset_index(name="n_places")
+            join = df.merge(grp, on=["user_id","text_norm"], how="left")
+            df["dup_across_places"] = join["n_places"].fillna(0) > 1
+        else:
+            df["dup_across_places"] = cross_row.dup_across_places(df["user_id"], df["text_norm"])
+
+    # Near-duplicate clusters across users/places (persistent MinHash-LSH index, see near_dup.py)
+    if cross_row is not None and cross_row.near_dup_index is not None:
+        nd = cross_row.near_dup_features(len(df))
+        for c in nd.columns:
+            df[c] = nd[c].values
+    elif near_dup_index is not None:
+        ids = near_dup_index.add(df["text_norm"], df.get("user_id"), df.get("place_id"), review_ids=df.get("review_id"))
+        nd = near_dup_index.features(ids)
+        for c in nd.columns:
+            df[c] = nd[c].values
 
     # Distance if user device coords & place coords present
     if {"user_lat","user_lon","place_lat","place_lon"}.issubset(df.columns):
-        df["distance_km"] = df.apply(lambda r: haversine_km(r["user_lat"], r["user_lon"], r["place_lat"], r["place_lon"]), axis=1)
+        df["distance_km"] = haversine_km_np(df["user_lat"], df["user_lon"], df["place_lat"], df["place_lon"])
     else:
         df["distance_km"] = np.nan
 
+    # Place proximity around the device location (see geo.PlaceIndex)
+    if place_index is not None and {"user_lat","user_lon"}.issubset(df.columns):
+        near_km = float(Config.device_location.get("near_km", 1.0))
+        df["nearby_places"] = place_index.count_within(df["user_lat"], df["user_lon"], near_km)
+        cats = df["place_category"] if "place_category" in df.columns else pd.Series([""]*len(df))
+        df["nearest_same_category_km"], _ = place_index.nearest_same_category(df["user_lat"], df["user_lon"], cats)
+
     return df
 
 def pack_meta_tokens(row: pd.Series) -> str:
@@ -1,12 +1,80 @@
 import math
+import numpy as np, pandas as pd
+from typing import Tuple
+
+EARTH_RADIUS_KM = 6371.0
 
 def haversine_km(lat1, lon1, lat2, lon2):
     try:
         lat1=float(lat1); lon1=float(lon1); lat2=float(lat2); lon2=float(lon2)
     except Exception:
         return float("nan")
-    R=6371.0
+    R=EARTH_RADIUS_KM
     dlat=math.radians(lat2-lat1); dlon=math.radians(lon2-lon1)
     a=math.sin(dlat/2)**2 + math.cos(math.radians(lat1))*math.cos(math.radians(lat2))*math.sin(dlon/2)**2
     c=2*math.atan2(math.sqrt(a), math.sqrt(1-a))
     return R*c
+
+def _coords(x) -> np.ndarray:
+    # same coercion as haversine_km's float(): anything unparsable becomes NaN
+    return pd.to_numeric(pd.Series(np.asarray(x, dtype=object).ravel()), errors="coerce").to_numpy(dtype=float)
+
+def haversine_km_np(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Array version of haversine_km."""
+    lat1, lon1, lat2, lon2 = (np.radians(_coords(v)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+class PlaceIndex:
+    """Ball trees (haversine metric) over place coordinates, overall and per category.
+
+    Answers bulk proximity questions about device locations: how many known
+    places are within a radius, and how far the nearest place of a given
+    category is.
+    """
+
+    def __init__(self, places: pd.DataFrame, lat_col: str = "place_lat", lon_col: str = "place_lon",
+                 category_col: str = "place_category", id_col: str = "place_id"):
+        from sklearn.neighbors import BallTree
+        lat, lon = _coords(places[lat_col]), _coords(places[lon_col])
+        ok = ~(np.isnan(lat) | np.isnan(lon))
+        pts = np.radians(np.column_stack([lat[ok], lon[ok]]))
+        ids = places[id_col].to_numpy(dtype=object)[ok]
+        cats = places[category_col].fillna("").astype(str).str.lower().to_numpy(dtype=object)[ok] if category_col in places.columns else np.full(len(pts), "", dtype=object)
+        self.tree = BallTree(pts, metric="haversine") if len(pts) else None
+        self.by_category = {}
+        for cat in pd.unique(cats):
+            m = cats == cat
+            self.by_category[cat] = (BallTree(pts[m], metric="haversine"), ids[m])
+
+    @staticmethod
+    def _query_points(lat, lon) -> Tuple[np.ndarray, np.ndarray]:
+        lat, lon = _coords(lat), _coords(lon)
+        ok = ~(np.isnan(lat) | np.isnan(lon))
+        return np.radians(np.column_stack([lat, lon])), ok
+
+    def count_within(self, lat, lon, radius_km: float) -> np.ndarray:
+        """Places within radius_km of each point; NaN where the point is missing."""
+        X, ok = self._query_points(lat, lon)
+        out = np.full(len(X), np.nan)
+        if self.tree is not None and ok.any():
+            out[ok] = self.tree.query_radius(X[ok], r=radius_km / EARTH_RADIUS_KM, count_only=True)
+        elif ok.any():
+            out[ok] = 0
+        return out
+
+    def nearest_same_category(self, lat, lon, categories) -> Tuple[np.ndarray, np.ndarray]:
+        """(distance_km, place_id) of the closest place sharing each row's category."""
+        X, ok = self._query_points(lat, lon)
+        cats = pd.Series(np.asarray(categories, dtype=object)).fillna("").astype(str).str.lower().to_numpy(dtype=object)
+        dist = np.full(len(X), np.nan)
+        pid = np.full(len(X), None, dtype=object)
+        for cat in pd.unique(cats[ok]):
+            if cat not in self.by_category:
+                continue
+            rows = np.flatnonzero(ok & (cats == cat))
+            tree, ids = self.by_category[cat]
+            d, j = tree.query(X[rows], k=1)
+            dist[rows] = d[:, 0] * EARTH_RADIUS_KM
+            pid[rows] = ids[j[:, 0]]
+        return dist, pid
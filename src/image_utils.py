@@ -3,6 +3,8 @@ from typing import List, Optional
 import io, requests
 from PIL import Image
 import numpy as np
+from .config import Config
+from .models.onnx_backend import OnnxCLIP, is_exported, ort
 
 try:
     from sentence_transformers import SentenceTransformer
@@ -18,11 +20,20 @@ def _load_image_from_url(url: str) -> Optional[Image.Image]:
         return None
 
 class ImageTextRelevance:
-    def __init__(self, model_name: str = "clip-ViT-B-32"):
+    def __init__(self, model_name: str = "clip-ViT-B-32", onnx_dir: Optional[str] = None,
+                 num_threads: Optional[int] = None, int8: Optional[bool] = None):
+        opts = Config.options or {}
         self.model_name = model_name
         self.model = None
+        # exported ONNX towers (python -m src.models.onnx_backend clip) replace the torch model when present
+        self.onnx_dir = onnx_dir or opts.get("image_onnx") or None
+        self.num_threads = num_threads or opts.get("image_num_threads") or None
+        self.int8 = bool(opts.get("onnx_int8", False)) if int8 is None else int8
 
     def load(self):
+        if self.onnx_dir and ort is not None and is_exported(self.onnx_dir):
+            self.model = OnnxCLIP(self.onnx_dir, num_threads=self.num_threads, int8=self.int8)
+            return
         if SentenceTransformer is None:
             return
         try:
@@ -33,7 +44,7 @@ class ImageTextRelevance:
     def score(self, image_urls: List[str], text: str) -> Optional[float]:
         if not image_urls or not text:
             return None
-        if self.model is None and SentenceTransformer is not None:
+        if self.model is None:
             self.load()
         if self.model is None:
             return None
@@ -45,9 +56,9 @@ class ImageTextRelevance:
         if not ims:
             return None
         try:
-            i_emb = self.model.encode(ims, convert_to_tensor=True, normalize_embeddings=True)
-            t_emb = self.model.encode([text], convert_to_tensor=True, normalize_embeddings=True)[0]
-            sims = (i_emb @ t_emb).cpu().numpy()
+            i_emb = np.asarray(self.model.encode(ims, normalize_embeddings=True))
+            t_emb = np.asarray(self.model.encode([text], normalize_embeddings=True))[0]
+            sims = i_emb @ t_emb
             sims = (sims + 1) / 2.0
             return float(np.mean(sims))
         except Exception:
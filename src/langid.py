@@ -0,0 +1,101 @@
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+from langdetect import detect, DetectorFactory
+from .utils import TOKEN_RE
+
+# Language ID for clean_reviews, run once per text and shared with translation.
+# - Pure-ASCII texts made mostly of English stopwords are labelled "en" without
+#   running langdetect (most of our reviews);
+# - results are memoized by text hash, so duplicates and re-runs are free;
+# - the remaining texts fan out over a process pool. DetectorFactory.seed = 0 in
+#   every worker makes langdetect deterministic per text, so results do not
+#   depend on n_jobs or on how texts are chunked.
+
+DetectorFactory.seed = 0
+
+EN_STOPWORDS = frozenset("""
+a about after all also am an and any are as at be been but by can could did do does
+for from had has have he her here his how i if in into is it its just me my no not of
+on or our out so some than that the their them then there they this to too up us very
+was we were what when where which who will with would you your
+""".split())
+
+MIN_TOKENS = 4
+MIN_STOPWORD_RATIO = 0.4
+CACHE_SIZE = 1_000_000
+
+_cache: Dict[bytes, str] = {}
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_jobs = 0
+
+def _key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+def looks_english(text: str) -> bool:
+    """Cheap pre-check: ASCII text dominated by English stopwords."""
+    if not text.isascii():
+        return False
+    toks = TOKEN_RE.findall(text.lower())
+    if len(toks) < MIN_TOKENS:
+        return False
+    return sum(t in EN_STOPWORDS for t in toks) >= MIN_STOPWORD_RATIO * len(toks)
+
+def detect_lang(text) -> str:
+    """langdetect code for one text; "unknown" for empty/non-str texts or detection errors."""
+    if not isinstance(text, str) or not text.strip():
+        return "unknown"
+    if looks_english(text):
+        return "en"
+    try:
+        return detect(text)
+    except Exception:
+        return "unknown"
+
+def _detect_batch(texts: List[str]) -> List[str]:
+    return [detect_lang(t) for t in texts]
+
+def _init_worker() -> None:
+    DetectorFactory.seed = 0
+
+def _get_pool(n_jobs: int) -> ProcessPoolExecutor:
+    # kept alive across calls so chunked runs do not pay worker start-up per chunk
+    global _pool, _pool_jobs
+    if _pool is None or _pool_jobs != n_jobs:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker)
+        _pool_jobs = n_jobs
+    return _pool
+
+def detect_langs(texts: Iterable, n_jobs: int = 1, chunk_size: int = 2000) -> List[str]:
+    """Language codes for many texts, same values as calling detect_lang on each."""
+    texts = list(texts)
+    out: List[Optional[str]] = [None] * len(texts)
+    todo: Dict[bytes, List[int]] = {}
+    for i, t in enumerate(texts):
+        if not isinstance(t, str) or not t.strip():
+            out[i] = "unknown"
+            continue
+        k = _key(t)
+        hit = _cache.get(k)
+        if hit is not None:
+            out[i] = hit
+        elif k in todo:
+            todo[k].append(i)
+        else:
+            todo[k] = [i]
+    keys = list(todo)
+    uniq = [texts[todo[k][0]] for k in keys]
+    if n_jobs > 1 and len(uniq) > chunk_size:
+        chunks = [uniq[i:i + chunk_size] for i in range(0, len(uniq), chunk_size)]
+        langs = [l for part in _get_pool(n_jobs).map(_detect_batch, chunks) for l in part]
+    else:
+        langs = _detect_batch(uniq)
+    if len(_cache) + len(keys) > CACHE_SIZE:
+        _cache.clear()
+    for k, lang in zip(keys, langs):
+        _cache[k] = lang
+        for i in todo[k]:
+            out[i] = lang
+    return out
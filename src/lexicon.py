@@ -0,0 +1,125 @@
+import re, pathlib
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from .utils import PROMO_RE, NEVER_BEEN_RE, EXPERIENTIAL_CUES, RESOURCES_DIR, TOKEN_RE, load_profanity_words, load_word_list
+
+# All cue lists are loaded and compiled once, then every text is lowercased and
+# tokenized once:
+# - word lists (resources/*.txt) share one token -> categories table, so any
+#   number of word files costs a single tokenization and one set intersection;
+# - regex cues are gated by a required literal (checked with C-level substring
+#   search), so a pattern only runs on texts that can possibly match it;
+# - case-insensitive cues run on the original text: lowercasing is not length
+#   preserving ("İ" -> "i̇"), so it can move word boundaries and hide literals.
+# With CPython's backtracking `re`, one big alternation over all cues is slower
+# than this, since sre cannot skip ahead on a literal prefix for alternations.
+
+_META = set(".^$*+?{}[]\\|()")
+
+def required_literal(pattern: str) -> Optional[str]:
+    """Leading literal every match must contain, or None if it cannot be read off simply."""
+    p = pattern
+    while p.startswith(r"\b"):
+        p = p[2:]
+    if "|" in p:
+        return None
+    lit = ""
+    for ch in p:
+        if ch in _META:
+            if ch in "?*{" and lit:
+                lit = lit[:-1]
+            break
+        lit += ch
+    return lit or None
+
+class Lexicon:
+    def __init__(self) -> None:
+        self._words: Dict[str, Tuple[str, ...]] = {}  # token -> categories
+        # (category, regex, literals, runs on the original text)
+        self._cues: List[Tuple[str, re.Pattern, Optional[Tuple[str, ...]], bool]] = []
+        self._distinct: Dict[str, bool] = {}
+
+    @property
+    def categories(self) -> List[str]:
+        return list(self._distinct)
+
+    def _register(self, category: str, distinct: bool) -> None:
+        if self._distinct.get(category, distinct) != distinct:
+            raise ValueError(f"Category {category!r} already registered with distinct={self._distinct[category]}")
+        self._distinct[category] = distinct
+
+    def add_patterns(self, category: str, patterns: Iterable[str], distinct: bool = False,
+                     ignore_case: bool = False, literals: Optional[Iterable[str]] = None) -> "Lexicon":
+        """Regex cues matched on the lowercased text, or on the original one with ignore_case=True.
+
+        distinct=True scores how many different cues hit; otherwise matches are counted.
+        `literals` (any-of, lowercase) gates every pattern; by default each pattern's
+        leading literal is used when it has one.
+        """
+        self._register(category, distinct)
+        for p in patterns:
+            lits = tuple(literals) if literals is not None else (required_literal(p),)
+            self._cues.append((category, re.compile(p, re.I if ignore_case else 0), None if None in lits else lits,
+                               ignore_case))
+        return self
+
+    def add_words(self, category: str, words: Iterable[str]) -> "Lexicon":
+        """Whole-token words, counted per occurrence like utils.profanity_count."""
+        self._register(category, False)
+        for w in words:
+            w = w.strip().lower()
+            # tokens are runs of [A-Za-z']; anything else could never be looked up
+            if TOKEN_RE.fullmatch(w) and category not in self._words.get(w, ()):
+                self._words[w] = self._words.get(w, ()) + (category,)
+        return self
+
+    def add_word_file(self, path, category: Optional[str] = None) -> "Lexicon":
+        """One word per line; the category defaults to the file stem (profanity.txt -> profanity)."""
+        path = pathlib.Path(path)
+        return self.add_words(category or path.stem, load_word_list(path))
+
+    def scan(self, text: str) -> Dict[str, int]:
+        """Hit counts per category for one text."""
+        counts = dict.fromkeys(self._distinct, 0)
+        if not text:
+            return counts
+        s = text.lower()
+        if self._words:
+            toks = TOKEN_RE.findall(s)
+            for w in self._words.keys() & toks:
+                n = toks.count(w)
+                for c in self._words[w]:
+                    counts[c] += n
+        distinct = self._distinct
+        # the lowercased text only gates case-insensitive cues when lowering is exact
+        exact = text.isascii()
+        for cat, regex, lits, raw in self._cues:
+            if lits is not None and (exact or not raw) and not any(l in s for l in lits):
+                continue
+            target = text if raw else s
+            if distinct[cat]:
+                if regex.search(target):
+                    counts[cat] += 1
+            else:
+                counts[cat] += len(regex.findall(target))
+        return counts
+
+    def scan_many(self, texts: Iterable[str]) -> Dict[str, np.ndarray]:
+        rows = [self.scan(t) for t in texts]
+        return {c: np.array([r[c] for r in rows], dtype=np.int64) for c in self._distinct}
+
+@lru_cache(maxsize=1)
+def default_lexicon() -> Lexicon:
+    """Built-in cue sets plus every word list in resources/, loaded once per process."""
+    lex = Lexicon()
+    lex.add_words("profanity", load_profanity_words())
+    lex.add_patterns("promo", [PROMO_RE.pattern], ignore_case=True,
+                     literals=["discount", "promo", "coupon", "deal", "sale", "%", "dm", "buy now"])
+    lex.add_patterns("never_been", [NEVER_BEEN_RE.pattern], ignore_case=True,
+                     literals=["never been", "haven't been", "didn't visit", "did not go", "have not gone"])
+    lex.add_patterns("experiential", EXPERIENTIAL_CUES, distinct=True)
+    for path in sorted(RESOURCES_DIR.glob("*.txt")):
+        if path.stem != "profanity":
+            lex.add_word_file(path)
+    return lex
@@ -1,4 +1,12 @@
-from .multilabel import MultiLabelSklearn
+from .multilabel import MultiLabelSklearn, MultiLabelStreaming
+from .multilabel_hf import MultiLabelHF
+from .place_embeddings import PlaceEmbeddingStore
+from .onnx_backend import OnnxCLIP, OnnxCrossEncoder
+from .registry import ModelRegistry
 from .relevancy_ce import RelevancyModel
+from .relevancy_index import PlaceTextIndex
+from .relevancy_student import RelevancyStudent
 
-__all__ = ["MultiLabelSklearn", "RelevancyModel"]
+__all__ = ["MultiLabelSklearn", "MultiLabelStreaming", "MultiLabelHF", "ModelRegistry", "RelevancyModel", "PlaceTextIndex",
+           "PlaceEmbeddingStore", "RelevancyStudent",
+           "OnnxCrossEncoder", "OnnxCLIP"]
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
-from typing import Iterable, List, Optional
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 
 import joblib
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+import scipy.sparse as sp
+from scipy.special import expit
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.multiclass import OneVsRestClassifier
-from sklearn.preprocessing import MultiLabelBinarizer
+from sklearn.preprocessing import MultiLabelBinarizer, normalize
 
 from ..config import LABELS
 
@@ -18,12 +21,14 @@ class MultiLabelSklearn:
         labels: Optional[List[str]] = None,
         max_features: int = 20000,
         ngram_range: tuple = (1, 2),
+        C: float = 1.0,
     ) -> None:
         self.labels = labels or LABELS
         self.vectorizer = TfidfVectorizer(max_features=max_features, ngram_range=ngram_range)
         self.binarizer = MultiLabelBinarizer(classes=self.labels)
-        base = LogisticRegression(max_iter=1000, solver="liblinear")
+        base = LogisticRegression(C=C, max_iter=1000, solver="liblinear")
         self.clf = OneVsRestClassifier(base)
+        self._fused = None
 
     def fit(self, texts: Iterable[str], labels_list: Iterable[List[str]]) -> "MultiLabelSklearn":
         texts = list(texts)
@@ -31,12 +36,60 @@ class MultiLabelSklearn:
         X = self.vectorizer.fit_transform(texts)
         y = self.binarizer.fit_transform(labels_list)
         self.clf.fit(X, y)
+        self._fused = None
         return self
 
+    def _features(self, texts: List[str]) -> sp.csr_matrix:
+        X = self.vectorizer.transform(texts)
+        return X.astype(np.float32) if self._fused is not None else X
+
+    def _estimators(self) -> list:
+        return self.clf.estimators_
+
+    def compile(self) -> "MultiLabelSklearn":
+        """Fuse the per-label linear models into one float32 (n_features, n_labels) matrix.
+
+        predict_proba then does a single sparse x dense matmul and a vectorized
+        sigmoid instead of one float64 pass per label; results match within
+        float32 precision. Features are cast to float32 on that path; the
+        vectorizer itself is left as fitted.
+        """
+        ests = self._estimators()
+        n_features = next((e.coef_.shape[1] for e in ests if hasattr(e, "coef_")), 0)
+        W = np.zeros((n_features, len(ests)), dtype=np.float32)
+        b = np.zeros(len(ests), dtype=np.float32)
+        for j, est in enumerate(ests):
+            if hasattr(est, "coef_"):
+                W[:, j] = est.coef_.ravel()
+                b[j] = est.intercept_[0]
+            else:
+                # OneVsRestClassifier's constant predictor (label had one class in training): p is 0 or 1
+                b[j] = np.inf if est.y_[0] else -np.inf
+        self._fused = (W, b)
+        return self
+
+    def _fused_proba(self, X: sp.csr_matrix) -> np.ndarray:
+        W, b = self._fused
+        Z = X.astype(np.float32, copy=False) @ W
+        Z += b
+        return expit(Z, out=Z)
+
+    def _proba(self, X: sp.csr_matrix) -> np.ndarray:
+        if self._fused is not None:
+            return self._fused_proba(X)
+        return np.asarray(self.clf.predict_proba(X), dtype=float)
+
     def predict_proba(self, texts: Iterable[str]) -> np.ndarray:
-        X = self.vectorizer.transform(list(texts))
-        probs = self.clf.predict_proba(X)
-        return np.asarray(probs, dtype=float)
+        return self._proba(self._features(list(texts)))
+
+    def iter_predict_proba(self, texts: Iterable[str], chunk_size: int = 8192) -> Iterator[np.ndarray]:
+        """predict_proba over `texts` (any iterable) in row chunks of `chunk_size`."""
+        it = iter(texts)
+        while True:
+            chunk = list(islice(it, chunk_size))
+            if not chunk:
+                return
+            yield self.predict_proba(chunk)
 
     def predict(self, texts: Iterable[str], threshold: float = 0.5) -> List[List[str]]:
         probs = self.predict_proba(texts)
@@ -48,6 +101,7 @@ class MultiLabelSklearn:
 
     def save(self, path: str) -> None:
         payload = {
+            "backend": "tfidf",
             "labels": self.labels,
             "vectorizer": self.vectorizer,
             "binarizer": self.binarizer,
@@ -57,9 +111,116 @@ class MultiLabelSklearn:
 
     @classmethod
     def load(cls, path: str) -> "MultiLabelSklearn":
-        payload = joblib.load(path)
-        obj = cls(labels=payload.get("labels") or LABELS)
+        return MultiLabelSklearn.from_payload(joblib.load(path))
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "MultiLabelSklearn":
+        if payload.get("backend", "tfidf") == "hashing":
+            return MultiLabelStreaming.from_payload(payload)
+        obj = MultiLabelSklearn(labels=payload.get("labels") or LABELS)
+        obj.vectorizer = payload["vectorizer"]
+        obj.binarizer = payload["binarizer"]
+        obj.clf = payload["clf"]
+        obj._fused = None
+        return obj
+
+
+# (texts, label lists) per chunk; a callable so the data can be read more than once
+ChunkReader = Callable[[], Iterator[Tuple[List[str], List[List[str]]]]]
+
+
+class MultiLabelStreaming(MultiLabelSklearn):
+    """Out-of-core variant: hashed n-grams, IDF counted over the chunks, one SGD learner per label.
+
+    Nothing is held beyond one chunk and the (n_features,) IDF / coefficient
+    vectors, so `fit_chunks` scales to corpora that do not fit in memory.
+    Saved models load through MultiLabelSklearn.load as well.
+    """
+
+    def __init__(
+        self,
+        labels: Optional[List[str]] = None,
+        n_features: int = 2 ** 20,
+        ngram_range: tuple = (1, 2),
+        alpha: float = 1e-5,
+        epochs: int = 1,
+        random_state: int = 42,
+    ) -> None:
+        self.labels = labels or LABELS
+        self.vectorizer = HashingVectorizer(n_features=n_features, ngram_range=ngram_range,
+                                            alternate_sign=False, norm=None)
+        self.binarizer = MultiLabelBinarizer(classes=self.labels)
+        self.binarizer.fit([self.labels])
+        self.idf = np.ones(n_features)
+        self.n_docs = 0
+        self.epochs = epochs
+        self.random_state = random_state
+        self.clf = [SGDClassifier(loss="log_loss", alpha=alpha, random_state=random_state) for _ in self.labels]
+        self._fused = None
+
+    def _estimators(self) -> list:
+        return self.clf
+
+    def _features(self, texts: List[str]) -> sp.csr_matrix:
+        X = self.vectorizer.transform(texts)
+        if self._fused is not None:
+            X = X.astype(np.float32)
+        return normalize(X @ sp.diags(self.idf.astype(X.dtype, copy=False), format="csr"))
+
+    def fit_chunks(self, read_chunks: ChunkReader) -> "MultiLabelStreaming":
+        """Two passes: document frequencies first (smooth IDF, as TfidfVectorizer), then `epochs` of partial_fit."""
+        doc_freq = np.zeros(self.vectorizer.n_features, dtype=np.int64)
+        n_docs = 0
+        for texts, _ in read_chunks():
+            X = self.vectorizer.transform(list(texts))
+            doc_freq += np.bincount(X.indices, minlength=len(doc_freq))
+            n_docs += X.shape[0]
+        self.n_docs = n_docs
+        self.idf = np.log((1 + n_docs) / (1 + doc_freq)) + 1
+
+        rng = np.random.default_rng(self.random_state)
+        classes = np.array([0, 1])
+        for _ in range(self.epochs):
+            for texts, labels_list in read_chunks():
+                X = self._features(list(texts))
+                y = self.binarizer.transform(list(labels_list))
+                order = rng.permutation(X.shape[0])  # SGD wants shuffled rows
+                X, y = X[order], y[order]
+                for j, est in enumerate(self.clf):
+                    est.partial_fit(X, y[:, j], classes=classes)
+        self._fused = None
+        return self
+
+    def fit(self, texts: Iterable[str], labels_list: Iterable[List[str]]) -> "MultiLabelStreaming":
+        chunk = (list(texts), list(labels_list))
+        return self.fit_chunks(lambda: iter([chunk]))
+
+    def _proba(self, X: sp.csr_matrix) -> np.ndarray:
+        if self._fused is not None:
+            return self._fused_proba(X)
+        return np.column_stack([est.predict_proba(X)[:, 1] for est in self.clf]).astype(float)
+
+    def save(self, path: str) -> None:
+        payload = {
+            "backend": "hashing",
+            "labels": self.labels,
+            "vectorizer": self.vectorizer,
+            "binarizer": self.binarizer,
+            "idf": self.idf,
+            "n_docs": self.n_docs,
+            "clf": self.clf,
+        }
+        joblib.dump(payload, path)
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "MultiLabelStreaming":
+        obj = cls.__new__(cls)
+        obj.labels = payload.get("labels") or LABELS
         obj.vectorizer = payload["vectorizer"]
         obj.binarizer = payload["binarizer"]
+        obj.idf = payload["idf"]
+        obj.n_docs = payload["n_docs"]
         obj.clf = payload["clf"]
+        obj.epochs, obj.random_state = 1, 42
+        obj._fused = None
         return obj
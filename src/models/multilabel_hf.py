@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from collections import Counter
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from ..config import Config, LABELS
+from ..translate import length_batches
+
+try:
+    import torch
+    from transformers import (AutoModelForSequenceClassification, AutoTokenizer, BertConfig,
+                              BertForSequenceClassification, BertTokenizerFast)
+except Exception:
+    torch = AutoModelForSequenceClassification = AutoTokenizer = None
+    BertConfig = BertForSequenceClassification = BertTokenizerFast = None
+
+# Transformer multilabel classifier with the MultiLabelSklearn interface.
+# Throughput on CPU comes from:
+# - dynamic padding: each batch is padded to its own longest row only;
+# - length-bucketed batches (translate.length_batches), capped by rows and by
+#   padded tokens, so short reviews are not padded to long ones;
+# - torch.inference_mode and a configurable intra-op thread count;
+# - optional dynamic int8 quantization of the Linear layers for serving.
+
+SETTINGS_FILE = "multilabel_hf.json"
+
+
+def _require() -> None:
+    if torch is None:
+        raise ImportError("transformers and torch are required for the hf backend")
+
+
+class MultiLabelHF:
+    """Fine-tuned sequence classifier with one sigmoid output per label.
+
+    `model`/`tokenizer` may be passed directly (see `tiny` for an offline,
+    randomly initialized one); otherwise the pretrained `model_name` is
+    loaded on first use.
+    """
+
+    def __init__(
+        self,
+        labels: Optional[List[str]] = None,
+        model_name: Optional[str] = None,
+        max_length: int = 256,
+        batch_size: int = 32,
+        max_tokens: int = 8192,
+        epochs: int = 1,
+        lr: float = 2e-5,
+        num_threads: Optional[int] = None,
+        quantize: bool = False,
+        model=None,
+        tokenizer=None,
+        random_state: int = 42,
+    ) -> None:
+        self.labels = labels or LABELS
+        self.model_name = model_name or Config.models.get("classifier", "microsoft/deberta-v3-base")
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.epochs = epochs
+        self.lr = lr
+        self.num_threads = num_threads
+        self.quantize = quantize
+        self.model = model
+        self.tokenizer = tokenizer
+        self.random_state = random_state
+        self._serving = None
+
+    @classmethod
+    def from_options(cls, labels: Optional[List[str]] = None, **kwargs) -> "MultiLabelHF":
+        """Throughput knobs from config options (hf_batch_size, hf_max_tokens, hf_num_threads, hf_quantize_int8)."""
+        opts = Config.options or {}
+        defaults = {
+            "batch_size": int(opts.get("hf_batch_size", 32)),
+            "max_tokens": int(opts.get("hf_max_tokens", 8192)),
+            "num_threads": opts.get("hf_num_threads") or None,
+            "quantize": bool(opts.get("hf_quantize_int8", False)),
+        }
+        return cls(labels=labels, **{**defaults, **kwargs})
+
+    @classmethod
+    def tiny(cls, texts: Iterable[str], labels: Optional[List[str]] = None, vocab_size: int = 2000,
+             hidden_size: int = 32, layers: int = 2, **kwargs) -> "MultiLabelHF":
+        """Small randomly initialized BERT with a vocabulary built from `texts`; needs no download."""
+        _require()
+        labels = labels or LABELS
+        counts = Counter(tok for t in texts for tok in str(t).lower().split())
+        specials = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+        vocab = specials + [w for w, _ in counts.most_common(vocab_size - len(specials))]
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "vocab.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n".join(vocab) + "\n")
+            tokenizer = BertTokenizerFast(path, do_lower_case=True)  # positional: vocab_file (4.x) / vocab (5.x)
+        config = BertConfig(
+            vocab_size=len(vocab), hidden_size=hidden_size, num_hidden_layers=layers,
+            num_attention_heads=2, intermediate_size=hidden_size * 2,
+            max_position_embeddings=max(kwargs.get("max_length", 256), 32),
+            num_labels=len(labels), problem_type="multi_label_classification",
+            id2label=dict(enumerate(labels)), label2id={l: i for i, l in enumerate(labels)},
+        )
+        return cls(labels=labels, model=BertForSequenceClassification(config), tokenizer=tokenizer,
+                   model_name="tiny-random-bert", **kwargs)
+
+    def _load_pretrained(self) -> None:
+        if self.model is not None and self.tokenizer is not None:
+            return
+        _require()
+        self.tokenizer = self.tokenizer or AutoTokenizer.from_pretrained(self.model_name)
+        self.model = self.model or AutoModelForSequenceClassification.from_pretrained(
+            self.model_name, num_labels=len(self.labels), problem_type="multi_label_classification",
+            id2label=dict(enumerate(self.labels)), label2id={l: i for i, l in enumerate(self.labels)})
+
+    def _set_threads(self) -> None:
+        if self.num_threads:
+            torch.set_num_threads(int(self.num_threads))
+
+    def _encode(self, texts: List[str]):
+        enc = self.tokenizer([t if isinstance(t, str) else "" for t in texts], truncation=True,
+                             max_length=self.max_length)
+        return enc, length_batches([len(ids) for ids in enc["input_ids"]], self.batch_size, self.max_tokens)
+
+    def _pad(self, enc, batch: List[int]):
+        keys = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in enc]
+        return self.tokenizer.pad({k: [enc[k][i] for i in batch] for k in keys}, return_tensors="pt")
+
+    def fit(self, texts: Iterable[str], labels_list: Iterable[List[str]]) -> "MultiLabelHF":
+        self._load_pretrained()
+        self._set_threads()
+        texts = list(texts)
+        index = {l: j for j, l in enumerate(self.labels)}
+        y = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        for i, labs in enumerate(labels_list):
+            for l in labs or []:
+                if l in index:
+                    y[i, index[l]] = 1.0
+
+        torch.manual_seed(self.random_state)
+        rng = np.random.default_rng(self.random_state)
+        enc, batches = self._encode(texts)
+        optim = torch.optim.AdamW(self.model.parameters(), lr=self.lr)
+        self.model.train()
+        for _ in range(self.epochs):
+            for b in rng.permutation(len(batches)):  # bucketed batches, visited in random order
+                batch = batches[b]
+                out = self.model(**self._pad(enc, batch), labels=torch.from_numpy(y[batch]))
+                out.loss.backward()
+                optim.step()
+                optim.zero_grad()
+        self.model.eval()
+        self._serving = None
+        return self
+
+    def _serving_model(self):
+        """The eval-mode model used for inference; int8-quantized Linear layers if `quantize`."""
+        if self._serving is None:
+            self._load_pretrained()
+            self.model.eval()
+            self._serving = self.model
+            if self.quantize:
+                self._serving = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        return self._serving
+
+    def predict_proba(self, texts: Iterable[str]) -> np.ndarray:
+        texts = list(texts)
+        probs = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        if not texts:
+            return probs
+        model = self._serving_model()
+        self._set_threads()
+        enc, batches = self._encode(texts)
+        with torch.inference_mode():
+            for batch in batches:
+                logits = model(**self._pad(enc, batch)).logits
+                probs[batch] = torch.sigmoid(logits).float().numpy()
+        return probs
+
+    def iter_predict_proba(self, texts: Iterable[str], chunk_size: int = 8192) -> Iterator[np.ndarray]:
+        it = iter(texts)
+        while True:
+            chunk = list(islice(it, chunk_size))
+            if not chunk:
+                return
+            yield self.predict_proba(chunk)
+
+    def predict(self, texts: Iterable[str], threshold: float = 0.5) -> List[List[str]]:
+        probs = self.predict_proba(texts)
+        return [[self.labels[i] for i, p in enumerate(row) if p >= threshold] for row in probs]
+
+    def save(self, path: str) -> None:
+        """A directory with the (unquantized) weights, the tokenizer and the settings."""
+        os.makedirs(path, exist_ok=True)
+        self.model.save_pretrained(path)
+        self.tokenizer.save_pretrained(path)
+        settings = {"labels": self.labels, "model_name": self.model_name, "max_length": self.max_length,
+                    "batch_size": self.batch_size, "max_tokens": self.max_tokens}
+        with open(os.path.join(path, SETTINGS_FILE), "w", encoding="utf-8") as f:
+            json.dump(settings, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "MultiLabelHF":
+        """Model saved by `save`; kwargs (e.g. quantize, num_threads) override the stored settings."""
+        _require()
+        with open(os.path.join(path, SETTINGS_FILE), encoding="utf-8") as f:
+            settings = json.load(f)
+        obj = cls(**{**settings, **kwargs},
+                  model=AutoModelForSequenceClassification.from_pretrained(path),
+                  tokenizer=AutoTokenizer.from_pretrained(path))
+        obj.model.eval()
+        return obj
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..config import Config
+
+try:
+    import onnxruntime as ort
+except Exception:
+    ort = None
+
+# ONNX Runtime serving for the relevancy cross-encoder and the CLIP
+# image-text model. export_* trace the torch models once into
+#
+#   <dir>/model.onnx (cross-encoder) or text.onnx + image.onnx (CLIP)
+#   <dir>/*.int8.onnx   dynamic int8 quantization (weights int8, activations
+#                       quantized per batch), when exported with int8=True
+#   <dir>/meta.json     source model, activation, max length
+#   tokenizer / processor files
+#
+# OnnxCrossEncoder and OnnxCLIP mirror the predict()/encode() calls the torch
+# models get from RelevancyModel and ImageTextRelevance, so those classes only
+# swap the object they hold (options relevancy_onnx / image_onnx). Preprocessing
+# uses the saved tokenizer/processor with numpy tensors.
+
+DEFAULT_DIR = os.path.join(Config.models_dir, "onnx")
+META_FILE = "meta.json"
+
+
+def _require() -> None:
+    if ort is None:
+        raise ImportError("onnxruntime is required for the onnx backend")
+
+
+def session(path: str, num_threads: Optional[int] = None):
+    """CPU InferenceSession with full graph optimizations; `num_threads` sets intra-op threads (None: ORT default)."""
+    _require()
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        opts.intra_op_num_threads = int(num_threads)
+    return ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+
+
+def model_file(directory: str, name: str, int8: bool = False) -> str:
+    """`name`.int8.onnx when `int8` and it was exported, else `name`.onnx."""
+    q = os.path.join(directory, f"{name}.int8.onnx")
+    return q if int8 and os.path.exists(q) else os.path.join(directory, f"{name}.onnx")
+
+
+def is_exported(directory: Optional[str]) -> bool:
+    return bool(directory) and os.path.exists(os.path.join(directory, META_FILE))
+
+
+def _export(module, inputs: Dict, output: str, path: str, dynamic: Dict[str, Dict[int, str]]) -> None:
+    import torch
+    with torch.inference_mode():
+        torch.onnx.export(module, tuple(inputs.values()), path, input_names=list(inputs), output_names=[output],
+                          dynamic_axes={**dynamic, output: {0: "batch"}}, opset_version=17, dynamo=False)
+
+
+def _quantize(directory: str, name: str) -> None:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(os.path.join(directory, f"{name}.onnx"), os.path.join(directory, f"{name}.int8.onnx"),
+                     weight_type=QuantType.QInt8)
+
+
+def _write_meta(directory: str, meta: dict) -> None:
+    with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+def export_cross_encoder(model_name: str, directory: str, int8: bool = False) -> str:
+    """Export a sentence-transformers CrossEncoder to `directory`; returns it."""
+    import torch
+    from sentence_transformers import CrossEncoder
+
+    ce = CrossEncoder(model_name)
+    hf = ce.model.eval()
+    if hasattr(hf, "set_attn_implementation"):
+        hf.set_attn_implementation("eager")  # sdpa's mask shortcuts do not trace to a shape-generic graph
+    tok = ce.tokenizer
+    # padded example of uneven lengths, so the traced graph keeps the masking path
+    enc = tok(["a short review", "a somewhat longer review text with more words in it"],
+              ["a place", "another place description"], padding=True, return_tensors="pt")
+    names = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in enc]
+
+    class Logits(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *args):
+            return self.model(**dict(zip(names, args))).logits
+
+    os.makedirs(directory, exist_ok=True)
+    _export(Logits(hf), {k: enc[k] for k in names}, "logits", os.path.join(directory, "model.onnx"),
+            {k: {0: "batch", 1: "seq"} for k in names})
+    if int8:
+        _quantize(directory, "model")
+    tok.save_pretrained(directory)
+    activation = "sigmoid" if isinstance(ce.activation_fn, torch.nn.Sigmoid) else "identity"
+    _write_meta(directory, {"kind": "cross_encoder", "source": model_name, "inputs": names,
+                            "activation": activation, "max_length": int(ce.max_seq_length or tok.model_max_length)})
+    return directory
+
+
+def export_clip(model_name: str, directory: str, int8: bool = False) -> str:
+    """Export the text and image towers of a sentence-transformers CLIP model to `directory`; returns it."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    module = SentenceTransformer(model_name)[0]
+    clip, processor = module.model.eval(), module.processor
+    if hasattr(clip, "set_attn_implementation"):
+        clip.set_attn_implementation("eager")
+
+    def features(out):
+        return out if isinstance(out, torch.Tensor) else out.pooler_output
+
+    class Text(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return features(self.model.get_text_features(input_ids=input_ids, attention_mask=attention_mask))
+
+    class Image(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            return features(self.model.get_image_features(pixel_values=pixel_values))
+
+    from PIL import Image as PILImage
+    text = processor.tokenizer(["a photo of a cafe", "the pasta was great and the staff friendly"],
+                               padding=True, return_tensors="pt")
+    size = clip.config.vision_config.image_size
+    pixels = processor.image_processor([PILImage.new("RGB", (size, size))] * 2, return_tensors="pt")["pixel_values"]
+    os.makedirs(directory, exist_ok=True)
+    _export(Text(clip), {"input_ids": text["input_ids"], "attention_mask": text["attention_mask"]}, "embeddings",
+            os.path.join(directory, "text.onnx"), {k: {0: "batch", 1: "seq"} for k in ("input_ids", "attention_mask")})
+    _export(Image(clip), {"pixel_values": pixels}, "embeddings", os.path.join(directory, "image.onnx"),
+            {"pixel_values": {0: "batch"}})
+    if int8:
+        _quantize(directory, "text")
+        _quantize(directory, "image")
+    processor.save_pretrained(directory)
+    _write_meta(directory, {"kind": "clip", "source": model_name,
+                            "max_length": int(clip.config.text_config.max_position_embeddings)})
+    return directory
+
+
+class OnnxCrossEncoder:
+    """predict(pairs) over an exported cross-encoder; scores match CrossEncoder.predict (activation included)."""
+
+    def __init__(self, directory: str, num_threads: Optional[int] = None, int8: bool = False) -> None:
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.path = model_file(directory, "model", int8)
+        self.session = session(self.path, num_threads)
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        self.max_length = self.meta["max_length"]
+        self.inputs = self.meta["inputs"]
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        pairs = [(a or "", b or "") for a, b in pairs]
+        out = np.zeros(len(pairs), dtype=np.float32)
+        order = np.argsort([len(a) + len(b) for a, b in pairs], kind="stable")  # similar lengths share a batch
+        for s in range(0, len(pairs), batch_size):
+            idx = order[s:s + batch_size]
+            enc = self.tokenizer([pairs[i][0] for i in idx], [pairs[i][1] for i in idx], padding=True,
+                                 truncation=True, max_length=self.max_length, return_tensors="np")
+            logits = self.session.run(None, {k: enc[k].astype(np.int64) for k in self.inputs})[0]
+            out[idx] = logits[:, 0]
+        if self.meta["activation"] == "sigmoid":
+            out = 1.0 / (1.0 + np.exp(-out))
+        return out
+
+
+class OnnxCLIP:
+    """encode(images or texts) over exported CLIP towers, like SentenceTransformer.encode for a CLIP model."""
+
+    def __init__(self, directory: str, num_threads: Optional[int] = None, int8: bool = False) -> None:
+        from transformers import AutoProcessor
+
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.text = session(model_file(directory, "text", int8), num_threads)
+        self.image = session(model_file(directory, "image", int8), num_threads)
+        self.processor = AutoProcessor.from_pretrained(directory)
+
+    def encode(self, items: List, batch_size: int = 32, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        """Embeddings of a list of PIL images or of strings (not mixed)."""
+        chunks = []
+        for s in range(0, len(items), batch_size):
+            batch = items[s:s + batch_size]
+            if batch and isinstance(batch[0], str):
+                enc = self.processor.tokenizer(batch, padding=True, truncation=True,
+                                               max_length=self.meta["max_length"], return_tensors="np")
+                feeds = {"input_ids": enc["input_ids"].astype(np.int64),
+                         "attention_mask": enc["attention_mask"].astype(np.int64)}
+                chunks.append(self.text.run(None, feeds)[0])
+            else:
+                pixels = self.processor.image_processor(batch, return_tensors="np")["pixel_values"]
+                chunks.append(self.image.run(None, {"pixel_values": pixels.astype(np.float32)})[0])
+        emb = np.concatenate(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(emb):
+            emb = emb / np.maximum(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12)
+        return emb
+
+
+def _timed(fn) -> Tuple[np.ndarray, float]:
+    t0 = time.perf_counter()
+    out = fn()
+    return np.asarray(out, dtype=np.float32), time.perf_counter() - t0
+
+
+def parity_cross_encoder(model_name: str, directory: str, pairs: Sequence[Tuple[str, str]],
+                         int8: bool = False, num_threads: Optional[int] = None, batch_size: int = 32) -> Dict[str, float]:
+    """Torch CrossEncoder vs the exported model on `pairs`: score differences and pairs/sec."""
+    from sentence_transformers import CrossEncoder
+    ce = CrossEncoder(model_name)
+    onnx = OnnxCrossEncoder(directory, num_threads=num_threads, int8=int8)
+    ref, t_ref = _timed(lambda: ce.predict(list(pairs), batch_size=batch_size, show_progress_bar=False))
+    got, t_onnx = _timed(lambda: onnx.predict(pairs, batch_size=batch_size))
+    return {"max_abs_diff": float(np.abs(ref - got).max()), "mean_abs_diff": float(np.abs(ref - got).mean()),
+            "torch_pairs_per_sec": len(pairs) / t_ref, "onnx_pairs_per_sec": len(pairs) / t_onnx}
+
+
+def parity_clip(model_name: str, directory: str, texts: Sequence[str], images: Sequence,
+                int8: bool = False, num_threads: Optional[int] = None) -> Dict[str, float]:
+    """Torch vs exported CLIP: largest difference of normalized embeddings and of image-text cosines."""
+    from sentence_transformers import SentenceTransformer
+    st = SentenceTransformer(model_name)
+    onnx = OnnxCLIP(directory, num_threads=num_threads, int8=int8)
+    ref_t, got_t = (m.encode(list(texts), normalize_embeddings=True) for m in (st, onnx))
+    ref_i, got_i = (m.encode(list(images), normalize_embeddings=True) for m in (st, onnx))
+    return {"text_max_abs_diff": float(np.abs(ref_t - got_t).max()),
+            "image_max_abs_diff": float(np.abs(ref_i - got_i).max()),
+            "cosine_max_abs_diff": float(np.abs(ref_i @ ref_t.T - got_i @ got_t.T).max())}
+
+
+def _noise_images(n: int, size: int = 224) -> List:
+    from PIL import Image
+    rng = np.random.default_rng(0)
+    return [Image.fromarray((rng.random((size, size, 3)) * 255).astype(np.uint8)) for _ in range(n)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export the relevancy cross-encoder and CLIP to ONNX and check parity")
+    ap.add_argument("what", choices=["cross_encoder", "clip", "all"])
+    ap.add_argument("--out", default=DEFAULT_DIR, help="Writes <out>/cross_encoder and <out>/clip")
+    ap.add_argument("--int8", action="store_true", help="Also write dynamically int8-quantized models")
+    ap.add_argument("--cross_encoder", default=None, help="Default: models.relevancy_cross_encoder")
+    ap.add_argument("--clip", default=None, help="Default: models.image_text")
+    ap.add_argument("--num_threads", type=int, default=None)
+    ap.add_argument("--parity_pairs", type=int, default=256, help="Pairs scored by both backends (0: skip the check)")
+    args = ap.parse_args()
+
+    if args.what in ("cross_encoder", "all"):
+        name = args.cross_encoder or Config.models.get("relevancy_cross_encoder", "cross-encoder/ms-marco-MiniLM-L-12-v2")
+        out = export_cross_encoder(name, os.path.join(args.out, "cross_encoder"), int8=args.int8)
+        print(f"Exported {name} to {out}")
+        if args.parity_pairs:
+            import pandas as pd
+            reviews = pd.read_csv(os.path.join(Config.data_dir, "sample_reviews.csv"))["text"].tolist()
+            pairs = [(reviews[i % len(reviews)] + f" {i}", "A cafe in the city. Coffee, pastries and friendly staff.")
+                     for i in range(args.parity_pairs)]
+            for int8 in ([False, True] if args.int8 else [False]):
+                print("int8" if int8 else "fp32", parity_cross_encoder(name, out, pairs, int8, args.num_threads))
+    if args.what in ("clip", "all"):
+        name = args.clip or Config.models.get("image_text", "clip-ViT-B-32")
+        out = export_clip(name, os.path.join(args.out, "clip"), int8=args.int8)
+        print(f"Exported {name} to {out}")
+        if args.parity_pairs:
+            texts = ["a photo of a cafe", "a plate of pasta", "hotel room with a view"]
+            for int8 in ([False, True] if args.int8 else [False]):
+                print("int8" if int8 else "fp32", parity_clip(name, out, texts, _noise_images(4), int8, args.num_threads))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..config import Config
+
+# Precomputed bi-encoder embeddings of place descriptions. Each place is one
+# L2-normalized float32 row of embeddings.npy, keyed by place_id
+# (place_ids.json); the matrix is opened with mmap, so processes share it and
+# a request only encodes review text. Relevancy is then a batched dot product
+# with the review's place row, so its cost scales with the number of reviews,
+# not with reviews x description length.
+
+DEFAULT_DIR = os.path.join(Config.models_dir, "place_embeddings")
+
+
+def encode(encoder, texts: Sequence[str], batch_size: int = 64) -> np.ndarray:
+    """Normalized float32 embeddings; each distinct text is encoded once."""
+    uniq = list(dict.fromkeys(t or "" for t in texts))
+    if not uniq:
+        return np.zeros((0, encoder.get_sentence_embedding_dimension()), dtype=np.float32)
+    emb = encoder.encode(uniq, batch_size=batch_size, normalize_embeddings=True,
+                         convert_to_numpy=True, show_progress_bar=False).astype(np.float32, copy=False)
+    pos = {t: i for i, t in enumerate(uniq)}
+    return emb[[pos[t or ""] for t in texts]]
+
+
+class PlaceEmbeddingStore:
+    """place_id -> normalized description embedding; on disk under `directory`, or in memory if it is None.
+
+    A store on disk that was built with a different `model_name` is ignored and
+    overwritten on the next add().
+    """
+
+    def __init__(self, directory: Optional[str] = DEFAULT_DIR, model_name: Optional[str] = None) -> None:
+        self.directory = directory
+        self.model_name = model_name
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.place_ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        meta_path = os.path.join(directory, "meta.json") if directory else None
+        if meta_path and os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                built_with = json.load(f)["model_name"]
+            if model_name is not None and built_with != model_name:
+                return
+            self.model_name = built_with
+            with open(os.path.join(directory, "place_ids.json"), encoding="utf-8") as f:
+                self.place_ids = json.load(f)
+            self.matrix = np.load(os.path.join(directory, "embeddings.npy"), mmap_mode="r")
+            self.rows = {p: i for i, p in enumerate(self.place_ids)}
+
+    def __len__(self) -> int:
+        return len(self.place_ids)
+
+    def add(self, encoder, place_ids: Iterable, descriptions: Sequence[str], batch_size: int = 64,
+            replace: bool = False) -> "PlaceEmbeddingStore":
+        """Encode places not in the store yet (all given ones if `replace`); persists when on disk."""
+        latest = dict(zip((str(p) for p in place_ids), descriptions))
+        todo = {p: d for p, d in latest.items() if replace or p not in self.rows}
+        if not todo:
+            return self
+        emb = encode(encoder, list(todo.values()), batch_size)
+        matrix = np.array(self.matrix, dtype=np.float32) if len(self.matrix) else np.zeros((0, emb.shape[1]), np.float32)
+        pos = {p: i for i, p in enumerate(todo)}
+        new = [p for p in todo if p not in self.rows]
+        for p in todo:
+            if p in self.rows:
+                matrix[self.rows[p]] = emb[pos[p]]
+        if new:
+            matrix = np.vstack([matrix, emb[[pos[p] for p in new]]])
+            for p in new:
+                self.rows[p] = len(self.place_ids)
+                self.place_ids.append(p)
+        self.matrix = matrix
+        if self.directory:
+            self._write()
+        return self
+
+    def _write(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = os.path.join(self.directory, "embeddings.tmp.npy")
+        np.save(tmp, np.ascontiguousarray(self.matrix, dtype=np.float32))
+        os.replace(tmp, os.path.join(self.directory, "embeddings.npy"))
+        with open(os.path.join(self.directory, "place_ids.json"), "w", encoding="utf-8") as f:
+            json.dump(self.place_ids, f)
+        with open(os.path.join(self.directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"model_name": self.model_name, "dim": int(self.matrix.shape[1])}, f)
+        self.matrix = np.load(os.path.join(self.directory, "embeddings.npy"), mmap_mode="r")
+
+    def lookup(self, place_ids: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+        """(row per id, -1 where unknown; mask of known ids)."""
+        rows = np.array([self.rows.get(str(p), -1) for p in place_ids], dtype=np.int64)
+        return rows, rows >= 0
+
+    def score(self, review_emb: np.ndarray, place_ids: Sequence) -> np.ndarray:
+        """Cosine of each normalized review embedding with its place's row; NaN for unknown places."""
+        rows, known = self.lookup(place_ids)
+        sims = np.full(len(rows), np.nan, dtype=np.float32)
+        if known.any():
+            sims[known] = np.einsum("ij,ij->i", review_emb[known], self.matrix[rows[known]])
+        return sims
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Precompute place description embeddings for bi-encoder relevancy")
+    ap.add_argument("--places", required=True, help="CSV/Parquet with place_id and place_name/place_category/city/description")
+    ap.add_argument("--out", default=DEFAULT_DIR)
+    ap.add_argument("--replace", action="store_true", help="Re-encode places already in the store")
+    ap.add_argument("--batch_size", type=int, default=64)
+    args = ap.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    from ..storage import read_frame
+    from .relevancy_index import PLACE_FIELDS, place_descriptions
+    model_name = Config.models.get("relevancy_bi_encoder", "sentence-transformers/all-MiniLM-L6-v2")
+    places = read_frame(args.places, columns=["place_id", *PLACE_FIELDS]).drop_duplicates("place_id", keep="last")
+    store = PlaceEmbeddingStore(args.out, model_name=model_name)
+    store.add(SentenceTransformer(model_name), places["place_id"], place_descriptions(places),
+              batch_size=args.batch_size, replace=args.replace)
+    print(f"{args.out}: {len(store)} places, dim {store.matrix.shape[1]}")
+
+if __name__ == "__main__":
+    main()
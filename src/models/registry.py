@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+from glob import glob
+from itertools import chain
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from ..config import Config
+from .multilabel import MultiLabelSklearn, MultiLabelStreaming
+
+# Versioned store for multilabel models under models/registry/:
+#
+#   manifest.json        {"current": "v0003", "history": [...], "versions": {"v0003": {...}}}
+#   v0003/meta.json      backend, label order, vectorizer settings, metrics
+#   v0003/*.npy          fused float32 coefficients, idf, sorted vocabulary
+#
+# Versions are written once and never modified; "current" only moves through
+# promote() / rollback(). Arrays are opened with mmap, so a load is a few
+# small reads and forked workers share the pages read-only.
+
+DEFAULT_ROOT = os.path.join(Config.models_dir, "registry")
+
+# vectorizer settings that shape transform(); everything else is fit-time only
+TFIDF_PARAMS = ["analyzer", "binary", "decode_error", "encoding", "input", "lowercase", "ngram_range", "norm",
+                "stop_words", "strip_accents", "sublinear_tf", "token_pattern", "use_idf"]
+HASHING_PARAMS = ["alternate_sign", "analyzer", "binary", "decode_error", "encoding", "input", "lowercase",
+                  "n_features", "ngram_range", "norm", "stop_words", "strip_accents", "token_pattern"]
+
+def _vectorizer_params(vec, names: List[str]) -> dict:
+    params = vec.get_params()
+    if params.get("tokenizer") is not None or params.get("preprocessor") is not None or callable(params["analyzer"]):
+        raise ValueError("registry models need a built-in analyzer (no custom tokenizer/preprocessor callables)")
+    out = {k: params[k] for k in names}
+    out["ngram_range"] = list(out["ngram_range"])
+    if out["stop_words"] is not None and not isinstance(out["stop_words"], str):
+        out["stop_words"] = sorted(out["stop_words"])
+    return out
+
+def _sklearn_params(params: dict) -> dict:
+    return {**params, "ngram_range": tuple(params["ngram_range"])}
+
+
+class MappedMultiLabel(MultiLabelSklearn):
+    """Read-only multilabel model backed by one registry version directory.
+
+    Scores with the fused float32 path (see MultiLabelSklearn.compile); the
+    vocabulary is a sorted, memory-mapped string array looked up with
+    np.searchsorted instead of a pickled dict.
+    """
+
+    def __init__(self, directory: str) -> None:
+        d = Path(directory)
+        with open(d / "meta.json", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.version = self.meta["version"]
+        self.backend = self.meta["backend"]
+        self.labels = self.meta["labels"]
+        self._fused = (np.load(d / "coef.npy", mmap_mode="r"), np.load(d / "intercept.npy"))
+        self.idf = np.load(d / "idf.npy", mmap_mode="r")
+        params = _sklearn_params(self.meta["vectorizer"])
+        if self.backend == "tfidf":
+            self.terms = np.load(d / "terms.npy", mmap_mode="r")
+            self.term_cols = np.load(d / "term_cols.npy", mmap_mode="r")
+            self.params = params
+            self._analyzer = TfidfVectorizer(**params).build_analyzer()
+        else:
+            self.vectorizer = HashingVectorizer(**params, dtype=np.float32)
+
+    def _features(self, texts: List[str]) -> sp.csr_matrix:
+        if self.backend != "tfidf":
+            X = self.vectorizer.transform(texts)
+            return normalize(X @ sp.diags(np.asarray(self.idf), format="csr"))
+        # same output as the fitted TfidfVectorizer.transform, in float32
+        tokens = [self._analyzer(t) for t in texts]
+        flat = np.array(list(chain.from_iterable(tokens)), dtype=str)
+        n_features = self._fused[0].shape[0]
+        if len(self.terms) and len(flat):
+            pos = np.minimum(np.searchsorted(self.terms, flat), len(self.terms) - 1)
+            hit = self.terms[pos] == flat
+        else:
+            pos = hit = np.zeros(len(flat), dtype=bool)
+        rows = np.repeat(np.arange(len(texts)), [len(t) for t in tokens])[hit]
+        cols = self.term_cols[pos[hit]]
+        X = sp.csr_matrix((np.ones(len(cols), dtype=np.float32), (rows, cols)), shape=(len(texts), n_features))
+        if self.params["binary"]:
+            X.data[:] = 1
+        if self.params["sublinear_tf"]:
+            np.log(X.data, X.data)
+            X.data += 1
+        if self.params["use_idf"]:
+            X.data *= self.idf[X.indices]
+        if self.params["norm"]:
+            X = normalize(X, norm=self.params["norm"], copy=False)
+        return X
+
+    def compile(self) -> "MappedMultiLabel":
+        return self
+
+    def save(self, path: str) -> None:
+        raise TypeError(f"{self.version} is a read-only registry version; versions are written by "
+                        "ModelRegistry.register(model) from the trained MultiLabelSklearn/MultiLabelStreaming model")
+
+
+class ModelRegistry:
+    """Versions of trained multilabel models plus the pointer to the one being served."""
+
+    def __init__(self, root: str = DEFAULT_ROOT) -> None:
+        self.root = Path(root)
+        self.manifest_path = self.root / "manifest.json"
+
+    def _read(self) -> dict:
+        if not self.manifest_path.exists():
+            return {"current": None, "history": [], "versions": {}}
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write(self, manifest: dict) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)  # readers never see a half-written manifest
+
+    def versions(self) -> Dict[str, dict]:
+        return self._read()["versions"]
+
+    def current(self) -> Optional[str]:
+        return self._read()["current"]
+
+    def register(self, model: MultiLabelSklearn, metrics: Optional[dict] = None,
+                 source: Optional[str] = None, promote: bool = False) -> str:
+        """Export `model` as a new version; returns its name (e.g. "v0004")."""
+        manifest = self._read()
+        version = f"v{len(manifest['versions']) + 1:04d}"
+        out = self.root / version
+        out.mkdir(parents=True, exist_ok=False)
+        if model._fused is None:
+            model.compile()
+        W, b = model._fused
+        np.save(out / "coef.npy", np.ascontiguousarray(W, dtype=np.float32))
+        np.save(out / "intercept.npy", np.asarray(b, dtype=np.float32))
+        if isinstance(model, MultiLabelStreaming):
+            backend = "hashing"
+            params = _vectorizer_params(model.vectorizer, HASHING_PARAMS)
+            np.save(out / "idf.npy", np.asarray(model.idf, dtype=np.float32))
+        else:
+            backend = "tfidf"
+            params = _vectorizer_params(model.vectorizer, TFIDF_PARAMS)
+            terms = np.asarray(model.vectorizer.get_feature_names_out(), dtype=str)
+            order = np.argsort(terms, kind="stable")
+            np.save(out / "terms.npy", terms[order])
+            np.save(out / "term_cols.npy", order.astype(np.int32))
+            idf = model.vectorizer.idf_ if params["use_idf"] else np.ones(len(terms))
+            np.save(out / "idf.npy", np.asarray(idf, dtype=np.float32))
+        entry = {
+            "version": version,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "backend": backend,
+            "labels": list(model.labels),
+            "n_features": int(W.shape[0]),
+            "metrics": metrics or {},
+            "source": source,
+        }
+        with open(out / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({**entry, "vectorizer": params}, f, indent=2)
+        manifest["versions"][version] = entry
+        if promote:
+            manifest["history"].append(version)
+            manifest["current"] = version
+        self._write(manifest)
+        return version
+
+    def promote(self, version: str) -> None:
+        manifest = self._read()
+        if version not in manifest["versions"]:
+            raise KeyError(f"unknown model version {version!r}")
+        manifest["history"].append(version)
+        manifest["current"] = version
+        self._write(manifest)
+
+    def rollback(self) -> str:
+        """Re-serve the previously promoted version; returns it."""
+        manifest = self._read()
+        if len(manifest["history"]) < 2:
+            raise ValueError("nothing to roll back to")
+        manifest["history"].pop()
+        manifest["current"] = manifest["history"][-1]
+        self._write(manifest)
+        return manifest["current"]
+
+    def load(self, version: Optional[str] = None) -> MappedMultiLabel:
+        version = version or self.current()
+        if version is None:
+            raise FileNotFoundError(f"no model promoted in {self.root}")
+        return MappedMultiLabel(str(self.root / version))
+
+
+def load_serving_model(models_dir: Optional[str] = None, version: Optional[str] = None) -> Optional[MultiLabelSklearn]:
+    """The registry's current (or given) version; without one, the newest legacy multilabel_*.joblib, compiled. None if neither."""
+    models_dir = models_dir or Config.models_dir
+    registry = ModelRegistry(os.path.join(models_dir, "registry"))
+    if version is not None or registry.current() is not None:
+        return registry.load(version)
+    # models/ also holds place_index.joblib and relevancy_student-*.joblib: only multilabel payloads qualify
+    for path in sorted(glob(os.path.join(models_dir, "multilabel_*.joblib")), key=os.path.getmtime, reverse=True):
+        payload = joblib.load(path)
+        if isinstance(payload, dict) and "binarizer" in payload:
+            return MultiLabelSklearn.from_payload(payload).compile()
+    return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Inspect and manage the multilabel model registry")
+    ap.add_argument("--root", default=DEFAULT_ROOT)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list")
+    p = sub.add_parser("register", help="Import a saved .joblib model")
+    p.add_argument("path")
+    p.add_argument("--promote", action="store_true")
+    p = sub.add_parser("promote")
+    p.add_argument("version")
+    sub.add_parser("rollback")
+    p = sub.add_parser("load_time", help="Time a cold load + one prediction")
+    p.add_argument("--version", default=None)
+    args = ap.parse_args()
+
+    reg = ModelRegistry(args.root)
+    if args.cmd == "list":
+        current = reg.current()
+        for v, e in reg.versions().items():
+            print(f"{'*' if v == current else ' '} {v}  {e['created']}  {e['backend']}  {json.dumps(e['metrics'])}  {e['source'] or ''}")
+    elif args.cmd == "register":
+        print(reg.register(MultiLabelSklearn.load(args.path), source=os.path.basename(args.path), promote=args.promote))
+    elif args.cmd == "promote":
+        reg.promote(args.version)
+        print("current:", args.version)
+    elif args.cmd == "rollback":
+        print("current:", reg.rollback())
+    else:
+        t0 = time.perf_counter()
+        model = reg.load(args.version)
+        t1 = time.perf_counter()
+        model.predict_proba(["warm up the page cache"])
+        t2 = time.perf_counter()
+        print(f"{model.version}: load {1e3 * (t1 - t0):.2f} ms, first prediction {1e3 * (t2 - t1):.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,164 @@
 from __future__ import annotations
 
-from typing import Iterable, List, Tuple
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
 
+from ..cache import SqliteCache, text_key
 from ..config import Config
+from ..translate import length_batches
+from .onnx_backend import OnnxCrossEncoder, is_exported, ort
+from .place_embeddings import DEFAULT_DIR as PLACE_EMBEDDINGS_DIR, PlaceEmbeddingStore, encode
+from .relevancy_index import DEFAULT_PATH as PLACE_INDEX_PATH, PlaceTextIndex, batch_scores
+from .relevancy_student import DEFAULT_PATH as STUDENT_PATH, RelevancyStudent
 
 try:
-    from sentence_transformers import CrossEncoder
+    import torch
+    from sentence_transformers import CrossEncoder, SentenceTransformer
 except Exception:
-    CrossEncoder = None
+    torch = CrossEncoder = SentenceTransformer = None
+
+# Cross-encoder scoring goes through a batching layer:
+# - pairs are deduplicated (spam texts repeat against the same place);
+# - raw scores are cached in an in-process LRU and, optionally, on disk,
+#   keyed by (text hash, description hash) within the model name, so only
+#   unseen pairs reach the model;
+# - the rest are sorted into token-length buckets bounded by rows and padded
+#   tokens, so each forward pass pads to a similar length.
+#
+# mode="bi" scores with a bi-encoder instead: review texts are encoded and
+# dotted with precomputed place embeddings (place_embeddings.py), and the
+# cross-encoder only re-scores pairs whose bi-encoder score falls inside
+# `rerank_band` (None: no re-ranking).
+#
+# An exported ONNX cross-encoder (`onnx_dir` or option relevancy_onnx, see
+# onnx_backend.py) replaces the torch one wherever it is used; its scores are
+# cached under their own namespace, and its threads come from the ORT session.
+#
+# mode="student" scores with a RelevancyStudent distilled from the
+# cross-encoder (relevancy_student.py), loaded from the relevancy_student path.
+
+DEFAULT_CACHE = os.path.join(Config.data_dir, "cache", "relevancy.sqlite")
 
 
 class RelevancyModel:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        num_threads: Optional[int] = None,
+        cache_path: Optional[str] = None,
+        lru_size: Optional[int] = None,
+        place_index: Optional[PlaceTextIndex] = None,
+        mode: Optional[str] = None,
+        place_store: Optional[PlaceEmbeddingStore] = None,
+        onnx_dir: Optional[str] = None,
+    ) -> None:
         cfg = Config()
+        opts = cfg.options or {}
         self.model_name = cfg.models.get("relevancy_cross_encoder", "cross-encoder/ms-marco-MiniLM-L-12-v2")
         self.model = None
         self.backend = "ce"
+        self.onnx_dir = onnx_dir or opts.get("relevancy_onnx") or None
+        self.onnx_int8 = bool(opts.get("onnx_int8", False))
+        self.cache_namespace = self.model_name
         self._warned = False
+        self._loaded = False
+        self.mode = mode or opts.get("relevancy_mode", "ce")
+        self.bi_model_name = cfg.models.get("relevancy_bi_encoder", "sentence-transformers/all-MiniLM-L6-v2")
+        self.bi_model = None
+        self.place_store = place_store
+        band = opts.get("relevancy_rerank_band", [0.2, 0.5])
+        self.rerank_band = tuple(float(b) for b in band) if band else None
+        self.student_path = opts.get("relevancy_student") or STUDENT_PATH
+        self.student: Optional[RelevancyStudent] = None
+        self.batch_size = batch_size or int(opts.get("relevancy_batch_size", 32))
+        self.max_tokens = max_tokens or int(opts.get("relevancy_max_tokens", 8192))
+        self.num_threads = num_threads or opts.get("relevancy_num_threads") or None
+        self.lru_size = lru_size or int(opts.get("relevancy_lru_size", 100_000))
+        # None: the relevancy_cache option (default DEFAULT_CACHE); "" disables the disk cache
+        self.cache_path = (opts.get("relevancy_cache", DEFAULT_CACHE) if cache_path is None else cache_path) or None
+        self._cache: Optional[SqliteCache] = None
+        self._lru: "OrderedDict[str, float]" = OrderedDict()
+        # TF-IDF fallback: a fitted place index (models/place_index.joblib is picked up when present)
+        self.place_index = place_index
+        if self.place_index is None and os.path.exists(PLACE_INDEX_PATH):
+            self.place_index = PlaceTextIndex.load(PLACE_INDEX_PATH)
 
     def load(self) -> None:
+        self._loaded = True
+        if self.mode == "bi":
+            self._load_bi()
+            if self.bi_model is not None:
+                if self.rerank_band is not None:
+                    self._load_ce(required=False)
+                return
+        if self.mode == "student":
+            self._load_student()
+            return
+        self._load_ce()
+
+    def _load_ce(self, required: bool = True) -> None:
+        if self.onnx_dir:
+            if ort is not None and is_exported(self.onnx_dir):
+                self.model = OnnxCrossEncoder(self.onnx_dir, num_threads=self.num_threads, int8=self.onnx_int8)
+                self.cache_namespace = f"{self.model.meta['source']}@{os.path.basename(self.model.path)}"
+                self.backend = "ce"
+                return
+            print(f"Warning: no usable ONNX cross-encoder in {self.onnx_dir}; using sentence-transformers.")
         if CrossEncoder is None:
+            reason = "sentence-transformers not available"
+        else:
+            try:
+                self.model = CrossEncoder(self.model_name)
+                self.backend = "ce"
+                return
+            except Exception as exc:
+                reason = f"failed to load cross-encoder: {exc}"
+        if required:
+            self._fallback(reason)
+        else:
+            print(f"Warning: cross-encoder re-ranking disabled ({reason}).")
+
+    def _load_bi(self) -> None:
+        if SentenceTransformer is None:
             self._fallback("sentence-transformers not available")
             return
         try:
-            self.model = CrossEncoder(self.model_name)
-            self.backend = "ce"
+            self.bi_model = SentenceTransformer(self.bi_model_name)
         except Exception as exc:
-            self._fallback(f"failed to load cross-encoder: {exc}")
+            self._fallback(f"failed to load bi-encoder: {exc}")
+            return
+        if self.place_store is None:
+            store = PlaceEmbeddingStore(PLACE_EMBEDDINGS_DIR, model_name=self.bi_model_name)
+            self.place_store = store if len(store) else None
+
+    def _load_student(self) -> None:
+        if not os.path.exists(self.student_path):
+            self._fallback(f"no student model at {self.student_path}")
+            return
+        student = RelevancyStudent.load(self.student_path)
+        if student.uses_embeddings:
+            if SentenceTransformer is None:
+                self._fallback("sentence-transformers not available for the student's embeddings")
+                return
+            try:
+                self.bi_model = SentenceTransformer(student.embedding_model)
+            except Exception as exc:
+                self._fallback(f"failed to load the student's encoder: {exc}")
+                return
+        self.student = student
+        self.backend = "student"
+
+    def index_places(self, place_ids: List, descriptions: List[str]) -> None:
+        """Precompute rows for these places in memory, for whichever scorer has no saved index loaded."""
+        if self.bi_model is not None and self.place_store is None:
+            self.place_store = PlaceEmbeddingStore(None, model_name=self.bi_model_name).add(
+                self.bi_model, place_ids, descriptions, self.batch_size)
+        if self.place_index is None:
+            self.place_index = PlaceTextIndex().fit(place_ids, descriptions)
 
     def _fallback(self, reason: str) -> None:
         self.model = None
@@ -38,36 +167,110 @@ class RelevancyModel:
             print(f"Warning: relevancy model fallback to TF-IDF ({reason}).")
             self._warned = True
 
-    def score_pairs(self, pairs: Iterable[Tuple[str, str]]) -> np.ndarray:
+    def score_pairs(self, pairs: Iterable[Tuple[str, str]], place_ids: Optional[List] = None) -> np.ndarray:
+        """Relevancy of (review text, place description) pairs in [0, 1].
+
+        `place_ids` (aligned with `pairs`) lets the bi-encoder and the TF-IDF
+        fallback use precomputed place rows instead of re-encoding the
+        descriptions.
+        """
         pairs = list(pairs)
         if not pairs:
             return np.array([], dtype=float)
-        if self.model is None and self.backend == "ce":
+        if not self._loaded:
             self.load()
+        if self.student is not None:
+            return self.student.predict(pairs, encoder=self.bi_model)
+        if self.bi_model is not None:
+            return self._score_bi(pairs, place_ids)
         if self.model is not None and self.backend == "ce":
-            scores = np.asarray(self.model.predict(pairs), dtype=float)
+            scores = self._score_ce(pairs)
             if scores.min() < 0.0 or scores.max() > 1.0:
                 scores = 1.0 / (1.0 + np.exp(-scores))
             return scores
-        return self._score_tfidf(pairs)
+        return self._score_tfidf(pairs, place_ids)
+
+    def _score_bi(self, pairs: List[Tuple[str, str]], place_ids: Optional[List] = None) -> np.ndarray:
+        R = encode(self.bi_model, [a or "" for a, _ in pairs], self.batch_size)
+        ids = place_ids if place_ids is not None else [None] * len(pairs)
+        sims = self.place_store.score(R, ids) if self.place_store is not None else np.full(len(pairs), np.nan, np.float32)
+        miss = np.flatnonzero(np.isnan(sims))
+        if len(miss):
+            # places without a precomputed row: encode their descriptions now
+            D = encode(self.bi_model, [pairs[i][1] or "" for i in miss], self.batch_size)
+            sims[miss] = np.einsum("ij,ij->i", R[miss], D)
+        scores = np.clip(sims.astype(float), 0.0, 1.0)
+        if self.model is not None and self.rerank_band is not None:
+            lo, hi = self.rerank_band
+            band = np.flatnonzero((scores >= lo) & (scores <= hi))
+            if len(band):
+                ce = self._score_ce([pairs[i] for i in band])
+                if ce.min() < 0.0 or ce.max() > 1.0:
+                    ce = 1.0 / (1.0 + np.exp(-ce))
+                scores[band] = ce
+        return scores
+
+    @staticmethod
+    def pair_key(text: str, desc: str) -> str:
+        return text_key(text_key(text or ""), text_key(desc or ""))
+
+    def _disk(self) -> Optional[SqliteCache]:
+        if self._cache is None and self.cache_path:
+            self._cache = SqliteCache(self.cache_path, table="relevancy_scores")
+        return self._cache
+
+    def _remember(self, items: Dict[str, float]) -> None:
+        for k, v in items.items():
+            self._lru[k] = v
+            self._lru.move_to_end(k)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _score_ce(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        """Raw cross-encoder scores in input order; cached pairs and duplicates are not re-scored."""
+        keys = [self.pair_key(a, b) for a, b in pairs]
+        scores: Dict[str, float] = {}
+        for k in dict.fromkeys(keys):
+            if k in self._lru:
+                scores[k] = self._lru[k]
+                self._lru.move_to_end(k)
+        todo = {k: p for k, p in zip(keys, pairs) if k not in scores}
+        disk = self._disk()
+        if todo and disk is not None:
+            hits = {k: float(v) for k, v in disk.get_many(todo, namespace=self.cache_namespace).items()}
+            scores.update(hits)
+            self._remember(hits)
+            todo = {k: p for k, p in todo.items() if k not in hits}
+        if todo:
+            new = dict(zip(todo, self._predict_bucketed(list(todo.values()))))
+            scores.update(new)
+            self._remember(new)
+            if disk is not None:
+                disk.put_many(new, namespace=self.cache_namespace)
+        return np.array([scores[k] for k in keys], dtype=float)
+
+    def _predict_bucketed(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        if self.num_threads and torch is not None and not isinstance(self.model, OnnxCrossEncoder):
+            torch.set_num_threads(int(self.num_threads))
+        pairs = [(a or "", b or "") for a, b in pairs]
+        tok = getattr(self.model, "tokenizer", None)
+        if tok is not None:
+            max_len = getattr(self.model, "max_length", None) or tok.model_max_length
+            enc = tok([a for a, _ in pairs], [b for _, b in pairs], truncation=True, max_length=max_len)
+            lengths = [len(ids) for ids in enc["input_ids"]]
+        else:
+            lengths = [len(a) + len(b) for a, b in pairs]
+        out: List[float] = [0.0] * len(pairs)
+        for batch in length_batches(lengths, self.batch_size, self.max_tokens):
+            preds = self.model.predict([pairs[i] for i in batch], batch_size=len(batch), show_progress_bar=False)
+            for i, v in zip(batch, np.asarray(preds, dtype=float).reshape(len(batch))):
+                out[i] = float(v)
+        return out
 
-    def _score_tfidf(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+    def _score_tfidf(self, pairs: List[Tuple[str, str]], place_ids: Optional[List] = None) -> np.ndarray:
         texts = [a or "" for a, _ in pairs]
         descs = [b or "" for _, b in pairs]
-        corpus = texts + descs
-        vec = TfidfVectorizer(max_features=50000, ngram_range=(1, 2))
-        mat = vec.fit_transform(corpus)
-        n = len(pairs)
-        a = mat[:n]
-        b = mat[n:]
-
-        # Cosine similarity for each aligned pair.
-        num = (a.multiply(b)).sum(axis=1).A1
-        a_norm = np.sqrt(a.multiply(a).sum(axis=1)).A1
-        b_norm = np.sqrt(b.multiply(b).sum(axis=1)).A1
-        denom = a_norm * b_norm
-        sims = np.zeros_like(num, dtype=float)
-        mask = denom > 0
-        sims[mask] = num[mask] / denom[mask]
-        sims = np.clip(sims, 0.0, 1.0)
-        return sims
+        if self.place_index is not None:
+            return self.place_index.score(texts, place_ids if place_ids is not None else [None] * len(pairs), descs)
+        # no index: fit on this batch (scores depend on the batch; build one with python -m src.models.relevancy_index)
+        return batch_scores(texts, descs)
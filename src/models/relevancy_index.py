@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import argparse
+import os
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from ..config import Config
+
+# Fitted TF-IDF index of place descriptions for the relevancy fallback. The
+# vectorizer is fitted once, on descriptions plus a sample of reviews (so words
+# reviews use but descriptions lack still get a weight); each place is one
+# L2-normalized row keyed by place_id. A review is scored by transforming it
+# with the frozen vocabulary and dotting it with its place's row, so a score
+# costs O(review tokens) and does not depend on the rest of the batch.
+# New places are added with the same vocabulary; when too many of their words
+# are outside it (a new category, say), add() refits on the stored descriptions
+# and review sample. Pairs whose review or place vector is still all zeros are
+# scored with a TF-IDF fitted on just those pairs, as before the index existed.
+
+DEFAULT_PATH = os.path.join(Config.models_dir, "place_index.joblib")
+PLACE_FIELDS = ["place_name", "place_category", "city", "description"]
+REVIEW_SAMPLE = 20000
+REFIT_OOV = 0.2
+
+
+def _field(rec: Mapping, key: str) -> str:
+    v = rec.get(key, "")
+    return "" if v is None or (isinstance(v, float) and np.isnan(v)) else str(v)
+
+
+def place_description(rec: Mapping) -> str:
+    """The text a place is matched against: "name — category, city. description" (missing parts blank)."""
+    name, cat, city, desc = (_field(rec, k) for k in PLACE_FIELDS)
+    return f"{name} — {cat}, {city}. {desc}"
+
+
+def place_descriptions(df: pd.DataFrame) -> List[str]:
+    """place_description for every row of `df`."""
+    cols = {k: (df[k].tolist() if k in df.columns else [""] * len(df)) for k in PLACE_FIELDS}
+    return [place_description(dict(zip(PLACE_FIELDS, vals))) for vals in zip(*cols.values())]
+
+
+def batch_scores(texts: Sequence[str], descs: Sequence[str]) -> np.ndarray:
+    """Cosine of aligned (text, description) pairs under a TF-IDF fitted on these pairs alone, in [0, 1]."""
+    texts = [t or "" for t in texts]
+    descs = [d or "" for d in descs]
+    if not texts:
+        return np.array([], dtype=float)
+    vec = TfidfVectorizer(max_features=50000, ngram_range=(1, 2))
+    try:
+        mat = vec.fit_transform(texts + descs)
+    except ValueError:  # empty vocabulary: nothing but stop words/punctuation
+        return np.zeros(len(texts))
+    n = len(texts)
+    a = normalize(mat[:n])
+    b = normalize(mat[n:])
+    return np.clip(np.asarray(a.multiply(b).sum(axis=1)).ravel(), 0.0, 1.0)
+
+
+def sample_reviews(reviews: Sequence[str], n: int = REVIEW_SAMPLE, random_state: int = 42) -> List[str]:
+    """Up to `n` non-empty review texts, sampled without replacement in their original order."""
+    reviews = [r for r in reviews if isinstance(r, str) and r]
+    if len(reviews) > n:
+        keep = np.sort(np.random.default_rng(random_state).choice(len(reviews), n, replace=False))
+        reviews = [reviews[i] for i in keep]
+    return reviews
+
+
+class PlaceTextIndex:
+    """place_id -> normalized TF-IDF row of the place description.
+
+    `refit_oov` is the share of unseen words in the descriptions passed to
+    add() above which the vectorizer is refitted instead of extended.
+    """
+
+    def __init__(self, max_features: int = 50000, ngram_range: tuple = (1, 2), refit_oov: float = REFIT_OOV) -> None:
+        self.vectorizer = TfidfVectorizer(max_features=max_features, ngram_range=ngram_range)
+        self.refit_oov = refit_oov
+        self.matrix = sp.csr_matrix((0, 0))
+        self.place_ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.descriptions: Optional[List[str]] = []  # aligned with place_ids; None for indexes saved without them
+        self.review_sample: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.place_ids)
+
+    def _vectors(self, texts: Sequence[str]) -> sp.csr_matrix:
+        return normalize(self.vectorizer.transform([t or "" for t in texts]))
+
+    def fit(self, place_ids: Iterable, descriptions: Sequence[str], reviews: Optional[Sequence[str]] = None,
+            review_sample: int = REVIEW_SAMPLE, random_state: int = 42) -> "PlaceTextIndex":
+        """Fit the vocabulary on `descriptions` plus up to `review_sample` of `reviews`, then index the places."""
+        ids = [str(p) for p in place_ids]
+        descriptions = [d or "" for d in descriptions]
+        if reviews is not None:
+            self.review_sample = sample_reviews(reviews, review_sample, random_state)
+        self.vectorizer.fit(descriptions + self.review_sample)
+        self.matrix = sp.csr_matrix((0, len(self.vectorizer.vocabulary_)))
+        self.place_ids, self.rows, self.descriptions = [], {}, []
+        return self.add(ids, descriptions, refit=False)
+
+    def oov_rate(self, texts: Sequence[str]) -> float:
+        """Share of the words in `texts` that the fitted vocabulary does not know."""
+        analyze = self.vectorizer.build_analyzer()
+        vocab = self.vectorizer.vocabulary_
+        words = [w for t in texts for w in analyze(t or "") if " " not in w]  # unigrams only
+        return sum(w not in vocab for w in words) / len(words) if words else 0.0
+
+    def refit(self) -> "PlaceTextIndex":
+        """Refit the vocabulary on the stored descriptions and review sample, keeping every place."""
+        if self.descriptions is None:
+            raise ValueError("this index was saved without its descriptions; rebuild it with fit()")
+        return self.fit(self.place_ids, self.descriptions)
+
+    def add(self, place_ids: Iterable, descriptions: Sequence[str], refit: bool = True) -> "PlaceTextIndex":
+        """Insert or replace places using the fitted vocabulary.
+
+        Words the vocabulary has not seen are ignored, unless they are more than
+        `refit_oov` of the new descriptions' words and `refit` is set: then the
+        vocabulary is refitted on all descriptions (and the review sample).
+        """
+        ids = [str(p) for p in place_ids]
+        descriptions = [d or "" for d in descriptions]
+        latest = dict(zip(ids, range(len(ids))))  # last description wins for repeated ids
+        if refit and self.descriptions is not None and self.oov_rate(descriptions) > self.refit_oov:
+            merged = dict(zip(self.place_ids, self.descriptions))
+            merged.update((p, descriptions[i]) for p, i in latest.items())
+            return self.fit(list(merged), list(merged.values()))
+        vecs = self._vectors(descriptions)
+        new = [p for p in latest if p not in self.rows]
+        upd = [p for p in latest if p in self.rows]
+        if upd:
+            m = self.matrix.tolil()
+            for p in upd:
+                m[self.rows[p]] = vecs[latest[p]]
+                if self.descriptions is not None:
+                    self.descriptions[self.rows[p]] = descriptions[latest[p]]
+            self.matrix = m.tocsr()
+        if new:
+            self.matrix = sp.vstack([self.matrix, vecs[[latest[p] for p in new]]], format="csr")
+            for p in new:
+                self.rows[p] = len(self.place_ids)
+                self.place_ids.append(p)
+                if self.descriptions is not None:
+                    self.descriptions.append(descriptions[latest[p]])
+        return self
+
+    def score(self, texts: Sequence[str], place_ids: Sequence, descriptions: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Cosine of each review with its place, in [0, 1].
+
+        Places missing from the index use `descriptions` (transformed with the
+        same vocabulary) when given, else score NaN. With `descriptions`, pairs
+        whose review or place vector is all zeros under the vocabulary are
+        scored by batch_scores() instead of getting 0.
+        """
+        n = len(texts)
+        R = self._vectors(list(texts))
+        rows = np.array([self.rows.get(str(p), -1) for p in place_ids], dtype=np.int64)
+        known = rows >= 0
+        sims = np.full(n, np.nan)
+        empty = np.zeros(n, dtype=bool)
+        if known.any():
+            P = self.matrix[rows[known]]
+            sims[known] = np.asarray(R[known].multiply(P).sum(axis=1)).ravel()
+            empty[known] = P.getnnz(axis=1) == 0
+        if descriptions is not None and (~known).any():
+            miss = np.flatnonzero(~known)
+            D = self._vectors([descriptions[i] for i in miss])
+            sims[miss] = np.asarray(R[miss].multiply(D).sum(axis=1)).ravel()
+            empty[miss] = D.getnnz(axis=1) == 0
+        if descriptions is not None:
+            fallback = np.flatnonzero(empty | (R.getnnz(axis=1) == 0))
+            if len(fallback):
+                sims[fallback] = batch_scores([texts[i] for i in fallback], [descriptions[i] for i in fallback])
+        return np.clip(sims, 0.0, 1.0)
+
+    def save(self, path: str = DEFAULT_PATH) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        joblib.dump({"vectorizer": self.vectorizer, "matrix": self.matrix, "place_ids": self.place_ids,
+                     "descriptions": self.descriptions, "review_sample": self.review_sample,
+                     "refit_oov": self.refit_oov}, path)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_PATH) -> "PlaceTextIndex":
+        payload = joblib.load(path)
+        obj = cls()
+        obj.vectorizer = payload["vectorizer"]
+        obj.matrix = payload["matrix"]
+        obj.place_ids = list(payload["place_ids"])
+        obj.rows = {p: i for i, p in enumerate(obj.place_ids)}
+        obj.descriptions = payload.get("descriptions")
+        obj.review_sample = payload.get("review_sample", [])
+        obj.refit_oov = payload.get("refit_oov", REFIT_OOV)
+        return obj
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build or extend the place-description relevancy index")
+    ap.add_argument("--places", required=True, help="CSV/Parquet with place_id and place_name/place_category/city/description")
+    ap.add_argument("--out", default=DEFAULT_PATH)
+    ap.add_argument("--reviews", default=None, help="Optional CSV/Parquet with a text column; a sample joins the vocabulary")
+    ap.add_argument("--review_sample", type=int, default=REVIEW_SAMPLE, help="Reviews sampled into the vocabulary")
+    ap.add_argument("--add", action="store_true",
+                    help=f"Add/replace places in the existing index; refits if over {REFIT_OOV:.0%} of their words are new")
+    args = ap.parse_args()
+
+    from ..storage import read_frame
+    places = read_frame(args.places, columns=["place_id", *PLACE_FIELDS]).drop_duplicates("place_id", keep="last")
+    descs = place_descriptions(places)
+    reviews = read_frame(args.reviews, columns=["text"])["text"].tolist() if args.reviews else None
+    if args.add and os.path.exists(args.out):
+        index = PlaceTextIndex.load(args.out).add(places["place_id"], descs, refit=reviews is None)
+        if reviews is not None:
+            index.review_sample = sample_reviews(reviews, args.review_sample)
+            index.refit()
+    else:
+        index = PlaceTextIndex().fit(places["place_id"], descs, reviews, args.review_sample)
+    index.save(args.out)
+    print(f"Wrote {args.out} with {len(index)} places.")
+
+if __name__ == "__main__":
+    main()
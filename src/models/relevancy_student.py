@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.stats import spearmanr
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import Ridge
+from sklearn.preprocessing import normalize
+
+from ..config import Config
+from ..utils import TOKEN_RE
+from .place_embeddings import encode
+
+# Student relevancy scorer distilled from the cross-encoder. A ridge
+# regression on cheap pair features is fitted to the teacher's logits:
+# - lexical: token overlap counts/ratios, lengths, and hashed tokens
+#   (shared review/description tokens and review tokens, 2**16 buckets);
+# - "tfidf": cosine of the pair under a TF-IDF vocabulary fitted on the sample;
+# - "embed": dot product of normalized bi-encoder embeddings.
+# Each feature set adds to the previous one; the distillation CLI fits and
+# reports all of them against the teacher, so a speed/quality point can be
+# picked and served with relevancy_mode: "student".
+
+FEATURE_SETS = ["lexical", "tfidf", "embed"]
+DEFAULT_PATH = os.path.join(Config.models_dir, "relevancy_student-tfidf.joblib")
+N_HASH = 2 ** 16
+
+
+def _tokens(s: str) -> List[str]:
+    return [t.lower() for t in TOKEN_RE.findall(s or "")]
+
+
+def _logit(p: np.ndarray, eps: float = 1e-4) -> np.ndarray:
+    p = np.clip(p, eps, 1.0 - eps)
+    return np.log(p / (1.0 - p))
+
+
+class RelevancyStudent:
+    """Pair-feature regressor of the teacher relevancy; predict() returns scores in (0, 1)."""
+
+    def __init__(self, features: str = "tfidf", alpha: float = 1.0, embedding_model: Optional[str] = None,
+                 batch_size: int = 64) -> None:
+        if features not in FEATURE_SETS:
+            raise ValueError(f"features must be one of {FEATURE_SETS}")
+        self.features = features
+        self.alpha = alpha
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size
+        self.hasher = FeatureHasher(n_features=N_HASH, input_type="string", alternate_sign=False)
+        self.vectorizer: Optional[TfidfVectorizer] = None
+        self.reg = Ridge(alpha=alpha)
+
+    @property
+    def uses_embeddings(self) -> bool:
+        return self.features == "embed"
+
+    def _matrix(self, pairs: Sequence[Tuple[str, str]], encoder=None) -> sp.csr_matrix:
+        texts = [a or "" for a, _ in pairs]
+        descs = [b or "" for _, b in pairs]
+        dense, hashed = [], []
+        for a, b in zip(texts, descs):
+            ta, tb = set(_tokens(a)), set(_tokens(b))
+            shared = ta & tb
+            union = len(ta | tb)
+            dense.append([
+                np.log1p(len(shared)),
+                len(shared) / union if union else 0.0,
+                len(shared) / len(tb) if tb else 0.0,
+                len(shared) / len(ta) if ta else 0.0,
+                np.log1p(len(ta)),
+                np.log1p(len(tb)),
+            ])
+            hashed.append([f"s:{t}" for t in shared] + [f"r:{t}" for t in ta])
+        cols = [np.asarray(dense, dtype=np.float64)]
+        if self.features in ("tfidf", "embed"):
+            R = normalize(self.vectorizer.transform(texts))
+            D = normalize(self.vectorizer.transform(descs))
+            cols.append(np.asarray(R.multiply(D).sum(axis=1)))
+        if self.uses_embeddings:
+            if encoder is None:
+                raise ValueError(f"this student needs the {self.embedding_model} encoder")
+            cols.append(np.einsum("ij,ij->i", encode(encoder, texts, self.batch_size),
+                                  encode(encoder, descs, self.batch_size))[:, None])
+        return sp.hstack([sp.csr_matrix(np.hstack(cols)), self.hasher.transform(hashed)], format="csr")
+
+    def fit(self, pairs: Sequence[Tuple[str, str]], teacher_scores: Sequence[float], encoder=None) -> "RelevancyStudent":
+        """Fit to teacher scores in [0, 1] (regressed in logit space)."""
+        pairs = list(pairs)
+        if self.features in ("tfidf", "embed"):
+            self.vectorizer = TfidfVectorizer(max_features=50000, ngram_range=(1, 2))
+            self.vectorizer.fit([a or "" for a, _ in pairs] + list(dict.fromkeys(b or "" for _, b in pairs)))
+        self.reg.fit(self._matrix(pairs, encoder), _logit(np.asarray(teacher_scores, dtype=float)))
+        return self
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], encoder=None) -> np.ndarray:
+        pairs = list(pairs)
+        if not pairs:
+            return np.array([], dtype=float)
+        return 1.0 / (1.0 + np.exp(-self.reg.predict(self._matrix(pairs, encoder))))
+
+    def save(self, path: str = DEFAULT_PATH) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        joblib.dump({"features": self.features, "alpha": self.alpha, "embedding_model": self.embedding_model,
+                     "batch_size": self.batch_size, "vectorizer": self.vectorizer, "reg": self.reg}, path)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_PATH) -> "RelevancyStudent":
+        payload = joblib.load(path)
+        obj = cls(features=payload["features"], alpha=payload["alpha"],
+                  embedding_model=payload["embedding_model"], batch_size=payload["batch_size"])
+        obj.vectorizer = payload["vectorizer"]
+        obj.reg = payload["reg"]
+        return obj
+
+
+def agreement(teacher: np.ndarray, student: np.ndarray, threshold: float = 0.3) -> Dict[str, float]:
+    """How closely student scores track the teacher; `threshold` is the decision layer's rel_thresh."""
+    return {
+        "mae": float(np.abs(teacher - student).mean()),
+        "spearman": float(spearmanr(teacher, student).statistic) if len(teacher) > 1 else float("nan"),
+        f"agree@{threshold:g}": float(((teacher < threshold) == (student < threshold)).mean()),
+    }
+
+
+def _pairs_per_sec(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return n / max(time.perf_counter() - t0, 1e-9)
+
+
+def distill(teacher, pairs: List[Tuple[str, str]], feature_sets: Sequence[str] = ("lexical", "tfidf"),
+            holdout: float = 0.2, alpha: float = 1.0, encoder=None, random_state: int = 42,
+            threshold: float = 0.3) -> Tuple[Dict[str, RelevancyStudent], pd.DataFrame]:
+    """Label `pairs` with the teacher, fit one student per feature set, report agreement and speed on a holdout.
+
+    `teacher` is a loaded RelevancyModel in cross-encoder mode; the report also
+    has rows for the teacher itself (its model on the distinct pairs, no caches)
+    and for its TF-IDF fallback.
+    """
+    rng = np.random.default_rng(random_state)
+    order = rng.permutation(len(pairs))
+    n_test = max(1, int(round(len(pairs) * holdout)))
+    test = [pairs[i] for i in order[:n_test]]
+    train = [pairs[i] for i in order[n_test:]]
+
+    # time the model alone: score_pairs would skip repeated pairs and serve LRU hits
+    unique = list(dict.fromkeys((a or "", b or "") for a, b in train + test))
+    t0 = time.perf_counter()
+    raw = np.asarray(teacher._predict_bucketed(unique), dtype=float)
+    teacher_pps = len(unique) / max(time.perf_counter() - t0, 1e-9)
+    if len(raw) and (raw.min() < 0.0 or raw.max() > 1.0):
+        raw = 1.0 / (1.0 + np.exp(-raw))  # logits, as in score_pairs
+    scores = dict(zip(unique, raw))
+    y = np.array([scores[(a or "", b or "")] for a, b in train + test], dtype=float)
+    y_train, y_test = y[:len(train)], y[len(train):]
+
+    rows = [{"scorer": f"teacher ({teacher.model_name})", "pairs_per_sec": teacher_pps,
+             **agreement(y_test, y_test, threshold)}]
+    tfidf = teacher._score_tfidf(test)
+    rows.append({"scorer": "tfidf fallback", "pairs_per_sec": _pairs_per_sec(lambda: teacher._score_tfidf(test), len(test)),
+                 **agreement(y_test, tfidf, threshold)})
+    students = {}
+    for fs in feature_sets:
+        student = RelevancyStudent(features=fs, alpha=alpha, batch_size=teacher.batch_size,
+                                   embedding_model=teacher.bi_model_name if fs == "embed" else None)
+        student.fit(train, y_train, encoder)
+        pred = student.predict(test, encoder)
+        rows.append({"scorer": f"student:{fs}", "pairs_per_sec": _pairs_per_sec(lambda: student.predict(test, encoder), len(test)),
+                     **agreement(y_test, pred, threshold)})
+        students[fs] = student
+    return students, pd.DataFrame(rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Distill the cross-encoder relevancy scorer into fast students")
+    ap.add_argument("--reviews", required=True, help="CSV/Parquet with text and place_id")
+    ap.add_argument("--places", required=True, help="CSV/Parquet with place_id and place_name/place_category/city/description")
+    ap.add_argument("--sample", type=int, default=20000, help="Pairs to label with the teacher")
+    ap.add_argument("--features", default="lexical,tfidf", help=f"Comma-separated subset of {FEATURE_SETS}")
+    ap.add_argument("--alpha", type=float, default=1.0)
+    ap.add_argument("--holdout", type=float, default=0.2)
+    ap.add_argument("--out_dir", default=Config.models_dir, help="Writes relevancy_student-<features>.joblib per feature set")
+    args = ap.parse_args()
+
+    from ..storage import read_frame
+    from .relevancy_ce import RelevancyModel
+    from .relevancy_index import PLACE_FIELDS, place_descriptions
+    reviews = read_frame(args.reviews, columns=["text", "place_id"]).dropna(subset=["text"])
+    places = read_frame(args.places, columns=["place_id", *PLACE_FIELDS]).drop_duplicates("place_id", keep="last")
+    descs = dict(zip(places["place_id"], place_descriptions(places)))
+    reviews = reviews[reviews["place_id"].isin(descs)]
+    reviews = reviews.sample(min(args.sample, len(reviews)), random_state=42)
+    pairs = [(t, descs[p]) for t, p in zip(reviews["text"], reviews["place_id"])]
+
+    teacher = RelevancyModel(mode="ce", cache_path="")  # no disk cache: the report times the model itself
+    teacher.load()
+    if teacher.model is None:
+        raise SystemExit("the cross-encoder teacher is not available")
+    feature_sets = [f.strip() for f in args.features.split(",") if f.strip()]
+    encoder = None
+    if "embed" in feature_sets:
+        from sentence_transformers import SentenceTransformer
+        encoder = SentenceTransformer(teacher.bi_model_name)
+    students, report = distill(teacher, pairs, feature_sets, args.holdout, args.alpha, encoder)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for fs, student in students.items():
+        student.save(os.path.join(args.out_dir, f"relevancy_student-{fs}.joblib"))
+    report.to_csv(os.path.join(args.out_dir, "relevancy_student_report.csv"), index=False)
+    print(f"{len(pairs)} teacher-labelled pairs ({args.holdout:.0%} held out)")
+    print(report.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    from datasketch import MinHash, MinHashLSH
+except Exception:
+    MinHash = MinHashLSH = None
+
+ROW_ARRAYS = {"parent": np.int64, "size": np.int64, "user_hash": np.uint64, "place_hash": np.uint64}
+SQLITE_CACHE_KB = 64 * 1024  # page cache per index connection
+
+
+def shingles(text: str, k: int = 3) -> List[bytes]:
+    toks = (text or "").split()
+    if len(toks) <= k:
+        return [" ".join(toks).encode("utf-8")] if toks else []
+    return [" ".join(toks[i:i + k]).encode("utf-8") for i in range(len(toks) - k + 1)]
+
+
+def _int64(data: bytes) -> int:
+    # stable across processes, unlike hash(), so saved indexes keep working
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little", signed=True)
+
+
+def _content_key(sh: List[bytes]) -> int:
+    return _int64(b"\n".join(sorted(set(sh))))
+
+
+def _hash_values(values) -> np.ndarray:
+    return pd.util.hash_array(np.asarray(pd.Series(values, dtype=object).fillna("").astype(str), dtype=object))
+
+
+class NearDupIndex:
+    """Persistent MinHash-LSH index clustering near-duplicate reviews.
+
+    Rows are inserted in batches (`add`) and get sequential row ids. Every row is
+    unioned with the LSH candidates it collides with, so clusters grow across
+    batches and runs. Reviews passed with a review_id are stored once: adding a
+    known review_id again (e.g. rerunning over the same input) returns its
+    existing row instead of a new copy. Exact copies of an indexed shingle set are unioned through a
+    content hash and never enter the LSH buckets, which keeps copy-paste spam from
+    inflating them.
+
+    With `path`, all state lives in that directory and the process holds only
+    the current batch:
+    - parent/size/user_hash/place_hash.npy: union-find and row hashes, memory-mapped, 32 bytes per row;
+    - index.sqlite: LSH band buckets (one 8-byte key per band, 5 bands at the
+      defaults, for each distinct text), content hashes (one per distinct text),
+      the distinct users/places of clusters with more than one row (one
+      entry per distinct member), and review_id -> row for reviews added with one.
+    The sqlite page cache is capped at SQLITE_CACHE_KB, and memory-mapped pages
+    belong to the OS page cache. Disk use is roughly 150-250 bytes per row at the
+    defaults. Without `path`, the same layout is kept in RAM, which suits tests
+    and one-off runs. The on-disk state is consistent after save().
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        threshold: float = 0.8,
+        num_perm: int = 64,
+        shingle_size: int = 3,
+        seed: int = 1,
+    ) -> None:
+        if MinHashLSH is None:
+            raise ImportError("datasketch is required for NearDupIndex")
+        self.path = path
+        meta = self._read_meta()
+        if meta:
+            threshold, num_perm, shingle_size, seed = (meta[k] for k in ("threshold", "num_perm", "shingle_size", "seed"))
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        lsh = MinHashLSH(threshold=threshold, num_perm=num_perm)  # only for its (bands, rows) choice
+        self.hashranges = list(lsh.hashranges)
+        self.n = meta.get("n", 0)
+        if path:
+            os.makedirs(path, exist_ok=True)
+            for name in ROW_ARRAYS:
+                f = os.path.join(path, f"{name}.npy")
+                setattr(self, name, np.load(f, mmap_mode="r+") if os.path.exists(f) else np.zeros(0, ROW_ARRAYS[name]))
+        else:
+            for name, dtype in ROW_ARRAYS.items():
+                setattr(self, name, np.zeros(0, dtype=dtype))
+        self.db = sqlite3.connect(os.path.join(path, "index.sqlite") if path else ":memory:")
+        self.db.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS bands (key INTEGER, row INTEGER);
+            CREATE INDEX IF NOT EXISTS bands_key ON bands (key);
+            CREATE TABLE IF NOT EXISTS content (key INTEGER PRIMARY KEY, row INTEGER);
+            CREATE TABLE IF NOT EXISTS members (root INTEGER, kind INTEGER, value INTEGER,
+                                                PRIMARY KEY (root, kind, value)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS reviews (review_id TEXT PRIMARY KEY, row INTEGER) WITHOUT ROWID;
+        """)
+
+    def _read_meta(self) -> dict:
+        if self.path and os.path.isfile(self.path):
+            raise ValueError(f"{self.path} is a file; near-dup indexes are directories now (rebuild the index)")
+        f = os.path.join(self.path, "meta.json") if self.path else None
+        if f and os.path.exists(f):
+            with open(f, encoding="utf-8") as fh:
+                return json.load(fh)
+        return {}
+
+    def _grow(self, k: int) -> None:
+        need = self.n + k
+        if need <= len(self.parent):
+            return
+        cap = max(need, 2 * len(self.parent), 1024)
+        for name, dtype in ROW_ARRAYS.items():
+            old = getattr(self, name)
+            if self.path:
+                f = os.path.join(self.path, f"{name}.npy")
+                tmp = f + ".tmp"
+                new = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=(cap,))
+                new[:self.n] = old[:self.n]
+                new.flush()
+                del new, old
+                setattr(self, name, None)
+                os.replace(tmp, f)
+                setattr(self, name, np.load(f, mmap_mode="r+"))
+            else:
+                new = np.zeros(cap, dtype=dtype)
+                new[:len(old)] = old
+                setattr(self, name, new)
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return int(root)
+
+    def _ensure_members(self, root: int) -> None:
+        # singletons are not stored: their only user/place are the row's own hashes
+        if self.size[root] == 1:
+            self.db.executemany("INSERT OR IGNORE INTO members VALUES (?, ?, ?)",
+                                [(root, 0, int(self.user_hash[root].astype(np.int64))),
+                                 (root, 1, int(self.place_hash[root].astype(np.int64)))])
+
+    def union(self, a: int, b: int) -> int:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return ra
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self._ensure_members(ra)
+        self._ensure_members(rb)
+        # union by size: each merge moves the smaller cluster's members
+        self.db.execute("INSERT OR IGNORE INTO members SELECT ?, kind, value FROM members WHERE root = ?", (ra, rb))
+        self.db.execute("DELETE FROM members WHERE root = ?", (rb,))
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+        return ra
+
+    def _band_keys(self, m) -> List[int]:
+        hv = m.hashvalues
+        return [_int64(bytes([j]) + hv[s:e].tobytes()) for j, (s, e) in enumerate(self.hashranges)]
+
+    def add(self, texts: Iterable[str], users=None, places=None, review_ids=None) -> np.ndarray:
+        """Insert a batch of (normalized) texts; returns their row ids.
+
+        With `review_ids`, reviews already in the index (or repeated within the
+        batch) get their existing row id and are not inserted again; missing ids
+        always insert.
+        """
+        texts = ["" if t is None or (isinstance(t, float) and np.isnan(t)) else str(t) for t in texts]
+        if review_ids is None:
+            return self._insert(texts, users, places)
+        rids = [None if pd.isna(r) else str(r) for r in review_ids]
+        out = np.zeros(len(texts), dtype=np.int64)
+        known: Dict[str, int] = {}
+        todo = list(dict.fromkeys(r for r in rids if r is not None))
+        for i in range(0, len(todo), 500):  # sqlite's bound-parameter limit
+            part = todo[i:i + 500]
+            known.update(self.db.execute(
+                f"SELECT review_id, row FROM reviews WHERE review_id IN ({','.join('?' * len(part))})", part).fetchall())
+        new, repeats, first = [], [], {}
+        for i, r in enumerate(rids):
+            if r is None:
+                new.append(i)
+            elif r in known:
+                out[i] = known[r]
+            elif r in first:
+                repeats.append(i)
+            else:
+                first[r] = i
+                new.append(i)
+        if new:
+            users = None if users is None else np.asarray(users, dtype=object)[new]
+            places = None if places is None else np.asarray(places, dtype=object)[new]
+            out[new] = self._insert([texts[i] for i in new], users, places)
+            self.db.executemany("INSERT INTO reviews VALUES (?, ?)",
+                                [(rids[i], int(out[i])) for i in new if rids[i] is not None])
+            self.db.commit()
+        for i in repeats:
+            out[i] = out[first[rids[i]]]
+        return out
+
+    def _insert(self, texts: List[str], users=None, places=None) -> np.ndarray:
+        k = len(texts)
+        self._grow(k)
+        ids = np.arange(self.n, self.n + k, dtype=np.int64)
+        self.parent[ids] = ids
+        self.size[ids] = 1
+        self.user_hash[ids] = _hash_values(users if users is not None else [""] * k)
+        self.place_hash[ids] = _hash_values(places if places is not None else [""] * k)
+        self.n += k
+
+        sh = [shingles(t, self.shingle_size) for t in texts]
+        keep = [i for i, s in enumerate(sh) if s]
+        sigs = MinHash.bulk([sh[i] for i in keep], num_perm=self.num_perm, seed=self.seed) if keep else []
+        db = self.db
+        for i, m in zip(keep, sigs):
+            rid = int(ids[i])
+            ckey = _content_key(sh[i])
+            first = db.execute("SELECT row FROM content WHERE key = ?", (ckey,)).fetchone()
+            if first is not None:
+                self.union(first[0], rid)
+                continue
+            db.execute("INSERT INTO content VALUES (?, ?)", (ckey, rid))
+            keys = self._band_keys(m)
+            cands = db.execute(f"SELECT DISTINCT row FROM bands WHERE key IN ({','.join('?' * len(keys))})", keys).fetchall()
+            for r in {self.find(c) for (c,) in cands}:
+                self.union(r, rid)
+            db.executemany("INSERT INTO bands VALUES (?, ?)", [(key, rid) for key in keys])
+        db.commit()
+        return ids
+
+    def features(self, ids) -> pd.DataFrame:
+        """Cluster id (root row id), size and distinct users/places for the given rows."""
+        ids = np.asarray(ids, dtype=np.int64)
+        roots = np.array([self.find(int(i)) for i in ids], dtype=np.int64)
+        sizes = np.asarray(self.size[roots])
+        counts = {}
+        for r in set(roots[sizes > 1].tolist()):
+            got = dict(self.db.execute("SELECT kind, COUNT(*) FROM members WHERE root = ? GROUP BY kind", (r,)).fetchall())
+            counts[r] = (got.get(0, 1), got.get(1, 1))
+        n_users = np.array([counts[r][0] if r in counts else 1 for r in roots.tolist()], dtype=np.int64)
+        n_places = np.array([counts[r][1] if r in counts else 1 for r in roots.tolist()], dtype=np.int64)
+        return pd.DataFrame({
+            "near_dup_cluster": roots,
+            "near_dup_cluster_size": sizes,
+            "near_dup_users": n_users,
+            "near_dup_places": n_places,
+        })
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Flush to the index directory; an in-memory index (or another `path`) is copied to `path`."""
+        path = path or self.path
+        if path is None:
+            raise ValueError("save() needs a path for an in-memory index")
+        self.db.commit()
+        os.makedirs(path, exist_ok=True)
+        if path == self.path:
+            for name in ROW_ARRAYS:
+                arr = getattr(self, name)
+                if isinstance(arr, np.memmap):
+                    arr.flush()
+                else:  # nothing added yet
+                    np.save(os.path.join(path, f"{name}.npy"), arr)
+        else:
+            for name in ROW_ARRAYS:
+                np.save(os.path.join(path, f"{name}.npy"), np.asarray(getattr(self, name)[:self.n]))
+            dest = sqlite3.connect(os.path.join(path, "index.sqlite"))
+            self.db.backup(dest)
+            dest.close()
+        meta = {"n": self.n, "threshold": self.threshold, "num_perm": self.num_perm,
+                "shingle_size": self.shingle_size, "seed": self.seed}
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, path: str) -> "NearDupIndex":
+        """Open an index directory written by save() (or created with `path`); updates go to it in place."""
+        return cls(path=path)
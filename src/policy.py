@@ -14,7 +14,9 @@ def decision_layer(text: str,
                    profanity_count: Optional[int] = None,
                    distance_km: Optional[float] = None,
                    never_been_cues: Optional[bool] = None,
-                   experiential_score: Optional[float] = None) -> List[str]:
+                   experiential_score: Optional[float] = None,
+                   nearby_places: Optional[int] = None,
+                   nearest_same_category_km: Optional[float] = None) -> List[str]:
 
     cfg = Config()
     pri = cfg.priors
@@ -44,6 +46,11 @@ def decision_layer(text: str,
         far_km = float(cfg.device_location.get("far_km", 100))
         if distance_km > far_km and (never_been_cues or (experiential_score is not None and experiential_score < 0.2)):
             nonvis = True
+        # No known place around the device and none of this category within far_km:
+        # a moderately experiential text is no longer enough to vouch for a visit
+        if (distance_km > far_km and nearby_places == 0 and nearest_same_category_km is not None
+                and nearest_same_category_km > far_km and (experiential_score is None or experiential_score < 0.5)):
+            nonvis = True
     if nonvis:
         flags.append("Rant (Likely Non-Visitor)")
 
@@ -1,7 +1,18 @@
-
-from typing import Dict, List
+from typing import Dict, List, Tuple
+import numpy as np, pandas as pd
+from .config import LABELS
 from .features import PROMO_RE, NEVER_BEEN_RE
-from .utils import extract_urls, repeat_char_ratio
+from .utils import URL_RE, extract_urls, repeat_char_ratio
+
+# Declarative weak-label rules over feature columns from add_metadata_feats:
+# label -> (how, columns); a column fires when its value is > 0 and `how` says
+# whether all or any of the columns must fire.
+RULES: Dict[str, Tuple[str, List[str]]] = {
+    "Advertisement/Promo": ("all", ["has_url", "promo_terms"]),
+    "Rant (Likely Non-Visitor)": ("all", ["never_been_cues"]),
+    "Spam/Low-quality": ("any", ["repeat_ratio"]),
+}
+RULE_FEATURES = ["has_url", "promo_terms", "never_been_cues", "repeat_ratio"]
 
 def rule_scores(text: str) -> Dict[str, float]:
     text = text or ""
@@ -22,3 +33,29 @@ def weak_labels(text: str) -> List[str]:
     if s["gibberish"] > 0.0:
         labs.append("Spam/Low-quality")
     return labs
+
+def rule_features(df: pd.DataFrame) -> pd.DataFrame:
+    """RULE_FEATURES columns, reused from df when add_metadata_feats already ran."""
+    if set(RULE_FEATURES).issubset(df.columns):
+        return df[RULE_FEATURES]
+    texts = df["text"].fillna("")
+    return pd.DataFrame({
+        "has_url": texts.str.contains(URL_RE),
+        "promo_terms": texts.str.contains(PROMO_RE),
+        "never_been_cues": texts.str.contains(NEVER_BEEN_RE),
+        "repeat_ratio": texts.map(repeat_char_ratio),
+    }, index=df.index)
+
+def weak_label_matrix(feats: pd.DataFrame, rules: Dict[str, Tuple[str, List[str]]] = RULES) -> np.ndarray:
+    """Boolean (n_rows, len(LABELS)) matrix; labels without a rule stay False."""
+    out = np.zeros((len(feats), len(LABELS)), dtype=bool)
+    for j, lab in enumerate(LABELS):
+        if lab not in rules:
+            continue
+        how, cols = rules[lab]
+        fired = feats[cols].fillna(0).to_numpy(dtype=float) > 0
+        out[:, j] = fired.all(axis=1) if how == "all" else fired.any(axis=1)
+    return out
+
+def label_lists(matrix: np.ndarray) -> List[List[str]]:
+    return [[LABELS[j] for j in np.flatnonzero(row)] for row in matrix]
@@ -5,23 +5,21 @@ import json, os, subprocess
 from typing import Dict
 from .config import Config, LABELS
 from .models.multilabel import MultiLabelSklearn
+from .models.registry import load_serving_model
 from .models.relevancy_ce import RelevancyModel
+from .models.relevancy_index import place_descriptions
 from .features import add_metadata_feats, parse_pics
 from .policy import decision_layer, default_thresholds
 from .image_utils import ImageTextRelevance
+from .geo import PlaceIndex
 
 st.set_page_config(page_title="Review Quality & Relevancy", layout="wide")
 
 @st.cache_resource
 def load_models():
     cfg = Config()
-    model_path = None
-    if os.path.isdir(cfg.models_dir):
-        cands = [p for p in os.listdir(cfg.models_dir) if p.endswith(".joblib")]
-        if cands:
-            cands.sort()
-            model_path = os.path.join(cfg.models_dir, cands[-1])
-    if model_path is None:
+    model = load_serving_model(cfg.models_dir)
+    if model is None:
         st.warning("No trained multilabel model found. Using a fresh baseline trained on sample data.")
         from .train import prepare_training_data, to_multi_list
         reviews = pd.read_csv("data/sample_reviews.csv")
@@ -29,8 +27,7 @@ def load_models():
         reviews = prepare_training_data(reviews)
         model = MultiLabelSklearn(labels=LABELS)
         model.fit(reviews["text"].tolist(), to_multi_list(reviews))
-    else:
-        model = MultiLabelSklearn.load(model_path)
+        model.compile()
     rel = RelevancyModel(); rel.load()
     clip = ImageTextRelevance(); clip.load()
     return model, rel, clip
@@ -56,11 +53,15 @@ if missing:
 if os.path.exists("data/sample_places.csv"):
     places_df = pd.read_csv("data/sample_places.csv")[["place_id","place_lat","place_lon","place_name","place_category","city","description"]]
     df = df.merge(places_df, on="place_id", how="left")
+    place_index = PlaceIndex(places_df)
+    rel_model.index_places(places_df["place_id"].tolist(), place_descriptions(places_df))
+else:
+    place_index = None
 
-df = add_metadata_feats(df)
+df = add_metadata_feats(df, place_index=place_index)
 
 # Build place descriptions
-place_descs = df.apply(lambda r: f"{r.get('place_name','')} — {r.get('place_category','')}, {r.get('city','')}. {r.get('description','')}" , axis=1).tolist()
+place_descs = place_descriptions(df)
 
 # Text classifier
 probs = model.predict_proba(df["text"].fillna("").tolist())
@@ -68,7 +69,7 @@ thresholds = default_thresholds()
 
 # Relevancy
 pairs = list(zip(df["text"].fillna("").tolist(), place_descs))
-rel_scores = rel_model.score_pairs(pairs) if pairs else np.zeros(len(df))
+rel_scores = rel_model.score_pairs(pairs, place_ids=df["place_id"].tolist()) if pairs else np.zeros(len(df))
 
 # Image relevance
 image_rel = np.array([np.nan]*len(df), dtype=float)
@@ -94,7 +95,9 @@ for i, row in df.iterrows():
         profanity_count=int(row.get("profanity_count", 0)),
         distance_km=float(row.get("distance_km", np.nan)) if not pd.isna(row.get("distance_km", np.nan)) else None,
         never_been_cues=bool(row.get("never_been_cues", False)),
-        experiential_score=float(row.get("experiential_score", 0.0))
+        experiential_score=float(row.get("experiential_score", 0.0)),
+        nearby_places=None if pd.isna(row.get("nearby_places", np.nan)) else int(row["nearby_places"]),
+        nearest_same_category_km=None if pd.isna(row.get("nearest_same_category_km", np.nan)) else float(row["nearest_same_category_km"])
     )
     outputs.append({
         "review_id": row.get("review_id", i),
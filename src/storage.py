@@ -0,0 +1,140 @@
+import pathlib
+from typing import Iterator, List, Optional, Sequence
+import numpy as np, pandas as pd
+from .features import parse_pics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:
+    pa = pq = None
+
+# Columnar storage for data/processed. Frames are written as Parquet (zstd) with
+# a typed schema: ids and other low-cardinality strings are dictionary-encoded,
+# pics lists are stored as list<string> instead of JSON text, and timestamps and
+# booleans keep their types, so nothing is re-parsed on load. Readers pass
+# `columns` to load only what they use. Paths ending in .csv keep the old CSV
+# format, which stays available as an export.
+
+DICT_COLUMNS = ["place_id", "user_id", "place_name", "place_category", "city", "lang", "source"]
+STRING_COLUMNS = ["review_id", "text", "text_model", "text_norm", "user_name", "created_at", "description"]
+LIST_COLUMNS = ["pics", "pics_list"]
+FLOAT_COLUMNS = ["rating"]
+
+def is_parquet(path) -> bool:
+    return str(path).endswith((".parquet", ".pq"))
+
+def _require() -> None:
+    if pq is None:
+        raise ImportError("pyarrow is required for Parquet storage (pip install pyarrow)")
+
+def _strings(s: pd.Series) -> pd.Series:
+    # nulls stay null; ints/floats in a mixed object column become their str()
+    return s.astype(object).where(s.isna(), s.astype(str))
+
+def to_arrow(df: pd.DataFrame) -> "pa.Table":
+    """Arrow table with the storage schema (known columns typed explicitly, the rest inferred)."""
+    _require()
+    df = df.copy(deep=False)
+    fields = {}
+    for c in df.columns:
+        if c in LIST_COLUMNS:
+            # object, not map()'s inferred dtype: an empty chunk would otherwise come out as str
+            df[c] = pd.Series([parse_pics(v) for v in df[c]], index=df.index, dtype=object)
+            fields[c] = pa.list_(pa.string())
+        elif c in DICT_COLUMNS or c in STRING_COLUMNS:
+            df[c] = _strings(df[c])
+            fields[c] = pa.string()
+        elif c in FLOAT_COLUMNS:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+            fields[c] = pa.float64()
+        elif df[c].dtype == object and pd.api.types.infer_dtype(df[c], skipna=True) not in ("boolean", "floating", "integer"):
+            # mixed / empty object columns: store as text so every chunk agrees on the type
+            df[c] = _strings(df[c])
+            fields[c] = pa.string()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    schema = pa.schema([pa.field(f.name, fields.get(f.name, f.type)) for f in table.schema])
+    return table.cast(schema)
+
+def _to_pandas(table: "pa.Table") -> pd.DataFrame:
+    df = table.to_pandas()
+    for c in LIST_COLUMNS:
+        if c in df.columns:
+            df[c] = table.column(c).to_pylist()  # lists, not numpy arrays, like parse_pics returns
+    return df
+
+def _present(path, columns: Optional[Sequence[str]]) -> Optional[List[str]]:
+    if columns is None:
+        return None
+    names = set(pq.read_schema(path).names)
+    return [c for c in columns if c in names]
+
+def read_columns(path) -> List[str]:
+    """Column names without reading any rows."""
+    if is_parquet(path):
+        _require()
+        return list(pq.read_schema(path).names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+def read_frame(path, columns: Optional[Sequence[str]] = None, categorical: bool = False, **csv_kwargs) -> pd.DataFrame:
+    """Load a processed frame; `columns` that the file lacks are skipped.
+
+    categorical=True returns dictionary-encoded columns as pandas categoricals.
+    """
+    if not is_parquet(path):
+        if columns is not None:
+            csv_kwargs["usecols"] = lambda c: c in set(columns)
+        return pd.read_csv(path, **csv_kwargs)
+    _require()
+    cols = _present(path, columns)
+    read_dict = [c for c in DICT_COLUMNS if cols is None or c in cols] if categorical else None
+    return _to_pandas(pq.read_table(path, columns=cols, read_dictionary=read_dict))
+
+def iter_frames(path, columns: Optional[Sequence[str]] = None, chunksize: int = 100_000, **csv_kwargs) -> Iterator[pd.DataFrame]:
+    """Chunks of `chunksize` rows, in file order."""
+    if not is_parquet(path):
+        if columns is not None:
+            csv_kwargs["usecols"] = lambda c: c in set(columns)
+        yield from pd.read_csv(path, chunksize=chunksize, **csv_kwargs)
+        return
+    _require()
+    f = pq.ParquetFile(path)
+    for batch in f.iter_batches(batch_size=chunksize, columns=_present(path, columns)):
+        yield _to_pandas(pa.Table.from_batches([batch]))
+
+class FrameWriter:
+    """Writes DataFrame chunks to one Parquet or CSV file; the first chunk fixes the schema."""
+
+    def __init__(self, path) -> None:
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = None
+        self._schema = None
+        self._first = True
+
+    def write(self, df: pd.DataFrame) -> None:
+        if not is_parquet(self.path):
+            df.to_csv(self.path, index=False, mode="w" if self._first else "a", header=self._first)
+        else:
+            table = to_arrow(df)
+            if self._writer is None:
+                self._schema = table.schema
+                self._writer = pq.ParquetWriter(self.path, self._schema, compression="zstd",
+                                                use_dictionary=[c for c in DICT_COLUMNS if c in self._schema.names])
+            self._writer.write_table(table.select(self._schema.names).cast(self._schema))
+        self._first = False
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self) -> "FrameWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def write_frame(df: pd.DataFrame, path) -> None:
+    """Write one frame; the format follows the extension (.parquet or .csv)."""
+    with FrameWriter(path) as w:
+        w.write(df)
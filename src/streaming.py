@@ -0,0 +1,130 @@
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+import numpy as np, pandas as pd
+from .data_prep import clean_text
+from .feature_cache import clean_row_feats
+from .features import BurstIndex, add_metadata_feats, guess_epoch_unit, parse_datetimes, _user_keys
+from .text_kernel import text_norms
+
+# Two-pass chunked feature pipeline. Burst, dup-across-places and near-dup
+# features look across rows, so a chunk cannot be featurized on its own:
+# pass 1 reads only the key columns and folds every chunk into a CrossRowState
+# (hashed user ids + timestamps, deduplicated (user, text_norm) -> place pairs,
+# near-dup index rows, place ids in order of appearance); pass 2 reads the
+# chunks again and runs the regular clean/feature code with that state.
+# Memory is one chunk plus the state (~24 bytes per review, 8 more with a
+# near-dup index), never the dataset; the near-dup rows themselves live in the
+# NearDupIndex (on disk when it has a path).
+
+KEY_COLUMNS = ["review_id", "text", "user_id", "place_id", "created_at", "source"]
+
+def _key_hash(values) -> np.ndarray:
+    # ids are hashed as strings, so a user read as int in one chunk and str in another stays one user
+    return pd.util.hash_array(_user_keys(values).astype(str).astype(object))
+
+class CrossRowState:
+    """Cross-row feature state collected over all chunks (`observe`) before featurizing any."""
+
+    def __init__(self, near_dup_index=None, epoch_unit: str = "ms") -> None:
+        self.near_dup_index = near_dup_index
+        self.epoch_unit = epoch_unit
+        self.epoch_units: Dict[object, str] = {}  # source -> unit, when epoch_unit is "auto"
+        self.burst_index: Optional[BurstIndex] = None
+        self._users: List[np.ndarray] = []
+        self._times: List[np.ndarray] = []
+        self._pairs: List[pd.DataFrame] = []
+        self._dup_keys = np.zeros(0, dtype=np.uint64)
+        self._places: Dict[object, None] = {}
+        self._nd_ids: List[np.ndarray] = []  # index row per observed review; known review_ids reuse their row
+        self._nd_next = 0
+
+    def user_keys(self, users) -> np.ndarray:
+        return _key_hash(users)
+
+    def _dup_key(self, users, text_norm) -> np.ndarray:
+        return pd.util.hash_pandas_object(pd.DataFrame({
+            "u": self.user_keys(users), "t": np.asarray(text_norm, dtype=object)}), index=False).to_numpy()
+
+    def parse_times(self, created: pd.Series, source=None) -> pd.Series:
+        """created_at -> datetimes. With epoch_unit "auto" the unit of each source is
+        guessed once, from its first chunk holding epoch values, and reused for every
+        later chunk in both passes."""
+        if self.epoch_unit != "auto" or not len(created):
+            return parse_datetimes(created, "ms" if self.epoch_unit == "auto" else self.epoch_unit)
+        sources = source if source is not None else pd.Series(None, index=created.index, dtype=object)
+        parts = []
+        for src, g in created.groupby(sources, dropna=False, sort=False):
+            key = None if pd.isna(src) else src
+            if key not in self.epoch_units:
+                unit = guess_epoch_unit(g)
+                if unit is not None:
+                    self.epoch_units[key] = unit
+            parts.append(parse_datetimes(g, self.epoch_units.get(key, "ms")))
+        return pd.concat(parts).reindex(created.index)
+
+    def observe(self, chunk: pd.DataFrame) -> None:
+        """Pass 1: fold one raw (uncleaned) chunk into the state."""
+        n = len(chunk)
+        text_norm = text_norms(clean_text(chunk["text"]).fillna("")) if "text" in chunk.columns else [""] * n
+        if "place_id" in chunk.columns:
+            self._places.update(dict.fromkeys(chunk["place_id"].dropna().unique()))
+        if "user_id" in chunk.columns:
+            created = chunk["created_at"] if "created_at" in chunk.columns else pd.Series([None] * n, index=chunk.index)
+            dt = self.parse_times(created, chunk.get("source"))
+            self._users.append(self.user_keys(chunk["user_id"]))
+            self._times.append(dt.to_numpy(dtype="datetime64[ns]"))
+            if "place_id" in chunk.columns:
+                ok = (chunk["user_id"].notna() & chunk["place_id"].notna()).to_numpy()
+                pairs = pd.DataFrame({
+                    "key": self._dup_key(chunk["user_id"], text_norm)[ok],
+                    "place": _key_hash(chunk["place_id"])[ok],
+                })
+                self._pairs.append(pairs.drop_duplicates())
+        if self.near_dup_index is not None:
+            self._nd_ids.append(self.near_dup_index.add(text_norm, chunk.get("user_id"), chunk.get("place_id"),
+                                                        review_ids=chunk.get("review_id")))
+
+    def finalize(self) -> "CrossRowState":
+        if self._users:
+            self.burst_index = BurstIndex(np.concatenate(self._users), np.concatenate(self._times))
+        if self._pairs:
+            pairs = pd.concat(self._pairs, ignore_index=True).drop_duplicates()
+            n_places = pairs["key"].value_counts()
+            self._dup_keys = np.sort(n_places.index[n_places > 1].to_numpy(dtype=np.uint64))
+        self._users, self._times, self._pairs = [], [], []
+        self._nd_ids = np.concatenate(self._nd_ids) if len(self._nd_ids) else np.zeros(0, dtype=np.int64)
+        return self
+
+    def place_ids(self) -> np.ndarray:
+        """Distinct place ids in order of first appearance, as `df["place_id"].dropna().unique()`."""
+        return np.array(list(self._places), dtype=object)
+
+    def dup_across_places(self, users, text_norm) -> np.ndarray:
+        keys = self._dup_key(users, text_norm)
+        pos = np.minimum(np.searchsorted(self._dup_keys, keys), max(len(self._dup_keys) - 1, 0))
+        hit = self._dup_keys[pos] == keys if len(self._dup_keys) else np.zeros(len(keys), dtype=bool)
+        return hit & pd.notna(np.asarray(users, dtype=object))
+
+    def near_dup_features(self, n: int) -> pd.DataFrame:
+        """Pass 2: near-dup columns for the next `n` rows, in the order they were observed."""
+        ids = self._nd_ids[self._nd_next:self._nd_next + n]
+        self._nd_next += n
+        return self.near_dup_index.features(ids)
+
+def collect_state(read_chunks: Callable[[Optional[List[str]]], Iterable[pd.DataFrame]],
+                  near_dup_index=None, epoch_unit: str = "ms") -> CrossRowState:
+    """Pass 1 over `read_chunks(KEY_COLUMNS)`; returns the finalized state."""
+    state = CrossRowState(near_dup_index=near_dup_index, epoch_unit=epoch_unit)
+    for chunk in read_chunks(KEY_COLUMNS):
+        state.observe(chunk)
+    return state.finalize()
+
+def featurize_chunks(read_chunks: Callable[[Optional[List[str]]], Iterable[pd.DataFrame]], state: CrossRowState,
+                     place_index=None, burst_windows=None, n_jobs: int = 1, feature_cache=None) -> Iterator[pd.DataFrame]:
+    """Pass 2: clean + featurize chunk by chunk, equal to one in-memory run over all chunks.
+
+    `read_chunks(columns)` must yield the same rows in the same order as in pass 1,
+    restricted to `columns` when given (None = all columns).
+    """
+    for chunk in read_chunks(None):
+        yield add_metadata_feats(clean_row_feats(chunk, feature_cache, n_jobs=n_jobs), burst_windows=burst_windows,
+                                 place_index=place_index, epoch_unit=state.epoch_unit, cross_row=state, row_feats=False)
@@ -0,0 +1,125 @@
+import hashlib, json, os, time
+from itertools import product
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import joblib
+import numpy as np, pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import average_precision_score, precision_recall_fscore_support
+from sklearn.preprocessing import MultiLabelBinarizer
+from .config import Config, LABELS
+from .models.multilabel import MultiLabelSklearn
+
+# Hyperparameter sweep for the TF-IDF + logistic regression baseline. Each
+# vectorizer config is fitted once per training set and its train/val CSR
+# matrices are persisted as .npy parts under data/cache/sweep/<key>/, keyed by
+# the config and a hash of the texts; reruns and other C values reuse them.
+# The (vectorizer, label, C) fits run in parallel worker processes that
+# memory-map the matrices instead of receiving copies.
+
+DEFAULT_DIR = os.path.join(Config.data_dir, "cache", "sweep")
+CSR_PARTS = ("data", "indices", "indptr")
+
+VectorizerConfig = Tuple[int, Tuple[int, int]]  # (max_features, ngram_range)
+
+def texts_digest(texts: Sequence[str]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for t in texts:
+        h.update(str(t).encode("utf-8", "surrogatepass"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+def save_csr(X: sp.csr_matrix, prefix: str) -> None:
+    X.sum_duplicates()  # canonical (sorted, deduplicated) so the read-only copy is never re-sorted
+    for part in CSR_PARTS:
+        np.save(f"{prefix}.{part}.npy", getattr(X, part))
+    with open(f"{prefix}.shape.json", "w", encoding="utf-8") as f:
+        json.dump(list(X.shape), f)
+
+def load_csr(prefix: str, mmap: bool = True) -> sp.csr_matrix:
+    """CSR matrix over memory-mapped .npy parts (read-only, nothing copied)."""
+    with open(f"{prefix}.shape.json", encoding="utf-8") as f:
+        shape = tuple(json.load(f))
+    parts = [np.load(f"{prefix}.{part}.npy", mmap_mode="r" if mmap else None) for part in CSR_PARTS]
+    X = sp.csr_matrix(tuple(parts), shape=shape, copy=False)
+    X.has_canonical_format = True
+    return X
+
+def cached_matrices(cfg: VectorizerConfig, train_texts: Sequence[str], val_texts: Sequence[str],
+                    digest: str, cache_dir: str = DEFAULT_DIR) -> str:
+    """Directory holding vectorizer.joblib, train.* and val.* for `cfg`; vectorizes only on a miss."""
+    max_features, ngram_range = cfg
+    out = os.path.join(cache_dir, f"tfidf-{max_features}-{ngram_range[0]}{ngram_range[1]}-{digest}")
+    if os.path.exists(os.path.join(out, "vectorizer.joblib")):
+        return out
+    os.makedirs(out, exist_ok=True)
+    vec = TfidfVectorizer(max_features=max_features, ngram_range=ngram_range)
+    save_csr(vec.fit_transform(train_texts).tocsr(), os.path.join(out, "train"))
+    save_csr(vec.transform(val_texts).tocsr(), os.path.join(out, "val"))
+    joblib.dump(vec, os.path.join(out, "vectorizer.joblib"))  # written last: marks the entry complete
+    return out
+
+def fit_one(matrix_dir: str, y_train: np.ndarray, y_val: np.ndarray, C: float) -> Dict[str, float]:
+    """Fit one label at one C on the cached matrices; validation metrics and timings."""
+    X_tr = load_csr(os.path.join(matrix_dir, "train"))
+    X_val = load_csr(os.path.join(matrix_dir, "val"))
+    t0 = time.perf_counter()
+    if len(np.unique(y_train)) < 2:
+        # what OneVsRestClassifier does for a label with one class: predict it constantly
+        p = np.full(X_val.shape[0], float(y_train[0]) if len(y_train) else 0.0)
+        fit_s, predict_s = time.perf_counter() - t0, 0.0
+    else:
+        clf = LogisticRegression(C=C, max_iter=1000, solver="liblinear").fit(X_tr, y_train)
+        fit_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        p = clf.predict_proba(X_val)[:, 1]
+        predict_s = time.perf_counter() - t0
+    prec, rec, f1, _ = precision_recall_fscore_support(y_val, (p >= 0.5).astype(int), average="binary", zero_division=0)
+    ap = average_precision_score(y_val, p) if y_val.any() else np.nan
+    return {"precision": prec, "recall": rec, "f1": f1, "avg_precision": ap,
+            "positives_val": int(y_val.sum()), "fit_s": fit_s, "predict_s": predict_s}
+
+def run_sweep(train_texts: Sequence[str], train_labels: Iterable[List[str]],
+              val_texts: Sequence[str], val_labels: Iterable[List[str]],
+              vectorizers: Sequence[VectorizerConfig], Cs: Sequence[float],
+              labels: Optional[List[str]] = None, n_jobs: int = -1,
+              cache_dir: str = DEFAULT_DIR) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Fit every (vectorizer, label, C); returns (per-label results, per-config summary sorted best first).
+
+    The summary ranks configs by macro F1 over labels, then by mean average precision.
+    """
+    labels = labels or LABELS
+    mlb = MultiLabelBinarizer(classes=labels)
+    Y_tr = mlb.fit_transform(list(train_labels))
+    Y_val = mlb.transform(list(val_labels))
+    digest = texts_digest(train_texts) + texts_digest(val_texts)[:8]
+
+    rows = []
+    for cfg in vectorizers:
+        t0 = time.perf_counter()
+        matrix_dir = cached_matrices(cfg, train_texts, val_texts, digest, cache_dir)
+        rows.append({"max_features": cfg[0], "ngram_range": f"{cfg[1][0]}-{cfg[1][1]}",
+                     "matrix_dir": matrix_dir, "vectorize_s": time.perf_counter() - t0})
+    jobs = list(product(range(len(rows)), range(len(labels)), Cs))
+    results = joblib.Parallel(n_jobs=n_jobs)(
+        joblib.delayed(fit_one)(rows[v]["matrix_dir"], Y_tr[:, j], Y_val[:, j], C) for v, j, C in jobs)
+
+    per_label = pd.DataFrame([{**rows[v], "C": C, "label": labels[j], **res} for (v, j, C), res in zip(jobs, results)])
+    summary = (per_label.groupby(["max_features", "ngram_range", "C"], sort=False)
+               .agg(macro_f1=("f1", "mean"), mean_avg_precision=("avg_precision", "mean"),
+                    fit_s=("fit_s", "sum"), predict_s=("predict_s", "sum"), vectorize_s=("vectorize_s", "first"),
+                    matrix_dir=("matrix_dir", "first"))
+               .reset_index()
+               .sort_values(["macro_f1", "mean_avg_precision"], ascending=False, kind="stable")
+               .reset_index(drop=True))
+    return per_label, summary
+
+def fit_config(row: pd.Series, train_labels: Iterable[List[str]], labels: Optional[List[str]] = None) -> MultiLabelSklearn:
+    """Full multilabel model for one summary row, fitted on its cached train matrix (no re-vectorizing)."""
+    lo, hi = map(int, row["ngram_range"].split("-"))
+    model = MultiLabelSklearn(labels=labels or LABELS, max_features=int(row["max_features"]),
+                              ngram_range=(lo, hi), C=float(row["C"]))
+    model.vectorizer = joblib.load(os.path.join(row["matrix_dir"], "vectorizer.joblib"))
+    model.clf.fit(load_csr(os.path.join(row["matrix_dir"], "train")), model.binarizer.fit_transform(list(train_labels)))
+    return model
@@ -0,0 +1,113 @@
+import math
+import numpy as np, pandas as pd
+from typing import Dict, Iterable, List, Optional
+from .utils import normalize_text
+from .lexicon import Lexicon, default_lexicon
+
+# Batched scalar text features. All documents of a batch are laid out as one
+# array of code points, so every per-character feature is a single NumPy
+# reduction instead of a Python loop per review. Results match src/utils.py.
+
+_CP_SPAN = 0x110000
+
+_ALPHA, _UPPER, _ALNUM, _SPACE = 1, 2, 4, 8
+_BMP_FLAGS = None
+
+def _flags(chars) -> np.ndarray:
+    return np.array([(_ALPHA if c.isalpha() else 0) | (_UPPER if c.isupper() else 0)
+                     | (_ALNUM if c.isalnum() else 0) | (_SPACE if c.isspace() else 0) for c in chars], dtype=np.uint8)
+
+def _char_classes(cps: np.ndarray):
+    # unicode predicates come from a lookup table over the BMP, built once per process;
+    # astral code points (mostly emoji) are classified per distinct value in the batch
+    global _BMP_FLAGS
+    if _BMP_FLAGS is None:
+        _BMP_FLAGS = _flags(chr(c) for c in range(0x10000))
+    astral = cps > 0xFFFF
+    flags = _BMP_FLAGS[np.where(astral, 0, cps)]
+    if astral.any():
+        uniq, inv = np.unique(cps[astral], return_inverse=True)
+        flags[astral] = _flags(chr(c) for c in uniq)[inv]
+    return (flags & _ALPHA) > 0, (flags & _UPPER) > 0, (flags & _ALNUM) > 0, (flags & _SPACE) > 0
+
+def _entropy(doc: np.ndarray, cps: np.ndarray, lens: np.ndarray) -> np.ndarray:
+    n = len(lens)
+    if not len(cps):
+        return np.zeros(n, dtype=float)
+    keys = doc * _CP_SPAN + cps
+    pos = np.argsort(keys)
+    sk = keys[pos]
+    starts = np.flatnonzero(np.concatenate([[True], sk[1:] != sk[:-1]]))
+    cnt = np.diff(np.append(starts, len(sk)))
+    first = np.minimum.reduceat(pos, starts)
+    # Sum terms in first-occurrence order, like iterating a Counter, so floats match exactly
+    order = np.argsort(first)
+    d = doc[first[order]]
+    p = cnt[order] / lens[d]
+    pu, pinv = np.unique(p, return_inverse=True)
+    logs = np.array([math.log2(x) for x in pu], dtype=float)
+    return np.bincount(d, weights=-(p * logs[pinv]), minlength=n)
+
+def _repeat_flags(doc: np.ndarray, cps: np.ndarray, n: int) -> np.ndarray:
+    # (.)\1{4,}: five identical consecutive chars, '.' never matching a newline
+    same = (cps[1:] == cps[:-1]) & (cps[1:] != 10) & (doc[1:] == doc[:-1])
+    if len(same) < 4:
+        return np.zeros(n, dtype=float)
+    c = np.concatenate([[0], np.cumsum(same)])
+    hits = (c[4:] - c[:-4]) == 4
+    return (np.bincount(doc[:len(hits)][hits], minlength=n) > 0).astype(float)
+
+def char_feature_arrays(texts: List[str]) -> Dict[str, np.ndarray]:
+    n = len(texts)
+    lens = np.fromiter(map(len, texts), dtype=np.int64, count=n)
+    cps = np.frombuffer("".join(texts).encode("utf-32-le", "surrogatepass"), dtype=np.uint32).astype(np.int64)
+    doc = np.repeat(np.arange(n, dtype=np.int64), lens)
+    alpha, upper, alnum, space = _char_classes(cps)
+
+    letters = np.bincount(doc[alpha], minlength=n)
+    caps = np.bincount(doc[alpha & upper], minlength=n)
+    prev_space = np.ones(len(cps), dtype=bool)
+    prev_space[1:] = space[:-1]
+    prev_space[(np.cumsum(lens) - lens)[lens > 0]] = True
+    return {
+        "char_len": lens,
+        "word_len": np.bincount(doc[~space & prev_space], minlength=n),
+        "caps_ratio": np.where(letters > 0, caps / np.maximum(letters, 1), 0.0),
+        "emoji_count": np.bincount(doc[cps > 10000], minlength=n),
+        "repeat_ratio": _repeat_flags(doc, cps, n),
+        "nonword_ratio": np.bincount(doc[~(alnum | space)], minlength=n) / np.maximum(1, lens),
+        "char_entropy": _entropy(doc, cps, lens),
+    }
+
+def lexicon_columns(texts: List[str], lexicon: Optional[Lexicon] = None) -> Dict[str, np.ndarray]:
+    hits = (lexicon or default_lexicon()).scan_many(texts)
+    cols = {}
+    for cat, v in hits.items():
+        if cat == "promo":
+            cols["promo_terms"] = v > 0
+        elif cat == "never_been":
+            cols["never_been_cues"] = v > 0
+        elif cat == "experiential":
+            cols["experiential_score"] = np.minimum(1.0, v / 4.0)
+        else:
+            cols[f"{cat}_count"] = v
+    return cols
+
+def text_norms(texts: Iterable[str]) -> List[str]:
+    """The `text_norm` column: normalized, lowercased text (dup keys, near-dup shingles)."""
+    return [normalize_text(s if isinstance(s, str) else str(s)).lower() for s in texts]
+
+def text_feature_block(texts: Iterable[str], batch_size: int = 50000, lexicon: Optional[Lexicon] = None) -> pd.DataFrame:
+    """All scalar text features of add_metadata_feats as one column block.
+
+    Lexicon categories beyond the built-in ones come out as `<category>_count`.
+    """
+    texts = [s if isinstance(s, str) else str(s) for s in texts]
+    parts = []
+    for i in range(0, max(1, len(texts)), batch_size):
+        batch = texts[i:i + batch_size]
+        cols = {"text_norm": text_norms(batch)}
+        cols.update(char_feature_arrays(batch))
+        cols.update(lexicon_columns(batch, lexicon))
+        parts.append(pd.DataFrame(cols))
+    return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
@@ -5,14 +5,17 @@ from typing import List
 from .config import Config, LABELS
 from .data_prep import load_samples, clean_reviews, business_disjoint_split
 from .features import add_metadata_feats
-from .rules import weak_labels
+from .rules import rule_features, weak_label_matrix, label_lists
 from .models.multilabel import MultiLabelSklearn
+from .models.multilabel_hf import MultiLabelHF
 from .models.relevancy_ce import RelevancyModel
+from .models.place_embeddings import PlaceEmbeddingStore
+from .models.relevancy_index import PlaceTextIndex, place_description, place_descriptions
 from .policy import default_thresholds
 
 def prepare_training_data(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
-    df["weak_labels"] = df["text"].apply(weak_labels)
+    df["weak_labels"] = label_lists(weak_label_matrix(rule_features(df)))
     return df
 
 def to_multi_list(df: pd.DataFrame) -> List[List[str]]:
@@ -22,6 +25,8 @@ def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--backend", choices=["sklearn","hf"], default="sklearn")
     ap.add_argument("--run_name", default="run")
+    ap.add_argument("--hf_tiny", action="store_true",
+                    help="hf backend: tiny randomly initialized BERT instead of Config.models['classifier'] (offline smoke test)")
     args = ap.parse_args()
 
     cfg = Config()
@@ -41,18 +46,28 @@ def main():
         clf.save(clf_path)
         print(f"Saved multilabel model to {clf_path}")
     else:
-        print("HF backend not implemented in this scaffold. Use sklearn baseline or extend models.")
+        if args.hf_tiny:
+            clf = MultiLabelHF.tiny(tr["text"].tolist(), labels=LABELS, epochs=3, lr=1e-3)
+        else:
+            clf = MultiLabelHF.from_options(labels=LABELS)
+        clf.fit(tr["text"].tolist(), to_multi_list(tr))
+        clf_path = os.path.join(cfg.models_dir, f"multilabel_hf_{args.run_name}")
+        clf.save(clf_path)
+        print(f"Saved multilabel model to {clf_path}")
 
-    rel = RelevancyModel()
+    place_index = PlaceTextIndex().fit(places["place_id"], place_descriptions(places), reviews=tr["text"].tolist())
+    place_index.save(os.path.join(cfg.models_dir, "place_index.joblib"))
+    rel = RelevancyModel(place_index=place_index)
     rel.load()
+    if rel.bi_model is not None:
+        rel.place_store = PlaceEmbeddingStore(model_name=rel.bi_model_name).add(
+            rel.bi_model, places["place_id"], place_descriptions(places), replace=True)
     place_map = places.set_index("place_id")[["place_name","place_category","city","description"]].to_dict(orient="index")
     pairs = []
     for _, row in tr.iloc[:10].iterrows():
-        pl = place_map.get(row["place_id"], {})
-        place_desc = f"{pl.get('place_name','')} — {pl.get('place_category','')}, {pl.get('city','')}. {pl.get('description','')}"
-        pairs.append((row["text"], place_desc))
+        pairs.append((row["text"], place_description(place_map.get(row["place_id"], {}))))
     if pairs:
-        scores = rel.score_pairs(pairs)
+        scores = rel.score_pairs(pairs, place_ids=tr["place_id"].iloc[:10].tolist())
         os.makedirs(cfg.outputs_dir, exist_ok=True)
         with open(os.path.join(cfg.outputs_dir, f"relevancy_train_samples_{args.run_name}.json"), "w", encoding="utf-8") as f:
             json.dump({"scores": [float(x) for x in scores]}, f, indent=2)
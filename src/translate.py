@@ -0,0 +1,151 @@
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+from .config import Config
+from .cache import SqliteCache, text_key
+
+try:
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+except Exception:
+    torch = AutoTokenizer = AutoModelForSeq2SeqLM = None
+
+# Batched machine translation for non-English reviews.
+# - The model is loaded once per process and per model name (get_translator);
+# - texts are sorted by token length and cut into batches bounded by rows and by
+#   padded tokens, so short reviews are not padded to the longest one in a run;
+# - translations are cached on disk keyed by (model name, text hash), so re-runs
+#   and duplicate reviews never reach the model; an in-process LRU of `memo_size`
+#   entries sits in front of it, so a long-lived translator stays bounded.
+
+DEFAULT_MODEL = "Helsinki-NLP/opus-mt-mul-en"
+DEFAULT_CACHE = os.path.join(Config.data_dir, "cache", "translations.sqlite")
+
+def length_batches(lengths: Sequence[int], batch_size: int, max_tokens: int) -> List[List[int]]:
+    """Indices grouped by length: <= batch_size rows and <= max_tokens padded tokens per batch."""
+    batches: List[List[int]] = []
+    cur: List[int] = []
+    longest = 0
+    for i in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        n = max(1, lengths[i])
+        if cur and (len(cur) >= batch_size or max(longest, n) * (len(cur) + 1) > max_tokens):
+            batches.append(cur)
+            cur, longest = [], 0
+        cur.append(i)
+        longest = max(longest, n)
+    if cur:
+        batches.append(cur)
+    return batches
+
+class Translator:
+    """Seq2seq translator with length-bucketed batching and a persistent cache.
+
+    `model`/`tokenizer` may be passed directly (e.g. a tiny locally built model);
+    otherwise they are loaded from `model_name` on first use. `cache_path=None`
+    keeps the cache in memory only.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        cache_path: Optional[str] = DEFAULT_CACHE,
+        batch_size: int = 16,
+        max_tokens: int = 4096,
+        max_length: int = 512,
+        model=None,
+        tokenizer=None,
+        device: Optional[str] = None,
+        memo_size: int = 100_000,
+    ) -> None:
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.max_length = max_length
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.cache = SqliteCache(cache_path, table="translations") if cache_path else None
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[str, str]" = OrderedDict()
+        self._ready = False
+
+    def load(self) -> None:
+        if self._ready:
+            return
+        if self.model is None or self.tokenizer is None:
+            if AutoModelForSeq2SeqLM is None:
+                raise ImportError("transformers and torch are required for translation")
+            self.tokenizer = self.tokenizer or AutoTokenizer.from_pretrained(self.model_name)
+            self.model = self.model or AutoModelForSeq2SeqLM.from_pretrained(self.model_name)
+        # injected models too: a freshly built one is in train mode and would generate with dropout
+        self.model.eval()
+        if self.device:
+            self.model.to(self.device)
+        self._ready = True
+
+    def _generate(self, texts: List[str]) -> List[str]:
+        self.load()
+        enc = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+        outs: List[Optional[str]] = [None] * len(texts)
+        for batch in length_batches([len(ids) for ids in enc["input_ids"]], self.batch_size, self.max_tokens):
+            inpt = self.tokenizer.pad({k: [enc[k][i] for i in batch] for k in ("input_ids", "attention_mask")},
+                                      return_tensors="pt")
+            if self.device:
+                inpt = inpt.to(self.device)
+            with torch.inference_mode():
+                gen = self.model.generate(**inpt, max_length=self.max_length)
+            done = dict(zip(batch, self.tokenizer.batch_decode(gen, skip_special_tokens=True)))
+            for i, out in done.items():
+                outs[i] = out
+            self._store({text_key(texts[i]): out for i, out in done.items()})
+        return outs
+
+    def _remember(self, items: Dict[str, str]) -> None:
+        for k, v in items.items():
+            self._memo[k] = v
+            self._memo.move_to_end(k)
+        while len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+
+    def _store(self, items: Dict[str, str]) -> None:
+        # written per batch, so an interrupted run keeps what it translated
+        self._remember(items)
+        if self.cache is not None:
+            self.cache.put_many(items, namespace=self.model_name)
+
+    def translate(self, texts: Sequence[str]) -> List[str]:
+        """Translations in input order; empty and non-str values are returned unchanged."""
+        texts = list(texts)
+        keys = [text_key(t) if isinstance(t, str) and t.strip() else None for t in texts]
+        # collected locally: a call with more distinct texts than memo_size would evict its own results
+        found: Dict[str, str] = {}
+        for k in dict.fromkeys(keys):
+            if k is not None and k in self._memo:
+                found[k] = self._memo[k]
+                self._memo.move_to_end(k)
+        todo: Dict[str, str] = {}
+        for t, k in zip(texts, keys):
+            if k is not None and k not in found:
+                todo.setdefault(k, t)
+        if todo and self.cache is not None:
+            hits = self.cache.get_many(list(todo), namespace=self.model_name)
+            found.update(hits)
+            self._remember(hits)
+            todo = {k: t for k, t in todo.items() if k not in hits}
+        if todo:
+            found.update(zip(todo, self._generate(list(todo.values()))))
+        return [t if k is None else found[k] for t, k in zip(texts, keys)]
+
+_translators: Dict[str, Translator] = {}
+
+def get_translator(model_name: str = DEFAULT_MODEL) -> Translator:
+    """Process-wide translator per model; throughput knobs come from config options."""
+    if model_name not in _translators:
+        opts = Config.options or {}
+        _translators[model_name] = Translator(
+            model_name,
+            batch_size=int(opts.get("translate_batch_size", 16)),
+            max_tokens=int(opts.get("translate_max_tokens", 4096)),
+            memo_size=int(opts.get("translate_memo_size", 100_000)),
+        )
+    return _translators[model_name]
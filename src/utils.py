@@ -1,8 +1,20 @@
 import re, unicodedata, html, math, pathlib
-from typing import List, Set
+from functools import lru_cache
+from typing import FrozenSet, List
 
 URL_RE = re.compile(r'https?://\S+|www\.\S+')
 HTML_TAG_RE = re.compile(r'<.*?>')
+PROMO_RE = re.compile(r"(?:discount|promo|coupon|deal|sale|%\s*off|dm\s*me|buy now)", re.I)
+NEVER_BEEN_RE = re.compile(r"\b(?:never been|haven't been|didn't visit|did not go|have not gone)\b", re.I)
+EXPERIENTIAL_CUES = [
+    r"\bwe ordered\b", r"\bi ordered\b", r"\bwe visited\b", r"\bwe went\b",
+    r"\bthe waiter\b", r"\btable\b", r"\breceipt\b", r"\bmenu\b",
+    r"\bappointment\b", r"\bfront desk\b", r"\bparking\b", r"\bline\b",
+    r"\bcheck(ing)? in\b", r"\bseated\b", r"\bord(er)ed\b"
+]
+EXPERIENTIAL_CUE_RES = [re.compile(p) for p in EXPERIENTIAL_CUES]
+TOKEN_RE = re.compile(r"[A-Za-z']+")
+RESOURCES_DIR = pathlib.Path(__file__).resolve().parents[1] / "resources"
 
 def normalize_text(s: str) -> str:
     s = s or ""
@@ -38,28 +50,27 @@ def char_entropy(s: str) -> float:
         H -= p*math.log2(p)
     return H
 
-def load_profanity_words() -> Set[str]:
+def load_word_list(path: pathlib.Path) -> FrozenSet[str]:
+    words = pathlib.Path(path).read_text(encoding="utf-8").splitlines()
+    return frozenset(w.strip().lower() for w in words if w.strip())
+
+@lru_cache(maxsize=1)
+def load_profanity_words() -> FrozenSet[str]:
     try:
-        words = (pathlib.Path(__file__).resolve().parents[1] / "resources" / "profanity.txt").read_text(encoding="utf-8").splitlines()
-        return set(w.strip().lower() for w in words if w.strip())
+        return load_word_list(RESOURCES_DIR / "profanity.txt")
     except Exception:
-        return {"damn","hell","crap","stupid"}
+        return frozenset({"damn","hell","crap","stupid"})
 
 def profanity_count(s: str) -> int:
     if not s: return 0
-    toks = re.findall(r"[A-Za-z']+", s.lower())
+    toks = TOKEN_RE.findall(s.lower())
     bad = load_profanity_words()
     return sum(1 for t in toks if t in bad)
 
 def experiential_score(s: str) -> float:
     if not s: return 0.0
-    cues = [
-        r"\bwe ordered\b", r"\bi ordered\b", r"\bwe visited\b", r"\bwe went\b",
-        r"\bthe waiter\b", r"\btable\b", r"\breceipt\b", r"\bmenu\b",
-        r"\bappointment\b", r"\bfront desk\b", r"\bparking\b", r"\bline\b",
-        r"\bcheck(ing)? in\b", r"\bseated\b", r"\bord(er)ed\b"
-    ]
-    hits = sum(1 for pat in cues if re.search(pat, s.lower()))
+    s = s.lower()
+    hits = sum(1 for pat in EXPERIENTIAL_CUE_RES if pat.search(s))
     return min(1.0, hits/4.0)
 
 def is_gibberish_name(name: str) -> float:
@@ -0,0 +1,20 @@
+from typing import List, NamedTuple
+
+import pytest
+
+
+class Corpus(NamedTuple):
+    labels: List[str]
+    texts: List[str]
+    y: List[List[str]]
+
+
+@pytest.fixture(scope="session")
+def toy_corpus() -> Corpus:
+    """Three-label toy reviews shared by the classifier and registry tests."""
+    return Corpus(
+        labels=["spam", "ad", "rant"],
+        texts=["buy cheap pills now", "visit our website for discounts", "worst service ever, never again",
+               "great pizza and friendly staff", "cheap pills discount code", "terrible rude waiter, awful"] * 3,
+        y=[["spam"], ["ad"], ["rant"], [], ["spam", "ad"], ["rant"]] * 3,
+    )
@@ -0,0 +1,23 @@
+import gzip
+import zipfile
+
+from src.archive_io import list_members, open_member
+
+
+def test_subfolders_are_only_listed_when_recursive(tmp_path):
+    (tmp_path / "top.csv").write_text("a\n1\n")
+    with gzip.open(tmp_path / "packed.csv.gz", "wt") as f:
+        f.write("a\n2\n")
+    with zipfile.ZipFile(tmp_path / "bundle.zip", "w") as z:
+        z.writestr("inner/z.csv", "a\n3\n")
+        z.writestr("notes.txt", "skip")
+    (tmp_path / "gmr_pl").mkdir()
+    (tmp_path / "gmr_pl" / "eval.csv").write_text("a\n4\n")
+
+    top = list_members(tmp_path, ("*.csv",))
+    assert sorted(ref.name for ref in top) == ["packed.csv", "top.csv", "z.csv"]
+    deep = list_members(tmp_path, ("*.csv",), recursive=True)
+    assert sorted(ref.name for ref in deep) == ["eval.csv", "packed.csv", "top.csv", "z.csv"]
+    for ref in deep:
+        with open_member(ref, encoding="utf-8") as f:
+            assert f.read().startswith("a\n")
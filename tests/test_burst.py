@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features import BURST_WINDOWS, BurstIndex, add_metadata_feats
+
+
+def old_burst_counts(df: pd.DataFrame, window: pd.Timedelta) -> pd.Series:
+    """The per-user loop BurstIndex replaced, with the 24h window made a parameter."""
+    out = pd.Series(0, index=df.index)
+    for uid, g in df.groupby("user_id", dropna=False):
+        if g["dt"].notna().sum() == 0:
+            out[g.index] = 0
+            continue
+        g = g.sort_values("dt")
+        counts = []
+        for t in g["dt"].values:
+            if pd.isna(t):
+                counts.append(1); continue
+            counts.append(int(((g["dt"] >= t - window) & (g["dt"] <= t)).sum()))
+        out[g.index] = counts
+    return out
+
+
+def random_reviews(seed: int, n: int = 400) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    users = rng.choice(["u0", "u1", "u2", "u3", "u4", "u5", None, np.nan], size=n).astype(object)
+    users[rng.random(n) < 0.1] = None
+    start = pd.Timestamp("2023-01-01")
+    # bursts of a few minutes mixed with gaps of days, repeated timestamps and undated rows
+    offsets = np.where(rng.random(n) < 0.5, rng.integers(0, 3 * 3600, n), rng.integers(0, 30 * 86400, n))
+    on_grid = rng.random(n) < 0.3  # quarter-hour marks, so reviews exactly one window apart are common
+    offsets[on_grid] -= offsets[on_grid] % 900
+    dt = pd.Series(start + pd.to_timedelta(offsets, unit="s"))
+    dt[rng.random(n) < 0.05] = dt.iloc[0]
+    dt[rng.random(n) < 0.15] = pd.NaT
+    undated_user = rng.random(n) < 0.05
+    users[undated_user] = "undated"
+    dt[undated_user] = pd.NaT
+    return pd.DataFrame({"user_id": users, "dt": dt})
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_burst_index_matches_the_per_user_loop(seed):
+    df = random_reviews(seed)
+    index = BurstIndex(df["user_id"], df["dt"])
+    for name, window in BURST_WINDOWS.items():
+        expected = old_burst_counts(df, window)
+        got = index.counts(df["user_id"], df["dt"], window)
+        assert (got == expected.to_numpy()).all(), name
+
+
+def test_add_metadata_feats_burst_columns():
+    df = random_reviews(7, n=200)
+    raw = pd.DataFrame({"text": "good food", "user_id": df["user_id"],
+                        "created_at": df["dt"].dt.as_unit("ms").astype("int64").where(df["dt"].notna(), None)})
+    out = add_metadata_feats(raw)
+    for name, window in BURST_WINDOWS.items():
+        assert (out[f"user_burst_{name}"].to_numpy() == old_burst_counts(df, window).to_numpy()).all(), name
@@ -0,0 +1,40 @@
+import pandas as pd
+
+import src.data_prep as data_prep
+from src.config import Config
+from src.feature_cache import FeatureCache, clean_row_feats
+
+ROWS = pd.DataFrame({
+    "text": ["The food was great and the staff were friendly.",
+             "La comida estaba deliciosa y el servicio fue excelente.",
+             "Das Essen war sehr gut und der Service freundlich."],
+    "user_name": ["a", "b", "c"],
+})
+
+
+class Failing:
+    def translate(self, texts):
+        raise RuntimeError("translation model unavailable")
+
+
+class Tagging:
+    def translate(self, texts):
+        return [f"EN: {t}" for t in texts]
+
+
+def test_failed_translations_are_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "translate_non_en", True)
+    langs = dict(zip(ROWS["text"], ["en", "es", "de"]))
+    monkeypatch.setattr(data_prep, "detect_langs", lambda texts, n_jobs=1: [langs.get(t, "en") for t in texts])
+    cache = FeatureCache(str(tmp_path / "features.sqlite"))
+    keys = cache.row_keys(ROWS)
+
+    monkeypatch.setattr(data_prep, "get_translator", lambda: Failing())
+    out = clean_row_feats(ROWS, cache)
+    assert out["text_model"].tolist() == ROWS["text"].tolist()
+    assert set(cache.get(keys)) == {keys[0]}  # only the English row, which needed no translation
+
+    monkeypatch.setattr(data_prep, "get_translator", lambda: Tagging())
+    out = clean_row_feats(ROWS, cache)
+    assert out["text_model"].tolist()[1:] == [f"EN: {t}" for t in ROWS["text"][1:]]
+    assert set(cache.get(keys)) == set(keys)
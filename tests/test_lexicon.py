@@ -0,0 +1,19 @@
+from src.lexicon import Lexicon, default_lexicon
+from src.utils import NEVER_BEEN_RE, PROMO_RE
+
+TEXTS = ["Never been here, but 20% OFF today!", "İnever been there", "İstanbul: never been better",
+         "dİscount codes, DM me", "we haven't been back", "", "ﬁne place, Coupon inside"]
+
+
+def test_case_insensitive_cues_match_the_original_text():
+    # "İ".lower() is two code points, so matching the lowercased text would see a word boundary
+    # after "i" in "İnever" and lose the literal in "dİscount"
+    hits = default_lexicon().scan_many(TEXTS)
+    assert list(hits["never_been"]) == [len(NEVER_BEEN_RE.findall(t)) for t in TEXTS]
+    assert list(hits["promo"]) == [len(PROMO_RE.findall(t)) for t in TEXTS]
+    assert hits["never_been"][1] == 0 and hits["promo"][3] == 2
+
+
+def test_case_sensitive_cues_match_the_lowercased_text():
+    lex = Lexicon().add_patterns("cue", [r"\bwe went\b"])
+    assert lex.scan("We WENT twice")["cue"] == 1
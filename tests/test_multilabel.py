@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from src.models.multilabel import MultiLabelSklearn, MultiLabelStreaming
+
+
+@pytest.mark.parametrize("cls", [MultiLabelSklearn, MultiLabelStreaming])
+def test_compile_casts_features_and_leaves_the_vectorizer_alone(cls, tmp_path, toy_corpus):
+    labels, texts, y = toy_corpus
+    model = cls(labels=labels).fit(texts, y)
+    expected = model.predict_proba(texts)
+    dtype = model.vectorizer.dtype
+    assert model._features(texts).dtype == np.float64
+
+    model.compile()
+    assert model.vectorizer.dtype == dtype
+    assert model._features(texts).dtype == np.float32
+    assert np.allclose(model.predict_proba(texts), expected, atol=1e-5)
+
+    model.save(str(tmp_path / "model.joblib"))
+    reloaded = MultiLabelSklearn.load(str(tmp_path / "model.joblib"))
+    assert reloaded.vectorizer.dtype == dtype
+    assert np.allclose(reloaded.predict_proba(texts), expected)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from src.models.multilabel_hf import MultiLabelHF
+
+
+def log_loss(model, corpus):
+    y = np.array([[l in labs for l in corpus.labels] for labs in corpus.y], dtype=float)
+    p = np.clip(model.predict_proba(corpus.texts), 1e-7, 1 - 1e-7)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+
+@pytest.fixture(scope="module")
+def fitted(toy_corpus):
+    torch.manual_seed(0)
+    model = MultiLabelHF.tiny(toy_corpus.texts, labels=toy_corpus.labels, max_length=32, batch_size=4, epochs=20,
+                              lr=5e-3)
+    before = log_loss(model, toy_corpus)
+    model.fit(toy_corpus.texts, toy_corpus.y)
+    return model, before
+
+
+def test_fit_learns_and_predicts_label_lists(fitted, toy_corpus):
+    model, before = fitted
+    labels, texts, _ = toy_corpus
+    assert not model.model.training
+    assert log_loss(model, toy_corpus) < before / 2
+    probs = model.predict_proba(texts)
+    assert probs.shape == (len(texts), len(labels)) and probs.dtype == np.float32
+    assert np.array_equal(probs, model.predict_proba(texts))
+    preds = model.predict(texts)
+    assert all(set(p) <= set(labels) for p in preds)
+    assert preds == [[l for l, q in zip(labels, row) if q >= 0.5] for row in probs]
+    assert model.predict_proba([]).shape == (0, len(labels))
+
+
+def test_scores_do_not_depend_on_batching(fitted, toy_corpus):
+    model, _ = fitted
+    texts = toy_corpus.texts
+    expected = model.predict_proba(texts)
+    for batch_size, max_tokens in [(1, 8192), (7, 8192), (32, 24)]:
+        model.batch_size, model.max_tokens = batch_size, max_tokens
+        assert np.allclose(model.predict_proba(texts), expected, atol=1e-5)
+    model.batch_size, model.max_tokens = 4, 8192
+    chunks = np.vstack(list(model.iter_predict_proba(texts, chunk_size=5)))
+    assert np.allclose(chunks, expected, atol=1e-5)
+
+
+def test_save_load_and_quantize(fitted, toy_corpus, tmp_path):
+    model, _ = fitted
+    labels, texts, _ = toy_corpus
+    expected = model.predict_proba(texts)
+    model.save(str(tmp_path / "hf"))
+
+    reloaded = MultiLabelHF.load(str(tmp_path / "hf"), num_threads=1)
+    assert reloaded.labels == labels and reloaded.max_length == 32 and reloaded.num_threads == 1
+    assert np.allclose(reloaded.predict_proba(texts), expected, atol=1e-5)
+
+    quantized = MultiLabelHF.load(str(tmp_path / "hf"), quantize=True)
+    probs = quantized.predict_proba(texts)
+    assert any("quantized" in type(m).__module__ for m in quantized._serving_model().modules())
+    assert not any("quantized" in type(m).__module__ for m in quantized.model.modules())
+    assert np.allclose(probs, expected, atol=0.05)
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("datasketch")
+
+from src.near_dup import NearDupIndex
+from src.streaming import CrossRowState
+
+REVIEWS = pd.DataFrame({
+    "review_id": ["r1", "r2", "r3", "r4", "r5"],
+    "text": ["best pizza in town hands down", "best pizza in town hands down", "cozy cafe with great espresso",
+             "terrible parking and loud music", "cozy cafe with great espresso drinks"],
+    "user_id": ["u1", "u2", "u3", "u4", "u5"],
+    "place_id": ["p1", "p2", "p3", "p4", "p3"],
+})
+
+
+def features(index, df):
+    return index.features(index.add(df["text"], df["user_id"], df["place_id"], review_ids=df["review_id"]))
+
+
+def test_rerun_returns_existing_rows(tmp_path):
+    path = str(tmp_path / "nd")
+    index = NearDupIndex(path=path)
+    first = features(index, REVIEWS)
+    index.save()
+    index = NearDupIndex.load(path)
+    again = features(index, REVIEWS)
+    assert index.n == len(REVIEWS)
+    assert again.equals(first)
+    assert first["near_dup_cluster_size"].tolist()[:2] == [2, 2]
+
+    # a new review joins, known ones keep their rows; repeats within a batch share one row
+    more = pd.concat([REVIEWS.iloc[[3]], pd.DataFrame({"review_id": ["r6", "r6"], "text": ["terrible parking and loud music"] * 2,
+                                                       "user_id": ["u6", "u6"], "place_id": ["p4", "p4"]})])
+    ids = index.add(more["text"], more["user_id"], more["place_id"], review_ids=more["review_id"])
+    assert ids.tolist() == [3, 5, 5] and index.n == 6
+    assert index.features(ids)["near_dup_cluster_size"].tolist() == [2, 2, 2]
+
+
+def test_reviews_without_ids_always_insert():
+    index = NearDupIndex()
+    ids = index.add(REVIEWS["text"][:2], review_ids=[None, np.nan])
+    assert ids.tolist() == [0, 1]
+    assert index.add(REVIEWS["text"][:2]).tolist() == [2, 3]
+
+
+def test_chunked_rerun_keeps_cluster_sizes(tmp_path):
+    path = str(tmp_path / "nd")
+
+    def run():
+        index = NearDupIndex(path=path)
+        state = CrossRowState(near_dup_index=index)
+        for chunk in (REVIEWS.iloc[:2], REVIEWS.iloc[2:]):
+            state.observe(chunk)
+        state.finalize()
+        out = pd.concat([state.near_dup_features(2), state.near_dup_features(3)], ignore_index=True)
+        index.save()
+        return out
+
+    first = run()
+    assert run().equals(first)
+    assert NearDupIndex.load(path).n == len(REVIEWS)
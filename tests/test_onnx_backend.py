@@ -0,0 +1,105 @@
+import json
+import string
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("sentence_transformers")
+
+import src.image_utils as image_utils
+from src.image_utils import ImageTextRelevance
+from src.models.onnx_backend import (OnnxCLIP, OnnxCrossEncoder, _noise_images, export_clip, export_cross_encoder,
+                                     parity_clip, parity_cross_encoder)
+from src.models.relevancy_ce import RelevancyModel
+
+WORDS = "the food was great service slow staff friendly coffee cold pizza hot room clean view nice cafe place".split()
+PAIRS = [("the food was great", "pizza place"), ("service slow and staff cold", "nice cafe"),
+         ("room clean view nice", "the place"), ("coffee", "cafe coffee hot"), ("", "pizza")]
+TEXTS = ["a photo of a cafe", "the pasta was great!", "room 12, clean"]
+
+
+@pytest.fixture(scope="module")
+def tiny_cross_encoder(tmp_path_factory):
+    """Randomly initialized one-layer BERT with a single-logit head, saved as a CrossEncoder can load it."""
+    path = tmp_path_factory.mktemp("ce")
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS
+    (path / "vocab.txt").write_text("\n".join(vocab) + "\n", encoding="utf-8")
+    tok = transformers.BertTokenizerFast(str(path / "vocab.txt"), do_lower_case=True)
+    config = transformers.BertConfig(vocab_size=len(vocab), hidden_size=16, num_hidden_layers=1, num_attention_heads=2,
+                                     intermediate_size=32, max_position_embeddings=64, num_labels=1)
+    torch.manual_seed(0)
+    transformers.BertForSequenceClassification(config).save_pretrained(path)
+    tok.save_pretrained(path)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def tiny_clip(tmp_path_factory):
+    """Randomly initialized two-tower CLIP with a character-level BPE vocabulary and 32px images."""
+    path = tmp_path_factory.mktemp("clip")
+    chars = list(string.ascii_lowercase + string.digits + ".,!?'")
+    vocab = {t: i for i, t in enumerate(chars + [c + "</w>" for c in chars] + ["<|startoftext|>", "<|endoftext|>"])}
+    (path / "vocab.json").write_text(json.dumps(vocab), encoding="utf-8")
+    (path / "merges.txt").write_text("#version: 0.2\n", encoding="utf-8")
+    tok = transformers.CLIPTokenizer(str(path / "vocab.json"), str(path / "merges.txt"))
+    image_processor_cls = getattr(transformers, "CLIPImageProcessorPil", transformers.CLIPImageProcessor)
+    images = image_processor_cls(size={"shortest_edge": 32}, crop_size={"height": 32, "width": 32})
+    eos = vocab["<|endoftext|>"]
+    config = transformers.CLIPConfig(
+        text_config=dict(vocab_size=len(vocab), hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+                         num_attention_heads=2, max_position_embeddings=77, bos_token_id=vocab["<|startoftext|>"],
+                         eos_token_id=eos, pad_token_id=eos),
+        vision_config=dict(hidden_size=32, intermediate_size=64, num_hidden_layers=2, num_attention_heads=2,
+                           image_size=32, patch_size=8),
+        projection_dim=16)
+    torch.manual_seed(0)
+    transformers.CLIPModel(config).save_pretrained(path)
+    transformers.CLIPProcessor(image_processor=images, tokenizer=tok).save_pretrained(path)
+    return str(path)
+
+
+def test_cross_encoder_export_matches_torch(tiny_cross_encoder, tmp_path):
+    out = export_cross_encoder(tiny_cross_encoder, str(tmp_path / "onnx"), int8=True)
+    assert (tmp_path / "onnx" / "model.onnx").exists() and (tmp_path / "onnx" / "model.int8.onnx").exists()
+    assert parity_cross_encoder(tiny_cross_encoder, out, PAIRS)["max_abs_diff"] < 1e-4
+    assert parity_cross_encoder(tiny_cross_encoder, out, PAIRS, int8=True)["max_abs_diff"] < 0.05
+
+
+def test_relevancy_model_switches_to_onnx(tiny_cross_encoder, tmp_path, monkeypatch):
+    out = export_cross_encoder(tiny_cross_encoder, str(tmp_path / "onnx"))
+    torch_model = RelevancyModel(mode="ce", cache_path="", num_threads=2)
+    torch_model.model_name = tiny_cross_encoder
+    torch_model.load()
+    expected = torch_model.score_pairs(PAIRS)
+
+    onnx_model = RelevancyModel(mode="ce", cache_path="", num_threads=2, onnx_dir=out)
+    onnx_model.load()
+    assert isinstance(onnx_model.model, OnnxCrossEncoder)
+    monkeypatch.setattr(torch, "set_num_threads", lambda n: pytest.fail("ONNX scoring changed torch's thread count"))
+    assert np.allclose(onnx_model.score_pairs(PAIRS), expected, atol=1e-4)
+
+
+def test_clip_export_matches_torch(tiny_clip, tmp_path):
+    out = export_clip(tiny_clip, str(tmp_path / "onnx"), int8=True)
+    for name in ("text.onnx", "text.int8.onnx", "image.onnx", "image.int8.onnx"):
+        assert (tmp_path / "onnx" / name).exists()
+    fp32 = parity_clip(tiny_clip, out, TEXTS, _noise_images(3, size=48))
+    assert max(fp32.values()) < 1e-4
+    int8 = parity_clip(tiny_clip, out, TEXTS, _noise_images(3, size=48), int8=True)
+    assert int8["cosine_max_abs_diff"] < 0.1
+
+
+def test_image_text_relevance_switches_to_onnx(tiny_clip, tmp_path, monkeypatch):
+    out = export_clip(tiny_clip, str(tmp_path / "onnx"))
+    images = dict(zip(["u1", "u2"], _noise_images(2, size=48)))
+    monkeypatch.setattr(image_utils, "_load_image_from_url", images.get)
+    expected = ImageTextRelevance(model_name=tiny_clip, onnx_dir="").score(list(images), TEXTS[0])
+
+    onnx = ImageTextRelevance(model_name=tiny_clip, onnx_dir=out)
+    onnx.load()
+    assert isinstance(onnx.model, OnnxCLIP)
+    assert onnx.score(list(images), TEXTS[0]) == pytest.approx(expected, abs=1e-4)
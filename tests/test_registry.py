@@ -0,0 +1,36 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from src.models.multilabel import MultiLabelSklearn
+from src.models.registry import ModelRegistry, load_serving_model
+from src.models.relevancy_index import PlaceTextIndex
+
+
+def test_registered_version_scores_like_the_source_model_and_refuses_save(tmp_path, toy_corpus):
+    labels, texts, y = toy_corpus
+    model = MultiLabelSklearn(labels=labels).fit(texts, y)
+    expected = model.predict_proba(texts)
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    version = registry.register(model, promote=True)
+    served = registry.load()
+    assert served.version == version
+    assert np.allclose(served.predict_proba(texts), expected, atol=1e-5)
+    with pytest.raises(TypeError, match="ModelRegistry.register"):
+        served.save(str(tmp_path / "copy.joblib"))
+
+
+def test_legacy_fallback_skips_auxiliary_joblibs(tmp_path, toy_corpus):
+    labels, texts, y = toy_corpus
+    model = MultiLabelSklearn(labels=labels).fit(texts, y)
+    model.save(str(tmp_path / "multilabel_old.joblib"))
+    PlaceTextIndex().fit(["p1"], ["pizzeria in rome"]).save(str(tmp_path / "place_index.joblib"))
+    # a non-model payload matching the pattern is skipped as well
+    joblib.dump({"vectorizer": None}, str(tmp_path / "multilabel_broken.joblib"))
+    for age, name in enumerate(["multilabel_old.joblib", "multilabel_broken.joblib", "place_index.joblib"]):
+        os.utime(tmp_path / name, (1_000_000 + age, 1_000_000 + age))
+
+    served = load_serving_model(str(tmp_path))
+    assert np.allclose(served.predict_proba(texts), model.predict_proba(texts), atol=1e-5)
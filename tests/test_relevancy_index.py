@@ -0,0 +1,44 @@
+import numpy as np
+
+from src.models.relevancy_index import PlaceTextIndex, batch_scores
+
+PLACES = {
+    "p1": "Luigi's — pizzeria, Rome. Wood-fired pizza and pasta",
+    "p2": "Bean There — cafe, Lisbon. Espresso, pastries and brunch",
+}
+
+
+def test_review_sample_joins_the_vocabulary():
+    reviews = ["the crust was crispy and the tiramisu divine", "latte art and a flaky croissant"]
+    plain = PlaceTextIndex().fit(PLACES, PLACES.values())
+    mixed = PlaceTextIndex().fit(PLACES, PLACES.values(), reviews=reviews)
+    assert "tiramisu" not in plain.vectorizer.vocabulary_
+    assert "tiramisu" in mixed.vectorizer.vocabulary_
+    assert mixed.review_sample == reviews
+
+
+def test_new_category_triggers_a_refit(tmp_path):
+    index = PlaceTextIndex().fit(PLACES, PLACES.values())
+    index.save(str(tmp_path / "index.joblib"))
+    index = PlaceTextIndex.load(str(tmp_path / "index.joblib"))
+    index.add(["p3"], ["Iron Temple — gym, Oslo. Squat racks, kettlebells, sauna"])
+    assert "kettlebells" in index.vectorizer.vocabulary_
+    assert index.place_ids == ["p1", "p2", "p3"]
+    s = index.score(["great kettlebells and a hot sauna", "best pizza in town"], ["p3", "p1"])
+    assert (s > 0).all()
+
+    # a familiar description is added without touching the vocabulary
+    vocab = dict(index.vectorizer.vocabulary_)
+    index.add(["p4"], ["Pizza Roma — pizzeria, Rome. Pizza and pasta"])
+    assert index.vectorizer.vocabulary_ == vocab
+
+
+def test_all_zero_vectors_fall_back_to_a_batch_fit():
+    index = PlaceTextIndex().fit(PLACES, PLACES.values())
+    texts = ["amazing sushi omakase", "amazing sushi omakase", "pizza was great"]
+    descs = ["Sushi Zen — sushi, Tokyo. Omakase sushi", PLACES["p1"], PLACES["p1"]]
+    s = index.score(texts, ["new", "p1", "p1"], descs)
+    assert s[0] > 0  # review and description share words the vocabulary lacks
+    assert s[1] == 0.0  # review vector is zero, and the batch fit finds no overlap either
+    assert s[2] > 0 and s[2] == index.score(texts[2:], ["p1"], descs[2:])[0]
+    assert np.allclose(batch_scores(texts[:2], descs[:2]), s[:2])  # one fit over the fallback rows
@@ -0,0 +1,39 @@
+import numpy as np
+
+from src.models.relevancy_index import batch_scores
+from src.models.relevancy_student import distill
+
+REVIEWS = ["great pizza and pasta", "the espresso was bitter", "lovely sea view from the room", "rude staff, slow service",
+           "best tiramisu in town", "croissants were stale", "clean rooms, comfy beds", "loud music all night"]
+PLACES = ["Luigi's — pizzeria, Rome. Pizza, pasta, tiramisu", "Bean There — cafe, Lisbon. Espresso and croissants",
+          "Sea Breeze — hotel, Nice. Rooms with a sea view"]
+
+
+class Teacher:
+    """Stands in for RelevancyModel(mode="ce"): logits from word overlap, every model call recorded."""
+    model_name = "stub-ce"
+    bi_model_name = "stub-bi"
+    batch_size = 4
+
+    def __init__(self):
+        self.calls = []
+
+    def _predict_bucketed(self, pairs):
+        self.calls.append(list(pairs))
+        return [8.0 * float(s) - 2.0 for s in batch_scores([a for a, _ in pairs], [b for _, b in pairs])]
+
+    def _score_tfidf(self, pairs, place_ids=None):
+        return batch_scores([a for a, _ in pairs], [b for _, b in pairs])
+
+
+def test_distill_times_the_teacher_once_per_distinct_pair():
+    pairs = [(r, p) for r in REVIEWS for p in PLACES] * 3  # every pair three times
+    teacher = Teacher()
+    students, report = distill(teacher, pairs, feature_sets=("lexical",), holdout=0.25)
+    assert len(teacher.calls) == 1
+    assert sorted(teacher.calls[0]) == sorted(set(pairs))
+    assert set(report["scorer"]) == {"teacher (stub-ce)", "tfidf fallback", "student:lexical"}
+    row = report.set_index("scorer").loc["teacher (stub-ce)"]
+    assert row["mae"] == 0.0 and np.isfinite(row["pairs_per_sec"])
+    pred = students["lexical"].predict(pairs[:5])
+    assert ((pred > 0) & (pred < 1)).all()
@@ -0,0 +1,18 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.storage import FrameWriter, read_frame
+
+
+def test_empty_chunks_keep_the_list_schema(tmp_path):
+    path = tmp_path / "out.parquet"
+    df = pd.DataFrame({"review_id": ["r1", "r2"], "pics": ['["a.jpg"]', "[]"]})
+    with FrameWriter(path) as w:
+        w.write(df.iloc[:0])  # a chunk with no rows for this split
+        w.write(df)
+        w.write(df.iloc[:0])
+    back = read_frame(path)
+    assert back["review_id"].tolist() == ["r1", "r2"]
+    assert [list(p) for p in back["pics"]] == [["a.jpg"], []]
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from src.features import parse_datetimes
+from src.streaming import CrossRowState
+
+# a millisecond source whose second chunk, on its own, looks like seconds (1971 dates)
+MS = [1_600_000_000_000, 1_600_000_360_000, 1_600_003_600_000, 40_000_000_000, 40_000_600_000, 41_000_000_000]
+SECONDS = [1_600_000_000, 1_600_000_360, 1_600_003_600]
+
+
+def chunks():
+    a = pd.DataFrame({"text": "nice place", "user_id": ["u1", "u1", "u2", "u3", "u3", "u4"], "place_id": "p1",
+                      "created_at": [str(v) for v in MS], "source": "ms_source"})
+    b = pd.DataFrame({"text": "ok", "user_id": ["u5", "u5", "u6"], "place_id": "p2",
+                      "created_at": [str(v) for v in SECONDS], "source": "s_source"})
+    return [a.iloc[:3], pd.concat([a.iloc[3:], b]).reset_index(drop=True)]
+
+
+def test_auto_epoch_unit_is_decided_once_per_source():
+    state = CrossRowState(epoch_unit="auto")
+    for chunk in chunks():
+        state.observe(chunk)
+    state.finalize()
+    assert state.epoch_units == {"ms_source": "ms", "s_source": "s"}
+
+    second = chunks()[1]
+    dt = state.parse_times(second["created_at"], second["source"])
+    expected = pd.concat([parse_datetimes(second["created_at"][:3], "ms"), parse_datetimes(second["created_at"][3:], "s")])
+    assert dt.equals(expected)
+    assert (dt.dt.year == np.array([1971, 1971, 1971, 2020, 2020, 2020])).all()
@@ -0,0 +1,85 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from src.translate import Translator, length_batches
+
+WORDS = "the food was great service slow staff friendly coffee cold pizza hot room clean view nice".split()
+
+
+def tiny_marian(tmp_path):
+    """Randomly initialized Marian model with a word-level vocabulary; dropout is high so train mode shows."""
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS
+    path = tmp_path / "vocab.txt"
+    path.write_text("\n".join(vocab) + "\n", encoding="utf-8")
+    tok = transformers.BertTokenizerFast(str(path), do_lower_case=True)  # positional: vocab_file (4.x) / vocab (5.x)
+    config = transformers.MarianConfig(
+        vocab_size=len(vocab), d_model=16, encoder_layers=1, decoder_layers=1,
+        encoder_attention_heads=2, decoder_attention_heads=2, encoder_ffn_dim=32, decoder_ffn_dim=32,
+        max_position_embeddings=64, dropout=0.5, attention_dropout=0.5,
+        pad_token_id=0, decoder_start_token_id=0, eos_token_id=3, forced_eos_token_id=3,
+    )
+    torch.manual_seed(0)
+    model = transformers.MarianMTModel(config)
+    with torch.no_grad():
+        model.final_logits_bias[:, :5] = -1e4  # never emit special tokens, so outputs are non-empty word strings
+    return model, tok
+
+
+TEXTS = ["the food was great", "service slow", "staff friendly coffee cold pizza hot", "room clean", "nice view",
+         "the coffee was cold and the pizza was hot", "great"]
+
+
+def test_length_batches_respects_limits():
+    lengths = [5, 1, 9, 3, 3, 7, 2]
+    batches = length_batches(lengths, batch_size=3, max_tokens=12)
+    assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+    for b in batches:
+        assert len(b) <= 3
+        assert max(lengths[i] for i in b) * len(b) <= 12 or len(b) == 1
+
+
+def test_injected_model_is_put_in_eval_mode(tmp_path):
+    model, tok = tiny_marian(tmp_path)
+    assert model.training
+    tr = Translator("tiny-marian", cache_path=None, model=model, tokenizer=tok, max_length=16)
+    tr.load()
+    assert not tr.model.training
+
+
+def test_batched_generation_matches_one_at_a_time(tmp_path):
+    model, tok = tiny_marian(tmp_path)
+    batched = Translator("tiny-marian", cache_path=None, model=model, tokenizer=tok, batch_size=4, max_length=16)
+    single = Translator("tiny-marian", cache_path=None, model=model, tokenizer=tok, batch_size=1, max_length=16)
+    out = batched.translate(TEXTS)
+    assert all(out)
+    assert out == single.translate(TEXTS)
+
+
+def test_cache_serves_repeats_without_the_model(tmp_path):
+    model, tok = tiny_marian(tmp_path)
+    cache = str(tmp_path / "translations.sqlite")
+    first = Translator("tiny-marian", cache_path=cache, model=model, tokenizer=tok, max_length=16)
+    out = first.translate(TEXTS + TEXTS[:2] + ["", None])
+    assert out[len(TEXTS):len(TEXTS) + 2] == out[:2]
+    assert out[-2:] == ["", None]
+
+    class Broken:
+        def generate(self, *args, **kwargs):
+            raise AssertionError("cached texts reached the model")
+
+        def eval(self):
+            return self
+
+    again = Translator("tiny-marian", cache_path=cache, model=Broken(), tokenizer=tok, max_length=16)
+    assert again.translate(TEXTS) == out[:len(TEXTS)]
+
+
+def test_memo_is_bounded(tmp_path):
+    model, tok = tiny_marian(tmp_path)
+    tr = Translator("tiny-marian", cache_path=None, model=model, tokenizer=tok, max_length=16, memo_size=3)
+    out = tr.translate(TEXTS)
+    assert all(out)
+    assert len(tr._memo) == 3
+    assert tr.translate(TEXTS[-3:]) == out[-3:]